@@ -1,9 +1,11 @@
 from telethon.sync import TelegramClient
 import pandas as pd
-import re
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from scripts.scrape_checkpoints import ScrapeCheckpointStore
+from scripts.media_store import ContentAddressedStore, run_media_stage
+from src import normalization
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -13,11 +15,6 @@ API_ID = os.getenv('API_ID')
 API_HASH = os.getenv('API_HASH')
 PHONE_NUMBER = os.getenv('PHONE_NUMBER')
 
-# Debug: Print the loaded environment variables
-print(f"API_ID: {API_ID}")
-print(f"API_HASH: {API_HASH}")
-print(f"PHONE_NUMBER: {PHONE_NUMBER}")
-
 # List of Telegram channels to scrape
 # @ZemenExpress
 # @nevacomputer
@@ -37,53 +34,92 @@ CHANNELS = ['@ZemenExpress', '@nevacomputer', '@Shewabrand',
             '@qnashcom', '@Fashiontera', '@kuruwear']
 # print(len(CHANNELS))
 
-# Initialize Telegram Client
-client = TelegramClient('session_name', API_ID, API_HASH)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+OUTPUT_PATH = os.path.join(DATA_DIR, 'raw_telegram_messages.csv')
+CHECKPOINT_PATH = os.path.join(DATA_DIR, 'raw_telegram_checkpoints.json')
+MEDIA_WORKERS = 8
+
+COLUMNS = ['ID', 'Sender', 'Timestamp', 'Message', 'Type', 'Channel Title', 'Channel Username',
+           'Media Hash', 'Media Path']
+
+def create_client():
+    """Initialize Telegram Client"""
+    return TelegramClient('session_name', API_ID, API_HASH)
 
 def clean_text(text):
-    """Tokenize and normalize Amharic text"""
-    text = re.sub(r'[^\u1200-\u137F\s]', '', text)  # Keep only Amharic Unicode range
-    text = text.strip()
-    return text
+    """Normalize Amharic text the way preprocessing does (prices and Latin words are kept)"""
+    return normalization.clean_text(text)
+
+def fetch_messages(client, checkpoints=None, channels=CHANNELS, limit=3000,
+                   media_store=None, media_workers=MEDIA_WORKERS):
+    """Fetch messages newer than each channel's checkpoint
 
-def fetch_messages():
-    """Fetch messages from specified Telegram channels"""
+    Each channel is read oldest first from its checkpoint, so a ``limit``
+    that cuts the fetch short leaves the rest for the next run. Photos and
+    documents are downloaded concurrently into ``media_store`` (skipped when
+    it is None) and rows record only the content hash and path.
+    Checkpoints are only advanced in memory here; call ``checkpoints.commit()``
+    after the fetched rows have been stored.
+    """
     all_messages = []
+    media_messages = []
     with client:
         client.connect()
-        for channel in CHANNELS:
+        for channel in channels:
             try:
                 entity = client.get_entity(channel)
-                messages = client.get_messages(entity, limit=3000)  # Fetch recent 500 messages
-                for msg in messages:
+                min_id = checkpoints.last_id(channel) if checkpoints is not None else 0
+                channel_messages = []
+                newest_id, newest_date = min_id, None
+                for msg in client.iter_messages(entity, limit=limit, min_id=min_id, reverse=True):
+                    newest_id, newest_date = msg.id, msg.date
+                    has_media = bool(msg.media and (msg.photo or msg.document))
                     if msg.text:
                         cleaned_text = clean_text(msg.text)
-                        all_messages.append([
+                        channel_messages.append([
                             msg.id, msg.sender_id, msg.date, cleaned_text, 'text', entity.title, entity.username
                         ])
-                    elif msg.media:
-                        if msg.photo:
-                            all_messages.append([
-                                msg.id, msg.sender_id, msg.date, msg.photo, 'photo', entity.title, entity.username
-                            ])
-                        elif msg.document:
-                            all_messages.append([
-                                msg.id, msg.sender_id, msg.date, msg.document, 'document', entity.title, entity.username
-                            ])
+                    elif has_media:
+                        channel_messages.append([
+                            msg.id, msg.sender_id, msg.date, '', 'photo' if msg.photo else 'document',
+                            entity.title, entity.username
+                        ])
+                    if has_media and media_store is not None:
+                        media_messages.append((len(all_messages) + len(channel_messages) - 1, msg))
+                # Only a fully fetched channel contributes rows and a new checkpoint
+                all_messages.extend(channel_messages)
+                if checkpoints is not None:
+                    checkpoints.update(channel, newest_id, newest_date)
             except Exception as e:
                 print(f"Error fetching from {channel}: {e}")
+                media_messages = [(row, msg) for row, msg in media_messages if row < len(all_messages)]
+
+        # Media stage: concurrent downloads into the content-addressed store
+        stored = run_media_stage(client, [msg for _, msg in media_messages], media_store, media_workers)
+
+    for row in all_messages:
+        row.extend(['', ''])
+    for (row, _), media in zip(media_messages, stored):
+        if media is not None:
+            all_messages[row][-2:] = media
     return all_messages
 
-def store_data(messages):
-    """Store messages in structured format"""
-    df = pd.DataFrame(messages, columns=['ID', 'Sender', 'Timestamp', 'Message', 'Type', 'Channel Title', 'Channel Username'])
+def store_data(messages, output_path=OUTPUT_PATH):
+    """Append messages in structured format (header only for a new file)"""
+    df = pd.DataFrame(messages, columns=COLUMNS)
     df['Timestamp'] = df['Timestamp'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M:%S'))
-    df.to_csv(os.path.join(os.path.dirname(__file__), '..', 'data', 'raw_telegram_messages.csv'), index=False)
+    is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    with open(output_path, 'a', encoding='utf-8', newline='') as file:
+        df.to_csv(file, index=False, header=is_new)
+        file.flush()
+        os.fsync(file.fileno())
     print("Data saved successfully!")
 
 if __name__ == "__main__":
-    messages = fetch_messages()
+    checkpoints = ScrapeCheckpointStore(CHECKPOINT_PATH)
+    messages = fetch_messages(create_client(), checkpoints, media_store=ContentAddressedStore())
     if messages:
         store_data(messages)
+        checkpoints.commit()
     else:
         print("No messages fetched!")
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import uuid
+
+MEDIA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'media')
+
+class ContentAddressedStore:
+    """Directory of media files named by the SHA-256 of their bytes
+
+    Identical content is stored once no matter how often it is reposted:
+    ``<root>/<h[:2]>/<h[2:4]>/<h><ext>``. Downloads are staged in
+    ``<root>/tmp`` so they can be moved into place with one rename.
+    """
+    def __init__(self, root=MEDIA_DIR):
+        self.root = root
+
+    def path_for(self, digest, extension=''):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}{extension}")
+
+    def temp_path(self):
+        """Fresh staging path on the same file system as the store"""
+        directory = os.path.join(self.root, 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{uuid.uuid4().hex}.tmp")
+
+    def put(self, data, extension=''):
+        """Store bytes unless already present; return ``(digest, path, is_new)``"""
+        tmp_path = self.temp_path()
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        return self.put_file(tmp_path, extension, hashlib.sha256(data).hexdigest())
+
+    def put_file(self, tmp_path, extension='', digest=None):
+        """Move a staged file into place (or drop it if already stored); return ``(digest, path, is_new)``
+
+        ``digest`` is computed from the file in blocks when not given.
+        """
+        if digest is None:
+            digest = file_digest(tmp_path)
+        path = self.path_for(digest, extension)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return digest, path, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return digest, path, True
+
+class HashingWriter:
+    """Writable file wrapper that hashes and counts the bytes passing through it"""
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+def file_digest(file_path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def media_extension(message):
+    """File extension for a message's photo or document"""
+    if getattr(message, 'photo', None):
+        return '.jpg'
+    document = getattr(message, 'document', None)
+    mime_type = getattr(document, 'mime_type', None)
+    return (mimetypes.guess_extension(mime_type) or '') if mime_type else ''
+
+async def download_media(client, messages, store, workers=4):
+    """Download media for ``messages`` with ``workers`` concurrent downloads
+
+    ``client`` only needs an awaitable ``download_media(message, file=...)``
+    that writes to a file object. Each download is streamed to a staging
+    file and hashed chunk by chunk, so documents are never held in memory.
+    Returns a list aligned with ``messages`` of ``(digest, path)``, or None
+    where the download failed (message IDs are only unique per channel).
+    """
+    queue = asyncio.Queue()
+    for index, message in enumerate(messages):
+        queue.put_nowait((index, message))
+    results = [None] * len(messages)
+    counters = {'new': 0, 'duplicate': 0, 'failed': 0}
+
+    async def worker():
+        while True:
+            try:
+                index, message = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            tmp_path = store.temp_path()
+            try:
+                with open(tmp_path, 'wb') as file:
+                    writer = HashingWriter(file)
+                    await client.download_media(message, file=writer)
+                if not writer.size:
+                    raise ValueError("empty download")
+                # The rename (and directory creation) runs off the event loop
+                digest, path, is_new = await asyncio.to_thread(
+                    store.put_file, tmp_path, media_extension(message), writer.hexdigest()
+                )
+                results[index] = (digest, path)
+                counters['new' if is_new else 'duplicate'] += 1
+            except Exception as e:
+                counters['failed'] += 1
+                print(f"Error downloading media for message {message.id}: {e}")
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    print(f"Media: {counters['new']} stored, {counters['duplicate']} duplicates, "
+          f"{counters['failed']} failed")
+    return results
+
+def run_media_stage(client, messages, store, workers=4):
+    """Run ``download_media`` to completion from synchronous code"""
+    if not messages:
+        return []
+    loop = getattr(client, 'loop', None)
+    if loop is not None:
+        return loop.run_until_complete(download_media(client, messages, store, workers))
+    return asyncio.run(download_media(client, messages, store, workers))
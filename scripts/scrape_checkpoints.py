@@ -0,0 +1,44 @@
+import json
+import os
+
+class ScrapeCheckpointStore:
+    """Persistent per-channel record of the newest message already saved
+
+    Checkpoints live in a small JSON file that is replaced atomically on
+    every commit, so a crash leaves either the old or the new state on disk.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._state = {}
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as file:
+                self._state = json.load(file)
+
+    def last_id(self, channel):
+        """ID of the newest saved message for ``channel`` (0 means fetch everything)"""
+        return self._state.get(channel, {}).get('last_id', 0)
+
+    def last_date(self, channel):
+        """ISO date of the newest saved message for ``channel``, or None"""
+        return self._state.get(channel, {}).get('last_date')
+
+    def update(self, channel, last_id, last_date=None):
+        """Advance a channel's checkpoint in memory (never moves backwards)"""
+        if last_id <= self.last_id(channel):
+            return
+        self._state[channel] = {
+            'last_id': int(last_id),
+            'last_date': last_date.isoformat() if hasattr(last_date, 'isoformat') else last_date,
+        }
+
+    def commit(self):
+        """Durably write all checkpoints (write temp file, fsync, rename)"""
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._state, file, indent=2, sort_keys=True)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.file_path)
+
@@ -1,9 +1,14 @@
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
 import csv
 import os
 import asyncio
+import time
+from contextlib import asynccontextmanager
 from functools import wraps
 from dotenv import load_dotenv
+from scripts.scrape_checkpoints import ScrapeCheckpointStore
+from src import instrumentation
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
@@ -13,9 +18,18 @@ API_ID = os.getenv('API_ID')
 API_HASH = os.getenv('API_HASH')
 PHONE_NUMBER = os.getenv('PHONE_NUMBER')
 
-print(f"API_ID: {API_ID}")
-print(f"API_HASH: {API_HASH}")
-print(f"PHONE_NUMBER: {PHONE_NUMBER}")
+OUTPUT_PATH = 'C:/Users/ibsan/Desktop/TenX/week-5/data/telegram_data.csv'
+CHECKPOINT_PATH = 'C:/Users/ibsan/Desktop/TenX/week-5/data/scrape_checkpoints.json'
+REPORT_PATH = 'C:/Users/ibsan/Desktop/TenX/week-5/data/scrape_report.json'
+
+# Ingestion scheduler settings
+QUEUE_MAXSIZE = 64           # batches buffered between scrapers and writer (backpressure)
+WRITE_BATCH_SIZE = 2_000     # rows handed to writerows at once
+FLUSH_INTERVAL = 5.0         # seconds between periodic flushes
+MAX_CONCURRENT_CHANNELS = 4
+REQUESTS_PER_SECOND = 1.0    # sustained page-request rate across all channels
+REQUEST_BURST = 5
+MAX_FLOOD_RETRIES = 3
 
 # Metaprogramming: Channel registration through decorators
 channels_to_scrape = []
@@ -46,43 +60,145 @@ def register_channels():
 
 # Functional Programming: Error handler decorator
 def handle_errors(func):
-    """Decorator to handle exceptions in async functions"""
+    """Decorator recording exceptions of async functions in the run report before re-raising them"""
     @wraps(func)
     async def wrapper(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
         except Exception as e:
-            print(f"Error in {func.__name__}: {str(e)}")
+            instrumentation.record_error(func.__name__, e)
+            raise
     return wrapper
 
 # Context Manager for CSV writing
 class CSVWriter:
-    """Context manager for handling CSV file operations"""
+    """Context manager for append-only CSV output (header written once)"""
     def __init__(self, filename):
         self.filename = filename
         self.file = None
         self.writer = None
 
     def __enter__(self):
-        self.file = open(self.filename, 'w', newline='', encoding='utf-8')
+        is_new = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        self.file = open(self.filename, 'a', newline='', encoding='utf-8')
         self.writer = csv.writer(self.file)
-        self.writer.writerow(['Channel Title', 'Channel Username', 'ID', 'Message', 'Date'])
+        if is_new:
+            self.writer.writerow(['Channel Title', 'Channel Username', 'ID', 'Message', 'Date'])
         return self
 
+    def flush(self):
+        """Push buffered rows to disk before a checkpoint refers to them"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.file:
             self.file.close()
 
+class ChannelDone:
+    """Queue marker: every message of a channel up to ``last_id`` has been queued"""
+    def __init__(self, channel, last_id, last_date):
+        self.channel = channel
+        self.last_id = last_id
+        self.last_date = last_date
+
+# Rate limiting shared by all scrapers
+class TokenBucket:
+    """Async token bucket pacing Telegram requests, with flood-wait back-off"""
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=REQUEST_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def back_off(self, seconds):
+        """Block every scraper for ``seconds`` (a server flood wait) and drain the burst"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+# Per-channel throughput counters
+class ChannelStats:
+    """Throughput counters for one channel, reported once instead of per message"""
+    def __init__(self, channel):
+        self.channel = channel
+        self.messages = 0
+        self.requests = 0
+        self.flood_waits = 0
+        self.started = time.perf_counter()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.messages / elapsed if elapsed else 0.0
+        return (f"{self.channel}: {self.messages} messages, {self.requests} requests, "
+                f"{self.flood_waits} flood waits in {elapsed:.1f}s ({rate:.1f} msg/s)")
+
 # Coroutine for writing to CSV
-async def write_csv(queue):
-    """Coroutine to write data from queue to CSV"""
-    with CSVWriter('C:/Users/ibsan/Desktop/TenX/week-5/data/telegram_data.csv') as csv_writer:
-        while True:
-            item = await queue.get()
-            if item is None:  # Termination signal
-                break
-            csv_writer.writer.writerow(item)
-            queue.task_done()
+async def write_csv(queue, output_path=OUTPUT_PATH, checkpoints=None,
+                    batch_size=WRITE_BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+    """Coroutine to write row batches from queue to CSV
+
+    Whatever is already queued is drained into one ``writerows`` call (up to
+    ``batch_size`` rows), and the file is flushed every ``flush_interval``
+    seconds. A ``ChannelDone`` marker arrives after all of that channel's
+    rows, so its checkpoint is committed only once those rows are on disk.
+    """
+    with CSVWriter(output_path) as csv_writer:
+        last_flush = time.monotonic()
+        done = False
+        while not done:
+            items = [await queue.get()]
+            rows = len(items[0]) if isinstance(items[0], list) else 0
+            while rows < batch_size and not queue.empty():
+                items.append(queue.get_nowait())
+                if isinstance(items[-1], list):
+                    rows += len(items[-1])
+
+            started = time.perf_counter()
+            pending = []
+            for item in items:
+                if item is None:  # Termination signal
+                    done = True
+                elif isinstance(item, ChannelDone):
+                    csv_writer.writer.writerows(pending)
+                    pending = []
+                    if checkpoints is not None:
+                        csv_writer.flush()
+                        last_flush = time.monotonic()
+                        checkpoints.update(item.channel, item.last_id, item.last_date)
+                        checkpoints.commit()
+                else:
+                    pending.extend(item)
+                queue.task_done()
+            csv_writer.writer.writerows(pending)
+            instrumentation.observe('scrape.write_batch', time.perf_counter() - started)
+            instrumentation.count('scrape.rows_written', rows)
+
+            if time.monotonic() - last_flush >= flush_interval:
+                csv_writer.file.flush()
+                last_flush = time.monotonic()
+
+@asynccontextmanager
+async def _channel_stage():
+    """Time one channel's scrape as a stage of the current run monitor"""
+    with instrumentation.stage('channel'):
+        yield
 
 # Generator function for message batches
 async def message_batcher(messages, batch_size=100):
@@ -98,48 +214,116 @@ async def message_batcher(messages, batch_size=100):
 
 # Enhanced scraping function with error handling
 @handle_errors
-async def scrape_channel(client, channel_username, queue):
-    """Scrape messages from a channel and put them in the queue"""
-    entity = await client.get_entity(channel_username)
-    channel_title = entity.title
-    
-    # Using generator for batch processing
-    async for batch in message_batcher(client.iter_messages(entity, limit=10_000)):
-        for message in batch:
-            await queue.put([
-                channel_title,
-                channel_username,
-                message.id,
-                message.message,
-                message.date
-            ])
-            print(f"Scraped message ID {message.id} from {channel_title}")
-
-# Client initialization with performance optimizations
-client = TelegramClient('scraping_session', API_ID, API_HASH).start()
-
-async def main():
-    # Create processing queue
-    queue = asyncio.Queue()
+async def scrape_channel(client, channel_username, queue, checkpoints=None, limit=10_000,
+                         semaphore=None, rate_limiter=None, stats=None):
+    """Scrape messages newer than the channel checkpoint and put row batches in the queue
+
+    Messages are fetched oldest first, upwards from the checkpoint, so when
+    ``limit`` cuts a run short the checkpoint only covers what was queued and
+    the next run continues from there. ``semaphore`` caps how many channels
+    run at once and ``rate_limiter`` paces page requests. On a flood wait
+    every scraper backs off and this one resumes above the newest message it
+    already queued.
+    """
+    semaphore = semaphore or asyncio.Semaphore(1)
+    rate_limiter = rate_limiter or TokenBucket()
+    async with semaphore, _channel_stage():
+        stats = stats or ChannelStats(channel_username)
+        await rate_limiter.acquire()
+        entity = await client.get_entity(channel_username)
+        channel_title = entity.title
+        min_id = checkpoints.last_id(channel_username) if checkpoints is not None else 0
+        newest_id, newest_date = min_id, None
+        offset_id = min_id  # with reverse=True, only messages above offset_id are returned
+        retries = 0
+
+        while True:
+            try:
+                await rate_limiter.acquire()
+                stats.requests += 1
+                messages = client.iter_messages(
+                    entity, limit=limit - stats.messages, min_id=min_id, offset_id=offset_id,
+                    reverse=True,
+                )
+                # Using generator for batch processing (one batch per page request)
+                page_started = time.perf_counter()
+                async for batch in message_batcher(messages):
+                    instrumentation.observe('scrape.page', time.perf_counter() - page_started)
+                    await queue.put([
+                        [channel_title, channel_username, message.id, message.message, message.date]
+                        for message in batch
+                    ])
+                    stats.messages += len(batch)
+                    # Oldest first: the last message of a batch is the newest queued so far
+                    offset_id = batch[-1].id
+                    newest_id, newest_date = batch[-1].id, batch[-1].date
+                    await rate_limiter.acquire()
+                    stats.requests += 1
+                    page_started = time.perf_counter()
+                break
+            except FloodWaitError as e:
+                stats.flood_waits += 1
+                instrumentation.count('scrape.flood_waits')
+                retries += 1
+                if retries > MAX_FLOOD_RETRIES:
+                    raise
+                rate_limiter.back_off(e.seconds)
+
+    # Only a completed scrape may advance the checkpoint; every message between
+    # the old checkpoint and newest_id has been queued by now
+    if newest_id > min_id:
+        await queue.put(ChannelDone(channel_username, newest_id, newest_date))
+    instrumentation.count('scrape.messages', stats.messages)
+    instrumentation.count('scrape.requests', stats.requests)
+    instrumentation.count(f"scrape.messages.{channel_username}", stats.messages)
+    return stats
+
+def create_client():
+    """Build and start the Telegram client"""
+    return TelegramClient('scraping_session', API_ID, API_HASH).start()
+
+async def main(client, output_path=OUTPUT_PATH, checkpoint_path=CHECKPOINT_PATH,
+               max_concurrent_channels=MAX_CONCURRENT_CHANNELS, queue_maxsize=QUEUE_MAXSIZE,
+               report_path=REPORT_PATH):
+    with instrumentation.monitored_run('scrape', report_path) as monitor:
+        results = await _scrape_all(client, output_path, checkpoint_path,
+                                    max_concurrent_channels, queue_maxsize)
+    for stats in results:
+        print(stats.report() if isinstance(stats, ChannelStats) else f"Channel failed: {stats!r}")
+    print("\n".join(monitor.summary_lines()))
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        raise failures[0]
+
+async def _scrape_all(client, output_path, checkpoint_path, max_concurrent_channels, queue_maxsize):
+    # Create bounded processing queue (scrapers wait when the writer falls behind)
+    queue = asyncio.Queue(maxsize=queue_maxsize)
+    checkpoints = ScrapeCheckpointStore(checkpoint_path)
+    semaphore = asyncio.Semaphore(max_concurrent_channels)
+    rate_limiter = TokenBucket()
     
     # Start writer task
-    writer_task = asyncio.create_task(write_csv(queue))
+    writer_task = asyncio.create_task(write_csv(queue, output_path, checkpoints))
     
     # Create scraping tasks using list comprehension
     scrape_tasks = [
-        asyncio.create_task(scrape_channel(client, channel, queue))
+        asyncio.create_task(scrape_channel(client, channel, queue, checkpoints,
+                                           semaphore=semaphore, rate_limiter=rate_limiter))
         for channel in channels_to_scrape
     ]
     
-    # Run all tasks concurrently
-    await asyncio.gather(*scrape_tasks)
+    # Run all tasks concurrently (at most max_concurrent_channels scrape at once);
+    # a failed channel is reported after the others finish instead of cancelling them
+    results = await asyncio.gather(*scrape_tasks, return_exceptions=True)
     
     # Signal writer to finish
     await queue.put(None)
     await writer_task
+    return results
 
 # Run the program
 if __name__ == '__main__':
+    client = create_client()
     with client:
-        client.loop.run_until_complete(main())
+        client.loop.run_until_complete(main(client))
 
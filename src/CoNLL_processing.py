@@ -1,21 +1,74 @@
+import numpy as np
 import pandas as pd
-import re
-from functools import lru_cache
+import os
+import json
+import itertools
+from collections import Counter
 from contextlib import contextmanager
-import time
+from src.gazetteer import GazetteerMatcher
+from src.normalization import fold_key, normalize_series, normalize_text
+from src.tokenization import PRICE_KINDS, PRICE_TOKEN_PATTERN, token_kind, tokenize, tokenize_typed
+from src.columnar_storage import iter_column_chunks
+from src import instrumentation
+
+# Entity lists in labeling priority order (an entry listed twice keeps the first type)
+ENTITY_TYPES = (
+    ('locations', 'LOC'),
+    ('products', 'PRODUCT'),
+    ('price_indicators', 'PRICE'),
+)
 
 class CoNLLFormatter:
-    def __init__(self):
-        """Initialize entity flags and entity lists."""
+    def __init__(self, gazetteer_files=None):
+        """Initialize entity flags, entity lists and the compiled gazetteer matcher.
+
+        ``gazetteer_files`` is an iterable of gazetteer paths in ``TYPE<TAB>entry``
+        format, or a mapping of path to entity type for one-entry-per-line files.
+        """
         self.inside_product = False
         self.inside_location = False
         self.inside_price = False
-        self._locations = self._load_entities('locations')
-        self._products = self._load_entities('products')
-        self._price_indicators = self._load_entities('price_indicators')
+        # Lookup sets hold normalized keys, so homophone spellings (ፀጉር/ጸጉር) match
+        self._locations = {fold_key(entry) for entry in self._load_entities('locations')}
+        self._products = {fold_key(entry) for entry in self._load_entities('products')}
+        self._price_indicators = {fold_key(entry) for entry in self._load_entities('price_indicators')}
+        self._matcher = self._build_matcher(gazetteer_files)
+        self._entity_types = self._collect_entity_types(self._matcher)
+        self.label_names = ['O'] + [
+            f"{prefix}-{entity_type}" for entity_type in self._entity_types for prefix in 'BI'
+        ]
+
+    @property
+    def matcher(self):
+        """The compiled gazetteer matcher (built-in lists plus gazetteer files)."""
+        return self._matcher
+
+    @staticmethod
+    def _collect_entity_types(matcher):
+        """Entity types in built-in priority order, followed by any gazetteer-only types."""
+        types = [entity_type for _, entity_type in ENTITY_TYPES]
+        for _, entity_type in matcher.entries():
+            if entity_type not in types:
+                types.append(entity_type)
+        return types
+
+    @classmethod
+    def _build_matcher(cls, gazetteer_files=None):
+        """Compile the built-in entity lists and external gazetteers into one matcher."""
+        matcher = GazetteerMatcher()
+        for list_name, entity_type in ENTITY_TYPES:
+            matcher.add_many(cls._load_entities(list_name, ordered=True), entity_type)
+        if gazetteer_files:
+            if isinstance(gazetteer_files, dict):
+                items = gazetteer_files.items()
+            else:
+                items = ((path, None) for path in gazetteer_files)
+            for path, entity_type in items:
+                matcher.add_file(path, entity_type)
+        return matcher
 
     @staticmethod
-    def _load_entities(entity_type):
+    def _load_entities(entity_type, ordered=False):
         """Load entity lists for locations, products, and price indicators."""
         entities = {
             'locations': [
@@ -42,12 +95,13 @@ class CoNLLFormatter:
                 'ዋጋ', 'ብር', 'ሚሊዮን', 'ሺህ', 'ኪሎ', 'ግራም', 'ሜትር', 'Price',
             ]
         }
-        return set(entities.get(entity_type, []))
+        entries = entities.get(entity_type, [])
+        return list(entries) if ordered else set(entries)
 
-    @lru_cache(maxsize=1000)
-    def tokenize_message(self, message):
-        """Tokenize the input message into individual words."""
-        return re.findall(r'\S+', message)
+    @staticmethod
+    def tokenize_message(message):
+        """Tokenize the input message into words, numbers, currency units and punctuation."""
+        return tokenize(message)
 
     def _reset_flags(self):
         """Reset entity flags for a new message."""
@@ -57,11 +111,12 @@ class CoNLLFormatter:
 
     def label_token(self, token):
         """Label a token based on entity rules."""
-        if token in self._locations:
+        key = fold_key(token)
+        if key in self._locations:
             return self._handle_entity(token, 'LOC')
-        elif token in self._products:
+        elif key in self._products:
             return self._handle_entity(token, 'PRODUCT')
-        elif token in self._price_indicators or token.isdigit():
+        elif key in self._price_indicators or token_kind(token) in PRICE_KINDS:
             return self._handle_entity(token, 'PRICE')
         return f"{token} O"
 
@@ -87,15 +142,211 @@ class CoNLLFormatter:
         
         return f"{token} {prefix}-{entity_type}"
 
+    def label_tokens(self, tokens, kinds=None):
+        """Return BIO labels for a token sequence in a single left-to-right pass.
+
+        Gazetteer entries match as whole spans (longest match wins); unmatched
+        number and currency tokens are prices. ``kinds`` are the token kinds
+        from the scanner, classified here if not given. As in ``label_token``,
+        adjacent entities of the same type are merged into one span. State is
+        local to the call.
+        """
+        if kinds is None:
+            kinds = [token_kind(token) for token in tokens]
+        labels = ['O'] * len(tokens)
+        spans = self._matcher.find_spans(tokens)
+        span = next(spans, None)
+        previous_type = None
+        i = 0
+        while i < len(tokens):
+            if span is not None and span[0] == i:
+                start, end, entity_type = span
+                span = next(spans, None)
+            elif kinds[i] in PRICE_KINDS:
+                start, end, entity_type = i, i + 1, 'PRICE'
+            else:
+                previous_type = None
+                i += 1
+                continue
+            prefix = 'I' if entity_type == previous_type else 'B'
+            labels[start] = f"{prefix}-{entity_type}"
+            for j in range(start + 1, end):
+                labels[j] = f"I-{entity_type}"
+            previous_type = entity_type
+            i = end
+        return labels
+
+    def label_frame(self, df, column='Message'):
+        """Label a whole message column at once and return a compact token table.
+
+        Tokens are exploded once and resolved through per-vocabulary (not
+        per-token) lookups; the longest entry at each position is found by
+        comparing shifted key arrays, and matches are then accepted left to
+        right exactly as ``GazetteerMatcher.find_spans`` does. B-/I- prefixes
+        come from comparing each entity code with the previous one inside the
+        same message, which reproduces ``label_tokens``. The result has columns
+        ``message_id`` (the row label in ``df``), ``position``, ``token`` and
+        ``label_id`` indexing ``self.label_names``. Messages are normalized
+        first, so tokens come back in their normalized spelling.
+        """
+        messages = normalize_series(df[column].reset_index(drop=True).dropna())
+        tokens = messages.map(tokenize).explode().dropna()
+        rows = tokens.index.to_numpy()
+        tokens = tokens.reset_index(drop=True).astype(str)
+        n = len(tokens)
+        if n == 0:
+            return pd.DataFrame({
+                'message_id': df.index[:0], 'position': np.empty(0, dtype=np.int32),
+                'token': pd.Series(dtype=object), 'label_id': np.empty(0, dtype=np.int8),
+            })
+
+        # Per-vocabulary keys: case-folded (text is already normalized) and prefix-stripped
+        keys = tokens.str.casefold()
+        vocab = pd.unique(keys)
+        first_keys = keys.map({key: self._matcher.strip_prefix(key) for key in vocab})
+
+        type_codes = {entity_type: code for code, entity_type in enumerate(self._entity_types, 1)}
+        by_length = {}
+        for entry, entity_type in self._matcher.entries():
+            by_length.setdefault(len(entry), {})["\x1f".join(entry)] = type_codes[entity_type]
+
+        # Longest entry starting at each token (what ``GazetteerMatcher.match_at`` returns)
+        match_lengths = np.zeros(n, dtype=np.int32)
+        match_codes = np.zeros(n, dtype=np.int8)
+        for length in sorted(by_length, reverse=True):
+            joined = first_keys
+            for offset in range(1, length):
+                joined = joined + "\x1f" + keys.shift(-offset)
+            matched = joined.map(by_length[length]).fillna(0).to_numpy(dtype=np.int8)
+            if length > 1:
+                same_message = np.zeros(n, dtype=bool)
+                same_message[:n - length + 1] = rows[:n - length + 1] == rows[length - 1:]
+                matched[~same_message] = 0
+            hit = (matched > 0) & (match_lengths == 0)
+            match_lengths[hit] = length
+            match_codes[hit] = matched[hit]
+
+        # Accept matches left to right, skipping starts inside an accepted span (``find_spans``).
+        # Single-token matches never cover a later start, so only multi-word ones need the loop.
+        codes = np.zeros(n, dtype=np.int8)
+        covered = np.zeros(n, dtype=bool)
+        next_free = 0
+        for start in np.flatnonzero(match_lengths > 1):
+            if start >= next_free:
+                next_free = start + match_lengths[start]
+                codes[start:next_free] = match_codes[start]
+                covered[start:next_free] = True
+        single = (match_lengths == 1) & ~covered
+        codes[single] = match_codes[single]
+        covered |= single
+
+        prices = tokens.str.fullmatch(PRICE_TOKEN_PATTERN).to_numpy(dtype=bool) & ~covered
+        codes[prices] = type_codes['PRICE']
+
+        # B- vs I-: continue the previous entity when the code repeats within a message
+        continues = np.zeros(n, dtype=bool)
+        continues[1:] = (codes[1:] == codes[:-1]) & (rows[1:] == rows[:-1])
+        label_ids = np.where(codes > 0, 2 * codes - 1 + continues, 0).astype(np.int8)
+
+        starts = np.r_[0, np.flatnonzero(rows[1:] != rows[:-1]) + 1]
+        positions = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+        return pd.DataFrame({
+            'message_id': df.index[rows],
+            'position': positions.astype(np.int32),
+            'token': tokens.to_numpy(),
+            'label_id': label_ids,
+        })
+
     def label_message(self, message):
-        """Label all tokens in a message in CoNLL format."""
-        self._reset_flags()
-        return "\n".join(self.label_token(token) for token in self.tokenize_message(message))
+        """Label all tokens in a message in CoNLL format (no instance state is touched)."""
+        tokens, kinds = tokenize_typed(normalize_text(message))
+        return "\n".join(
+            f"{token} {label}" for token, label in zip(tokens, self.label_tokens(tokens, kinds))
+        )
 
     def process_messages(self, messages):
         """Process a list of messages and return CoNLL formatted output."""
         return "\n\n".join(self.label_message(msg) for msg in messages)
 
+    def iter_labeled_messages(self, messages, normalized=False, keys=None):
+        """Lazily yield one CoNLL sentence per non-empty message.
+
+        Messages are normalized one at a time unless ``normalized`` says the
+        caller already did it for a whole column. With ``keys`` (one per
+        message) ``(key, sentence)`` pairs are yielded instead. Message, token
+        and entity-by-type counts go to the current run monitor once the
+        iteration ends.
+        """
+        messages_seen = tokens_seen = 0
+        entities = Counter()
+        try:
+            for key, message in zip(itertools.repeat(None) if keys is None else keys, messages):
+                if not normalized:
+                    message = normalize_text(message)
+                tokens, kinds = tokenize_typed(message)
+                if not tokens:
+                    continue
+                labels = self.label_tokens(tokens, kinds)
+                messages_seen += 1
+                tokens_seen += len(tokens)
+                entities.update(label[2:] for label in labels if label[0] == 'B')
+                sentence = "\n".join(f"{token} {label}" for token, label in zip(tokens, labels))
+                yield sentence if keys is None else (key, sentence)
+        finally:
+            instrumentation.count('conll.messages', messages_seen)
+            instrumentation.count('conll.tokens', tokens_seen)
+            instrumentation.count_many(entities, prefix='conll.entities.')
+
+    def stream_csv_to_conll(self, input_path, output_path, column='Message',
+                            chunksize=10_000, limit=None, offset=0,
+                            checkpoint_path=None, buffer_size=1 << 20):
+        """Label a message CSV (or Parquet) file chunk by chunk and append CoNLL sentences to disk.
+
+        Only ``column`` is read. Peak memory is bounded by ``chunksize``. ``offset`` skips leading data
+        rows and ``limit`` caps the number of non-null messages labeled after it
+        (empty rows are skipped, not counted). With a ``checkpoint_path`` the
+        row, message and byte position are committed after every chunk, and a
+        rerun resumes from there (discarding any partial write).
+        Returns the number of sentences written in this run.
+        """
+        checkpoint = _read_checkpoint(checkpoint_path)
+        resume = checkpoint is not None and os.path.exists(output_path)
+        rows_done = checkpoint['rows'] if resume else 0
+        messages_done = checkpoint.get('messages', rows_done) if resume else 0
+        if limit is not None and messages_done >= limit:
+            return 0
+
+        reader = iter_column_chunks(input_path, column, chunksize, skip=offset + rows_done)
+        written = 0
+        with open(output_path, 'r+b' if resume else 'wb', buffering=buffer_size) as file:
+            if resume:
+                file.truncate(checkpoint['bytes'])
+                file.seek(checkpoint['bytes'])
+            while limit is None or messages_done < limit:
+                with instrumentation.stage('read'):
+                    chunk = next(reader, None)
+                if chunk is None:
+                    break
+                messages = chunk.dropna()
+                if limit is not None and len(messages) > limit - messages_done:
+                    # Stop right after the last message taken, so a resume starts at the next row
+                    messages = messages.iloc[:limit - messages_done]
+                    chunk = chunk.iloc[:chunk.index.get_loc(messages.index[-1]) + 1]
+                with instrumentation.stage('label'):
+                    for sentence in self.iter_labeled_messages(normalize_series(messages), normalized=True):
+                        file.write(sentence.encode('utf-8'))
+                        file.write(b"\n\n")
+                        written += 1
+                rows_done += len(chunk)
+                messages_done += len(messages)
+                if checkpoint_path:
+                    with instrumentation.stage('checkpoint'):
+                        file.flush()
+                        _write_checkpoint(checkpoint_path, {
+                            'rows': rows_done, 'messages': messages_done, 'bytes': file.tell(),
+                        })
+        return written
+
     @contextmanager
     def file_handler(self, file_path, mode='w'):
         """Context manager for file handling."""
@@ -112,31 +363,34 @@ class CoNLLFormatter:
         with self.file_handler(file_path) as file:
             file.write(labeled_messages)
 
+def _read_checkpoint(checkpoint_path):
+    """Return the saved streaming checkpoint, or None if there is none."""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def _write_checkpoint(checkpoint_path, state):
+    """Atomically replace the checkpoint file with ``state``."""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
 def main():
     """Main function to execute the program."""
-    start_time = time.time()
-    
-    try:
-        # Load the dataset
-        input_file_path = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
-        df = pd.read_csv(input_file_path, encoding='utf-8')
+    input_file_path = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
+    output_file_path = "C:/Users/ibsan/Desktop/TenX/week-5/data/labeled_messages.conll"
 
-        # Select the "Message" column
-        messages = df['Message'].dropna().tolist()[:50]  # Process 50 messages
-
-        # Process the messages
+    # Stream the "Message" column through the formatter (first 50 messages)
+    with instrumentation.monitored_run('conll', report_path=f"{output_file_path}.report.json") as monitor:
         formatter = CoNLLFormatter()
-        labeled_messages = formatter.process_messages(messages)
-
-        # Save the labeled messages
-        output_file_path = "C:/Users/ibsan/Desktop/TenX/week-5/data/labeled_messages.conll"
-        formatter.save_to_txt(labeled_messages, output_file_path)
-
-        print(f"Labeled messages saved successfully to {output_file_path}")
-        print(f"Execution time: {time.time() - start_time:.2f} seconds")
+        count = formatter.stream_csv_to_conll(input_file_path, output_file_path, limit=50)
 
-    except Exception as e:
-        print(f"Error occurred: {str(e)}")
+    print(f"{count} labeled messages saved successfully to {output_file_path}")
+    print("\n".join(monitor.summary_lines()))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
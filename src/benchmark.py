@@ -0,0 +1,339 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from src.instrumentation import monitored_run, peak_rss_mb
+
+LABEL_NAMES = ['O', 'B-LOC', 'I-LOC', 'B-PRODUCT', 'I-PRODUCT', 'B-PRICE', 'I-PRICE']
+SAMPLE_WORDS = [
+    'በአዲስ', 'አበባ', 'ውስጥ', 'አዲስ', 'ስልክ', 'በ', '5000', 'ብር', 'ይገኛል።', 'ዋጋ', '1500',
+    'ቦሌ', 'መገናኛ', 'ጫማ', 'ልብስ', 'ቦርሳ', 'ሰዓት', 'ለማዘዝ', 'ይደውሉ', '0911223344',
+    'ፒያሳ', 'ቤት', 'ድረስ', 'እናደርሳለን', 'ጥራት', 'ያለው', 'ምርት', '2500', 'ቅናሽ', 'ብቻ',
+]
+# Prices and units glued to their neighbours, as scraped messages write them
+GLUED_SAMPLE_WORDS = ['5000ብር', 'ዋጋ:-1500', '2,500', 'ብር።', '1500birr', 'ዋጋ፦', '(0911223344)']
+CSV_FIELDS = [
+    'model', 'threads', 'batch_size', 'messages', 'tokens', 'seconds', 'messages_per_s',
+    'tokens_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'load_time_s', 'peak_rss_mb',
+]
+
+# ==============================================
+# Corpus and tiny checkpoints
+# ==============================================
+
+def sample_corpus(size=256, seed=0, min_words=4, max_words=60, words=SAMPLE_WORDS):
+    """Fixed pseudo-random corpus of Telegram-like messages with varied lengths"""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(words) for _ in range(rng.randint(min_words, max_words)))
+        for _ in range(size)
+    ]
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip()]
+
+def build_tiny_checkpoints(output_dir, corpus, seed=0):
+    """Save randomly initialized BERT, DistilBERT and XLM-R sized-down checkpoints
+
+    They share a word-level tokenizer built from ``corpus``, so no network
+    access is needed; timings are only meaningful relative to each other.
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+    from transformers import (
+        AutoModelForTokenClassification, BertConfig, DistilBertConfig, PreTrainedTokenizerFast,
+        XLMRobertaConfig,
+    )
+
+    special_tokens = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+    backend = Tokenizer(models.WordLevel(unk_token='[UNK]'))
+    backend.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    backend.train_from_iterator(corpus, trainers.WordLevelTrainer(special_tokens=special_tokens))
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, pad_token='[PAD]', unk_token='[UNK]', cls_token='[CLS]',
+        sep_token='[SEP]', mask_token='[MASK]', model_input_names=['input_ids', 'attention_mask'],
+    )
+
+    labels = dict(id2label=dict(enumerate(LABEL_NAMES)),
+                  label2id={label: i for i, label in enumerate(LABEL_NAMES)})
+    vocab_size = backend.get_vocab_size()
+    configs = {
+        'tiny-bert': BertConfig(vocab_size=vocab_size, hidden_size=32, num_hidden_layers=2,
+                                num_attention_heads=2, intermediate_size=64, **labels),
+        'tiny-distilbert': DistilBertConfig(vocab_size=vocab_size, dim=32, n_layers=1, n_heads=2,
+                                            hidden_dim=64, **labels),
+        'tiny-xlm-roberta': XLMRobertaConfig(vocab_size=vocab_size, hidden_size=32, num_hidden_layers=2,
+                                             num_attention_heads=2, intermediate_size=64,
+                                             pad_token_id=0, type_vocab_size=1, **labels),
+    }
+    paths = []
+    for name, config in configs.items():
+        torch.manual_seed(seed)
+        path = os.path.join(output_dir, name)
+        AutoModelForTokenClassification.from_config(config).save_pretrained(path)
+        tokenizer.save_pretrained(path)
+        paths.append(path)
+    return paths
+
+# ==============================================
+# Measurement
+# ==============================================
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def benchmark_checkpoint(model_path, corpus, batch_sizes=(1, 8, 32), thread_counts=(1,),
+                         repeats=1, warmup=2):
+    """Time ``NERPredictor`` on ``corpus`` for every thread count and batch size
+
+    Latency percentiles are per ``predict_batch`` call. ``tokens`` is the
+    ``inference.subword_tokens`` count the predictor records for the timed
+    calls, so it covers normalization and overlapping windows. Returns one
+    row per ``(threads, batch_size)`` combination. ``load_time_s`` covers
+    reading the checkpoint only; torch and transformers are imported before
+    the timer.
+    """
+    import torch
+    from transformers import AutoModelForTokenClassification, AutoTokenizer  # noqa: F401 (import cost)
+    from src.ner_inference import NERPredictor
+
+    started = time.perf_counter()
+    predictor = NERPredictor.from_pretrained(model_path)
+    load_time = time.perf_counter() - started
+
+    name = os.path.basename(os.path.normpath(model_path))
+
+    rows = []
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        for batch_size in batch_sizes:
+            predictor.batch_size = batch_size
+            batches = [corpus[i:i + batch_size] for i in range(0, len(corpus), batch_size)]
+            for batch in batches[:warmup]:
+                predictor.predict_batch(batch)
+
+            timings = []
+            with monitored_run('benchmark') as monitor:
+                for _ in range(repeats):
+                    for batch in batches:
+                        start = time.perf_counter()
+                        predictor.predict_batch(batch)
+                        timings.append(time.perf_counter() - start)
+            token_count = monitor.counters['inference.subword_tokens']
+            total = sum(timings)
+            ordered = sorted(timings)
+            rows.append({
+                'model': name,
+                'threads': threads,
+                'batch_size': batch_size,
+                'messages': len(corpus) * repeats,
+                'tokens': token_count,
+                'seconds': total,
+                'messages_per_s': len(corpus) * repeats / total,
+                'tokens_per_s': token_count / total,
+                'p50_ms': statistics.median(ordered) * 1000,
+                'p95_ms': percentile(ordered, 0.95) * 1000,
+                'p99_ms': percentile(ordered, 0.99) * 1000,
+                'load_time_s': load_time,
+                'peak_rss_mb': peak_rss_mb(),
+            })
+    return rows
+
+def run_benchmarks(model_paths, corpus, isolate=True, **kwargs):
+    """Benchmark each checkpoint, by default in a fresh process so load time and peak RSS are its own"""
+    rows = []
+    for model_path in model_paths:
+        if isolate:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                rows.extend(executor.submit(benchmark_checkpoint, model_path, corpus, **kwargs).result())
+        else:
+            rows.extend(benchmark_checkpoint(model_path, corpus, **kwargs))
+    return rows
+
+# ==============================================
+# Import time
+# ==============================================
+
+def _import_profile(module):
+    """``python -X importtime`` cumulative microseconds per imported module, in a fresh interpreter"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=root, capture_output=True, text=True)
+    if result.returncode:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+def benchmark_imports(modules, repeats=5, top=5):
+    """Median cold import time of each module and the heaviest packages it pulls in"""
+    rows = []
+    for module in modules:
+        try:
+            profiles = [_import_profile(module) for _ in range(repeats)]
+        except ImportError as e:
+            rows.append({'module': module, 'import_ms': None, 'heaviest': [], 'error': str(e)})
+            continue
+        packages = {}
+        for name, total in profiles[len(profiles) // 2].items():
+            package = name.split('.')[0]
+            if package not in ('src', 'scripts'):
+                packages[package] = max(packages.get(package, 0), total)
+        rows.append({
+            'module': module,
+            'import_ms': statistics.median(profile[module] for profile in profiles) / 1000,
+            'heaviest': [(package, total / 1000) for package, total in
+                         sorted(packages.items(), key=lambda item: -item[1])[:top]],
+            'error': None,
+        })
+    return rows
+
+def print_import_times(rows):
+    for row in rows:
+        if row['error']:
+            print(f"{row['module']:<32}{'failed':>10}  {row['error']}")
+            continue
+        heaviest = ', '.join(f"{package} {ms:.0f}" for package, ms in row['heaviest'])
+        print(f"{row['module']:<32}{row['import_ms']:8.0f}ms  {heaviest}")
+
+# ==============================================
+# Tokenizer
+# ==============================================
+
+def _whitespace_tokenizer():
+    """The tokenizer ``CoNLLFormatter`` used before the scanner: cached ``\\S+`` splitting"""
+    return lru_cache(maxsize=1000)(lambda message: re.findall(r'\S+', message))
+
+def benchmark_tokenizers(corpus, repeats=5):
+    """Messages and tokens per second of the whitespace tokenizer and the scanner entry points
+
+    Each pass starts from empty caches (a fresh ``lru_cache`` for the
+    whitespace split, an empty word memo for the scanner), so the timings
+    include the cost of scanning every distinct word once. The best of
+    ``repeats`` passes is kept.
+    """
+    from src import tokenization
+
+    tokenizers = {
+        'whitespace (lru_cache)': None,
+        'scanner tokenize': tokenization.tokenize,
+        'scanner tokenize_typed': tokenization.tokenize_typed,
+        'scanner token_spans': tokenization.token_spans,
+        'scanner scan': tokenization.scan,
+    }
+    rows = []
+    for name, tokenizer in tokenizers.items():
+        timings = []
+        for _ in range(repeats):
+            function = tokenizer or _whitespace_tokenizer()
+            tokenization.clear_word_cache()
+            start = time.perf_counter()
+            for message in corpus:
+                function(message)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        tokens = sum(len(tokenization.tokenize(message)) if tokenizer else len(message.split())
+                     for message in corpus)
+        rows.append({
+            'tokenizer': name,
+            'messages': len(corpus),
+            'tokens': tokens,
+            'seconds': best,
+            'messages_per_s': len(corpus) / best,
+            'tokens_per_s': tokens / best,
+        })
+    return rows
+
+def print_tokenizer_results(rows):
+    print(f"{'tokenizer':<26}{'tokens':>9}{'msg/s':>12}{'tok/s':>12}")
+    for row in rows:
+        print(f"{row['tokenizer']:<26}{row['tokens']:>9}"
+              f"{row['messages_per_s']:12.0f}{row['tokens_per_s']:12.0f}")
+
+# ==============================================
+# Reporting
+# ==============================================
+
+def write_results(rows, json_path=None, csv_path=None, metadata=None):
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump({'metadata': metadata or {}, 'results': rows}, file, indent=2)
+    if csv_path:
+        with open(csv_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+def print_results(rows):
+    print(f"{'model':<24}{'thr':>4}{'batch':>6}{'msg/s':>9}{'tok/s':>10}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'load s':>8}{'RSS MB':>8}")
+    for row in rows:
+        rss = f"{row['peak_rss_mb']:8.0f}" if row['peak_rss_mb'] is not None else f"{'-':>8}"
+        print(f"{row['model']:<24}{row['threads']:>4}{row['batch_size']:>6}"
+              f"{row['messages_per_s']:9.1f}{row['tokens_per_s']:10.0f}"
+              f"{row['p50_ms']:9.2f}{row['p95_ms']:9.2f}{row['p99_ms']:9.2f}"
+              f"{row['load_time_s']:8.2f}{rss}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput, latency and memory benchmark for NER checkpoints")
+    parser.add_argument('model_paths', nargs='*')
+    parser.add_argument('--tiny', metavar='DIR',
+                        help="Build tiny randomly initialized checkpoints in DIR and benchmark those (for CI)")
+    parser.add_argument('--corpus', help="Text file with one sample message per line")
+    parser.add_argument('--corpus-size', type=int, default=256)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1])
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--json', dest='json_path', default='benchmark.json')
+    parser.add_argument('--csv', dest='csv_path', default='benchmark.csv')
+    parser.add_argument('--no-isolate', action='store_true', help="Run all checkpoints in this process")
+    parser.add_argument('--tokenizers', action='store_true',
+                        help="Benchmark the message tokenizers instead of checkpoints")
+    args = parser.parse_args(argv)
+
+    if args.tokenizers:
+        corpus = load_corpus(args.corpus) if args.corpus else sample_corpus(
+            args.corpus_size, words=SAMPLE_WORDS + GLUED_SAMPLE_WORDS)
+        rows = benchmark_tokenizers(corpus, repeats=max(args.repeats, 5))
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as file:
+                json.dump({'metadata': {'messages': len(corpus)}, 'results': rows}, file, indent=2)
+        print_tokenizer_results(rows)
+        return
+
+    corpus = load_corpus(args.corpus) if args.corpus else sample_corpus(args.corpus_size)
+    model_paths = list(args.model_paths)
+    if args.tiny:
+        model_paths += build_tiny_checkpoints(args.tiny, corpus)
+    if not model_paths:
+        parser.error("give checkpoint paths or --tiny DIR")
+
+    rows = run_benchmarks(model_paths, corpus, isolate=not args.no_isolate,
+                          batch_sizes=args.batch_sizes, thread_counts=args.threads,
+                          repeats=args.repeats)
+    write_results(rows, args.json_path, args.csv_path, metadata={
+        'corpus': args.corpus or f"sample_corpus({args.corpus_size})",
+        'messages': len(corpus),
+        'cpu_count': os.cpu_count(),
+    })
+    print_results(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import importlib
+import sys
+
+# ethiomart command line: ``python -m src <command> ...``
+# Only the standard library is imported here. Each command imports the modules
+# it needs (pandas, matplotlib, torch, transformers, telethon) when it runs, so
+# --help, cron jobs and workers pay only for what they use.
+
+# Commands that forward their arguments to an existing module's ``main(argv)``
+DELEGATED_COMMANDS = {
+    'bench': ('src.benchmark', "Throughput, latency and memory benchmark for NER checkpoints"),
+    'incremental': ('src.incremental', "Incrementally preprocess and label new or edited messages"),
+    'eda': ('src.eda', "Single-pass EDA statistics and headless plots"),
+    'dedup': ('src.dedup', "Drop near-duplicate messages with MinHash LSH"),
+    'index': ('src.entity_index', "Build or query the entity index"),
+    'explain': ('src.explanations', "LIME / SHAP explanations for predicted entities"),
+    'export': ('src.model_export', "Export and quantize a checkpoint"),
+    'serve': ('src.ner_server', "Micro-batching NER HTTP server"),
+}
+
+# Modules each command imports, for the import-time benchmark
+COMMAND_MODULES = {
+    'cli': 'src.cli',
+    'scrape': 'scripts.telegram_scraper',
+    'preprocess': 'src.data_preprocessing',
+    'label': 'src.CoNLL_processing',
+    'predict': 'src.ner_inference',
+    **{command: module for command, (module, _) in DELEGATED_COMMANDS.items()},
+}
+
+# ==============================================
+# Commands
+# ==============================================
+
+def run_scrape(args):
+    from scripts import telegram_scraper
+
+    client = telegram_scraper.create_client()
+    with client:
+        client.loop.run_until_complete(telegram_scraper.main(
+            client, args.output, args.checkpoints,
+            max_concurrent_channels=args.concurrency, report_path=args.report,
+        ))
+
+def run_preprocess(args):
+    from src import instrumentation
+    from src.data_preprocessing import preprocess_telegram_data
+
+    deduplicator = None
+    if args.dedup:
+        from src.dedup import load_or_create
+        deduplicator = load_or_create(args.dedup)
+    with instrumentation.monitored_run('preprocess', args.report) as monitor:
+        rows = preprocess_telegram_data(args.input, args.output, args.chunksize,
+                                        return_data=False, deduplicator=deduplicator)
+    if deduplicator is not None:
+        deduplicator.save(args.dedup)
+    print(f"{rows} cleaned rows saved to {args.output}")
+    print("\n".join(monitor.summary_lines()))
+
+def run_label(args):
+    from src import instrumentation
+
+    with instrumentation.monitored_run('label', args.report) as monitor:
+        if args.workers > 1:
+            from src.parallel_labeling import label_csv_parallel
+            label_csv_parallel(args.input, args.output, args.column, limit=args.limit, workers=args.workers)
+        else:
+            from src.CoNLL_processing import CoNLLFormatter
+            CoNLLFormatter().stream_csv_to_conll(args.input, args.output, args.column,
+                                                 limit=args.limit, checkpoint_path=args.checkpoint)
+    print(f"Labeled messages written to {args.output}")
+    print("\n".join(monitor.summary_lines()))
+
+def run_predict(args):
+    import json
+    from src.ner_inference import NERPredictor
+
+    if args.input:
+        with open(args.input, 'r', encoding='utf-8') as file:
+            texts = [line.strip() for line in file if line.strip()]
+    else:
+        texts = args.texts
+    predictor = NERPredictor.from_pretrained(args.model, batch_size=args.batch_size)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for start in range(0, len(texts), args.batch_size):
+            batch = texts[start:start + args.batch_size]
+            for text, entities in zip(batch, predictor.predict_batch(batch)):
+                output.write(json.dumps({'text': text, 'entities': entities}, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+def run_imports(args):
+    from src.benchmark import benchmark_imports, print_import_times
+
+    commands = args.commands or list(COMMAND_MODULES)
+    unknown = [command for command in commands if command not in COMMAND_MODULES]
+    if unknown:
+        sys.exit(f"Unknown commands: {', '.join(unknown)}")
+    print_import_times(benchmark_imports([COMMAND_MODULES[command] for command in commands], args.repeats))
+
+def run_delegated(command, argv):
+    module = importlib.import_module(DELEGATED_COMMANDS[command][0])
+    return module.main(argv)
+
+# ==============================================
+# Parser
+# ==============================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ethiomart', description="EthioMart Amharic NER pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Defaults mirror the module constants, which are not imported here
+    data_dir = 'C:/Users/ibsan/Desktop/TenX/week-5/data'
+
+    scrape = commands.add_parser('scrape', help="Scrape new messages from the registered Telegram channels")
+    scrape.add_argument('--output', default=f'{data_dir}/telegram_data.csv')
+    scrape.add_argument('--checkpoints', default=f'{data_dir}/scrape_checkpoints.json')
+    scrape.add_argument('--report', default=f'{data_dir}/scrape_report.json')
+    scrape.add_argument('--concurrency', type=int, default=4)
+    scrape.set_defaults(func=run_scrape)
+
+    preprocess = commands.add_parser('preprocess', help="Clean and tokenize raw messages chunk by chunk")
+    preprocess.add_argument('--input', default=f'{data_dir}/telegram_data.csv')
+    preprocess.add_argument('--output', default=f'{data_dir}/cleaned_telegram_data.csv')
+    preprocess.add_argument('--chunksize', type=int, default=50_000)
+    preprocess.add_argument('--dedup', nargs='?', const=f'{data_dir}/dedup_index.npz', metavar='INDEX',
+                            help="Keep only the first copy of near-duplicate messages")
+    preprocess.add_argument('--report', help="Write the JSON run report here")
+    preprocess.set_defaults(func=run_preprocess)
+
+    label = commands.add_parser('label', help="Label messages with the gazetteer and write CoNLL")
+    label.add_argument('--input', default=f'{data_dir}/cleaned_telegram_data.csv')
+    label.add_argument('--output', default=f'{data_dir}/labeled_messages.conll')
+    label.add_argument('--column', default='Message')
+    label.add_argument('--limit', type=int, help="Label at most this many non-empty messages")
+    label.add_argument('--checkpoint', help="Resume from and commit progress to this file (single worker only)")
+    label.add_argument('--workers', type=int, default=1)
+    label.add_argument('--report', help="Write the JSON run report here")
+    label.set_defaults(func=run_label)
+
+    predict = commands.add_parser('predict', help="Predict entities with a fine-tuned checkpoint (JSON lines)")
+    predict.add_argument('texts', nargs='*')
+    predict.add_argument('--model', required=True)
+    predict.add_argument('--input', help="Text file with one message per line")
+    predict.add_argument('--output', help="JSON lines output file (default: stdout)")
+    predict.add_argument('--batch-size', type=int, default=32)
+    predict.set_defaults(func=run_predict)
+
+    imports = commands.add_parser('imports', help="Measure the cold import time of each command")
+    imports.add_argument('commands', nargs='*', metavar='COMMAND',
+                         help=f"Commands to measure (default: all of {', '.join(COMMAND_MODULES)})")
+    imports.add_argument('--repeats', type=int, default=5)
+    imports.set_defaults(func=run_imports)
+
+    # Listed for --help only; main() hands their arguments to the module's own parser
+    for command, (_, description) in DELEGATED_COMMANDS.items():
+        commands.add_parser(command, help=description, add_help=False)
+
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in DELEGATED_COMMANDS:
+        return run_delegated(argv[0], argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'func', None) is run_label and args.workers > 1 and args.checkpoint:
+        parser.error("label --checkpoint cannot be combined with --workers > 1")
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
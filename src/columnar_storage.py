@@ -0,0 +1,164 @@
+import os
+import time
+
+# ==============================================
+# Optional dependency handling
+# ==============================================
+
+def _require_pyarrow():
+    """Import pyarrow lazily so CSV-only users do not need it installed"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Columnar storage requires pyarrow. Install it with `pip install pyarrow`."
+        ) from e
+    return pa, pq
+
+def is_parquet(path):
+    """True if ``path`` names a Parquet file"""
+    return os.path.splitext(str(path))[1].lower() in ('.parquet', '.pq')
+
+# ==============================================
+# Schema
+# ==============================================
+
+def cleaned_messages_schema():
+    """Arrow schema for cleaned messages: native token lists, parsed dates, categorical channels"""
+    pa, _ = _require_pyarrow()
+    return pa.schema([
+        ('Channel Title', pa.dictionary(pa.int32(), pa.string())),
+        ('Channel Username', pa.dictionary(pa.int32(), pa.string())),
+        ('ID', pa.int64()),
+        ('Message', pa.string()),
+        ('Date', pa.timestamp('us')),  # UTC
+        ('Cleaned_Message', pa.string()),
+        ('Tokens', pa.list_(pa.string())),
+    ])
+
+def _chunk_to_table(chunk, schema):
+    """Convert a cleaned DataFrame chunk to an Arrow table with ``schema``"""
+    import pandas as pd
+
+    pa, _ = _require_pyarrow()
+    for name in schema.names:
+        if name not in chunk.columns:
+            chunk[name] = None
+    chunk = chunk[schema.names].copy()
+    # Scraped dates carry a UTC offset; store them as naive UTC so every part
+    # file keeps the same timestamp type
+    chunk['Date'] = (pd.to_datetime(chunk['Date'], errors='coerce', utc=True, format='ISO8601')
+                     .dt.tz_localize(None).astype('datetime64[us]'))
+    chunk['Tokens'] = chunk['Tokens'].map(lambda tokens: tokens if isinstance(tokens, list) else [])
+    return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+# ==============================================
+# Writers
+# ==============================================
+
+class ParquetChunkWriter:
+    """Context manager appending cleaned DataFrame chunks to one Parquet file
+
+    With ``append=True`` ``file_path`` is a dataset directory and each writer
+    adds a new, time-ordered part file to it instead of replacing the data.
+    """
+    def __init__(self, file_path, schema=None, compression='zstd', append=False):
+        self.file_path = file_path
+        self.schema = schema
+        self.compression = compression
+        self.append = append
+        self.writer = None
+
+    def __enter__(self):
+        _, pq = _require_pyarrow()
+        self.schema = self.schema or cleaned_messages_schema()
+        target = self.file_path
+        if self.append:
+            os.makedirs(self.file_path, exist_ok=True)
+            target = os.path.join(self.file_path, f"part-{time.time_ns():020d}.parquet")
+        self.writer = pq.ParquetWriter(target, self.schema, compression=self.compression)
+        return self
+
+    def write(self, chunk):
+        """Append one chunk as a new row group"""
+        self.writer.write_table(_chunk_to_table(chunk, self.schema))
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.writer is not None:
+            self.writer.close()
+
+# ==============================================
+# Readers
+# ==============================================
+
+def read_cleaned_messages(file_path, columns=None, filters=None):
+    """Read cleaned messages into pandas, loading only ``columns`` (memory-mapped)
+
+    ``Tokens`` comes back as real lists and channel columns as ``category``.
+    ``filters`` uses the pyarrow row-filter syntax, e.g.
+    ``[('Channel Username', '=', '@ZemenExpress')]``.
+    """
+    _, pq = _require_pyarrow()
+    table = pq.read_table(file_path, columns=columns, filters=filters, memory_map=True)
+    return table.to_pandas()
+
+def read_token_arena(file_path, column='Tokens'):
+    """Return ``(tokens, offsets)`` for a list-of-token column without per-row copies
+
+    ``tokens`` is a flat Arrow string array of every token in the file and
+    tokens of message ``i`` are ``tokens[offsets[i]:offsets[i + 1]]``.
+    ``offsets`` is a NumPy view over the Arrow offset buffer.
+    """
+    _, pq = _require_pyarrow()
+    table = pq.read_table(file_path, columns=[column], memory_map=True)
+    tokens = table.column(column).combine_chunks()
+    return tokens.values, tokens.offsets.to_numpy(zero_copy_only=True)
+
+def iter_column_chunks(file_path, column, chunksize, skip=0, nrows=None):
+    """Yield a single column of a CSV or Parquet file (or part directory) as pandas Series chunks
+
+    ``skip`` drops leading data rows and ``nrows`` caps the rows yielded.
+    """
+    import pandas as pd
+
+    if not is_parquet(file_path):
+        reader = pd.read_csv(
+            file_path, encoding='utf-8', usecols=[column], chunksize=chunksize,
+            skiprows=range(1, skip + 1), nrows=nrows,
+        )
+        for chunk in reader:
+            yield chunk[column]
+        return
+
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    remaining = nrows
+    for batch in ds.dataset(file_path, format='parquet').to_batches(
+            columns=[column], batch_size=chunksize):
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        batch = batch.slice(skip)
+        skip = 0
+        if remaining is not None:
+            batch = batch.slice(0, remaining)
+            remaining -= batch.num_rows
+        yield batch.column(0).to_pandas()
+        if remaining == 0:
+            return
+
+def iter_frame_chunks(file_path, columns, chunksize):
+    """Yield selected columns of a CSV or Parquet file (or part directory) as DataFrame chunks"""
+    import pandas as pd
+
+    if not is_parquet(file_path):
+        yield from pd.read_csv(file_path, encoding='utf-8', usecols=columns, chunksize=chunksize)
+        return
+
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    for batch in ds.dataset(file_path, format='parquet').to_batches(columns=columns, batch_size=chunksize):
+        yield batch.to_pandas()
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+from array import array
+
+import numpy as np
+
+# ==============================================
+# Malformed-line reporting
+# ==============================================
+
+class ConllReadReport:
+    """Counts of what a CoNLL read saw, with the first few malformed lines kept verbatim"""
+    def __init__(self, max_examples=20):
+        self.sentences = 0
+        self.tokens = 0
+        self.malformed = 0
+        self.examples = []
+        self.max_examples = max_examples
+
+    def add_malformed(self, line_number, line):
+        self.malformed += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append((line_number, line))
+
+    def __repr__(self):
+        return (f"ConllReadReport(sentences={self.sentences}, tokens={self.tokens}, "
+                f"malformed={self.malformed})")
+
+# ==============================================
+# Sentence markers
+# ==============================================
+
+# CoNLL-U style comment naming the message the following sentence came from
+MESSAGE_MARKER = '# message_id = '
+
+def message_marker(key):
+    """Marker line written before the sentence of message ``key``"""
+    return f"{MESSAGE_MARKER}{key}\n"
+
+def _marker_key(line, marker):
+    return line[len(marker):].decode('utf-8').strip()
+
+def drop_marked_sentences(file_path, keys, before=None, keep_last=()):
+    """Rewrite a CoNLL file without the sentences marked with one of ``keys``
+
+    Only sentences starting before byte ``before`` are dropped (all of them
+    if it is None), so the copies appended by the current run survive. For
+    keys in ``keep_last`` the last marked sentence in the file is kept, which
+    makes the rewrite safe to repeat. Unmarked sentences are always kept.
+    The file is streamed to a temporary copy that replaces it atomically.
+    Returns the number of sentences dropped.
+    """
+    keys = {str(key) for key in keys}
+    marker = MESSAGE_MARKER.encode('utf-8')
+    remaining = dict.fromkeys((str(key) for key in keep_last), 0)
+    if remaining:
+        with open(file_path, 'rb') as source:
+            for line in source:
+                if line.startswith(marker):
+                    key = _marker_key(line, marker)
+                    if key in remaining:
+                        remaining[key] += 1
+    dropped = 0
+    position = 0
+    skipping = False
+    tmp_path = f"{file_path}.tmp"
+    with open(file_path, 'rb') as source, open(tmp_path, 'wb') as target:
+        for line in source:
+            start, position = position, position + len(line)
+            if line.startswith(marker):
+                key = _marker_key(line, marker)
+                skipping = (before is None or start < before) and key in keys
+                if key in remaining:
+                    remaining[key] -= 1
+                    skipping = skipping and remaining[key] > 0
+                dropped += skipping
+            elif skipping and not line.strip():
+                skipping = False
+                continue
+            if not skipping:
+                target.write(line)
+    os.replace(tmp_path, file_path)
+    return dropped
+
+# ==============================================
+# Streaming reader
+# ==============================================
+
+def iter_conll_sentences(file_path, report=None, strict=False):
+    """Yield ``(tokens, labels)`` per sentence, reading the file line by line
+
+    A non-blank line must be exactly ``token label``; ``message_marker``
+    lines are skipped. Anything else is recorded in ``report`` (or raises
+    ``ValueError`` when ``strict``) rather than silently dropped.
+    """
+    report = report if report is not None else ConllReadReport()
+    tokens, labels = [], []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.startswith(MESSAGE_MARKER):
+                continue
+            parts = line.split()
+            if not parts:  # End of a sentence
+                if tokens:
+                    report.sentences += 1
+                    report.tokens += len(tokens)
+                    yield tokens, labels
+                    tokens, labels = [], []
+                continue
+            if len(parts) != 2:
+                if strict:
+                    raise ValueError(f"{file_path}:{line_number}: expected 'token label', got {line.rstrip()!r}")
+                report.add_malformed(line_number, line.rstrip('\n'))
+                continue
+            tokens.append(parts[0])
+            labels.append(parts[1])
+    # Add the last sentence if the file doesn't end with a blank line
+    if tokens:
+        report.sentences += 1
+        report.tokens += len(tokens)
+        yield tokens, labels
+
+def read_conll_file(file_path, report=None):
+    """Parse a CoNLL file into ``{"tokens": [...], "labels": [...]}`` lists"""
+    tokens, labels = [], []
+    for sentence_tokens, sentence_labels in iter_conll_sentences(file_path, report):
+        tokens.append(sentence_tokens)
+        labels.append(sentence_labels)
+    return {"tokens": tokens, "labels": labels}
+
+def file_sha256(file_path, block_size=1 << 20):
+    """Content hash of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# ==============================================
+# Integer-encoded bulk loader
+# ==============================================
+
+class ConllArrays:
+    """Flat integer encoding of a CoNLL corpus
+
+    Sentence ``i`` covers ``token_ids[offsets[i]:offsets[i + 1]]`` (and the
+    same slice of ``label_ids``); ids index ``vocab`` and ``label_names``.
+    """
+    def __init__(self, token_ids, label_ids, offsets, vocab, label_names, report=None):
+        self.token_ids = token_ids
+        self.label_ids = label_ids
+        self.offsets = offsets
+        self.vocab = vocab
+        self.label_names = label_names
+        self.report = report
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def sentence(self, i):
+        """Decoded ``(tokens, labels)`` of sentence ``i``"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return ([self.vocab[t] for t in self.token_ids[start:end]],
+                [self.label_names[l] for l in self.label_ids[start:end]])
+
+    def with_sorted_labels(self):
+        """Copy whose label ids follow the sorted label names, independent of file order"""
+        label_names = sorted(self.label_names)
+        remap = np.array([label_names.index(name) for name in self.label_names], dtype=np.int16)
+        label_ids = remap[self.label_ids] if len(remap) else np.asarray(self.label_ids)
+        return ConllArrays(self.token_ids, label_ids, self.offsets, self.vocab, label_names, self.report)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ('token_ids', 'label_ids', 'offsets'):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        # Written last: its presence marks a complete cache entry
+        with open(os.path.join(directory, 'maps.json'), 'w', encoding='utf-8') as f:
+            json.dump({'vocab': self.vocab, 'label_names': self.label_names}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load saved arrays memory-mapped, so only the pages actually touched are read"""
+        with open(os.path.join(directory, 'maps.json'), 'r', encoding='utf-8') as f:
+            maps = json.load(f)
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ('token_ids', 'label_ids', 'offsets')]
+        return cls(*arrays, maps['vocab'], maps['label_names'])
+
+def encode_conll_file(file_path, vocab=None, label_names=None, report=None):
+    """Stream a CoNLL file into a ``ConllArrays`` encoding
+
+    Pass ``vocab``/``label_names`` to share ids across files; unseen tokens
+    and labels are appended to them.
+    """
+    vocab = list(vocab or [])
+    label_names = list(label_names or [])
+    token_index = {token: i for i, token in enumerate(vocab)}
+    label_index = {label: i for i, label in enumerate(label_names)}
+    token_ids, label_ids, offsets = array('i'), array('h'), array('q', [0])
+    report = report if report is not None else ConllReadReport()
+
+    for tokens, labels in iter_conll_sentences(file_path, report):
+        for token in tokens:
+            token_id = token_index.get(token)
+            if token_id is None:
+                token_id = token_index[token] = len(vocab)
+                vocab.append(token)
+            token_ids.append(token_id)
+        for label in labels:
+            label_id = label_index.get(label)
+            if label_id is None:
+                label_id = label_index[label] = len(label_names)
+                label_names.append(label)
+            label_ids.append(label_id)
+        offsets.append(len(token_ids))
+
+    return ConllArrays(
+        np.frombuffer(token_ids, dtype=np.int32),
+        np.frombuffer(label_ids, dtype=np.int16),
+        np.frombuffer(offsets, dtype=np.int64),
+        vocab, label_names, report,
+    )
+
+def load_conll_arrays(file_path, cache_dir=None, vocab=None, label_names=None):
+    """Return the integer encoding of a CoNLL file, memory-mapped from cache when available
+
+    The cache entry is keyed by the file's content hash (and any given
+    vocabulary), so an edited file is re-encoded automatically.
+    """
+    if cache_dir is None:
+        return encode_conll_file(file_path, vocab, label_names)
+
+    key = hashlib.sha256(file_sha256(file_path).encode())
+    key.update(json.dumps([vocab, label_names], ensure_ascii=False).encode('utf-8'))
+    directory = os.path.join(cache_dir, key.hexdigest()[:20])
+    if os.path.exists(os.path.join(directory, 'maps.json')):
+        return ConllArrays.load(directory)
+    arrays = encode_conll_file(file_path, vocab, label_names)
+    if arrays.report.malformed:
+        print(f"{file_path}: skipped {arrays.report.malformed} malformed lines, "
+              f"e.g. {arrays.report.examples[:3]}")
+    arrays.save(directory)
+    return ConllArrays.load(directory)
+
+# ==============================================
+# Hugging Face conversion
+# ==============================================
+
+def to_hf_dataset(arrays, include_tokens=True):
+    """Build a Hugging Face ``Dataset`` over the arrays without copying the id buffers
+
+    ``token_ids`` and ``labels`` are Arrow list columns that wrap the NumPy
+    buffers directly (labels are widened once to the int64 ``ClassLabel``
+    storage). ``tokens`` (strings, needed for subword tokenization) is
+    decoded in one vectorized Arrow ``take``. The features are attached as
+    metadata, so no row-by-row cast runs.
+    """
+    import pyarrow as pa
+    from datasets import ClassLabel, Dataset, DatasetInfo, Features, Sequence, Value
+
+    offsets = pa.array(np.asarray(arrays.offsets, dtype=np.int32))
+    columns = {
+        'token_ids': pa.ListArray.from_arrays(offsets, pa.array(np.asarray(arrays.token_ids))),
+        'labels': pa.ListArray.from_arrays(offsets, pa.array(np.asarray(arrays.label_ids, dtype=np.int64))),
+    }
+    features = {
+        'token_ids': Sequence(Value('int32')),
+        'labels': Sequence(ClassLabel(names=arrays.label_names)),
+    }
+    if include_tokens:
+        vocab = pa.array(arrays.vocab, type=pa.string())
+        columns['tokens'] = pa.ListArray.from_arrays(offsets, vocab.take(columns['token_ids'].values))
+        features['tokens'] = Sequence(Value('string'))
+
+    features = Features(features)
+    table = pa.table(columns).cast(features.arrow_schema)
+    return Dataset(table, info=DatasetInfo(features=features))
@@ -1,51 +1,51 @@
-from functools import reduce, wraps 
+from functools import reduce, wraps
+import itertools
 import pandas as pd
-import re
-import matplotlib.pyplot as plt
-from collections import Counter
-import matplotlib.font_manager as fm
 from datetime import datetime
 import os
-from functools import wraps
-from contextlib import contextmanager
 import time
+from contextlib import contextmanager
+from src.columnar_storage import ParquetChunkWriter, is_parquet
+from src import instrumentation
+from src.normalization import clean_series, clean_text
+from src.tokenization import tokenize
+from src.eda import Plotter, aggregate_file
+
+CLEANED_DATA_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
+DEFAULT_CHUNKSIZE = 50_000
 
 # ==============================================
 # Decorators for enhanced functionality
 # ==============================================
 
 def log_execution_time(func):
-    """Decorator to log function execution time"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        print(f"{func.__name__} executed in {end_time - start_time:.2f} seconds")
-        return result
-    return wrapper
+    """Decorator timing each call as a stage of the current run monitor"""
+    return instrumentation.timed(func.__name__)(func)
 
 def handle_errors(func):
-    """Decorator to handle exceptions gracefully"""
+    """Decorator recording exceptions in the run report before re-raising them"""
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            print(f"Error in {func.__name__}: {str(e)}")
-            return None
+            instrumentation.record_error(func.__name__, e)
+            raise
     return wrapper
 
 # ==============================================
 # Context Managers
 # ==============================================
 
-@contextmanager
 def setup_font(font_path):
-    """Set up the font for matplotlib"""
+    """Set up the font for matplotlib (imported here, so cleaning never loads it)"""
+    import matplotlib.pyplot as plt
+    import matplotlib.font_manager as fm
+
     try:
         if os.path.exists(font_path):
             # Add the font to matplotlib
+            fm.fontManager.addfont(font_path)
             font_prop = fm.FontProperties(fname=font_path)
             plt.rcParams['font.family'] = font_prop.get_name()
             print(f"Using font: {font_prop.get_name()}")
@@ -68,6 +68,29 @@ def csv_manager(file_path, mode='r'):
         if file is not None:
             file.close()
 
+@contextmanager
+def cleaned_output(output_path, append=False):
+    """Yield a function appending cleaned chunks to a CSV or Parquet file
+
+    With ``append`` existing CSV rows are kept, and a Parquet path is used as
+    a directory that receives one new part file per run.
+    """
+    if is_parquet(output_path):
+        with ParquetChunkWriter(output_path, append=append) as writer:
+            yield writer.write
+        return
+
+    exists = append and os.path.exists(output_path) and os.path.getsize(output_path) > 0
+    with csv_manager(output_path, 'a' if append else 'w') as file:
+        header = [not exists]
+
+        def write_chunk(chunk):
+            chunk.to_csv(file, index=False, header=header[0])
+            file.flush()
+            header[0] = False
+
+        yield write_chunk
+
 # ==============================================
 # Functional Programming Components
 # ==============================================
@@ -80,145 +103,95 @@ def compose(*functions):
 
 def text_processing_pipeline():
     """Create text processing pipeline using functional composition"""
-    return compose(
-        lambda text: text.lower(),
-        lambda text: re.sub(
-            r'[^\w\s\u1200-\u137F]',  # Ethiopic Unicode range
-            '', 
-            text,
-            flags=re.UNICODE
-        ),
-        lambda text: text.strip()
-    )
+    return compose(clean_text)
 
 # ==============================================
-# Generator for batched processing
+# Main Processing Functions
 # ==============================================
 
-def message_generator(df, batch_size=100):
-    """Generator for batched message processing"""
-    for i in range(0, len(df), batch_size):
-        batch = df.iloc[i:i+batch_size]
-        yield batch
+def clean_message_series(messages):
+    """Vectorized equivalent of ``text_processing_pipeline`` over a whole column"""
+    return clean_series(messages)
 
-# ==============================================
-# Main Processing Functions
-# ==============================================
+def preprocess_chunk(chunk):
+    """Clean and tokenize one chunk of raw Telegram messages"""
+    chunk['Message'] = chunk['Message'].astype(str)
 
-@log_execution_time
-@handle_errors
-def preprocess_telegram_data(file_path):
-    """Preprocess Telegram data with enhanced functionality"""
-    # Functional pipeline setup
-    process_text = text_processing_pipeline()
-    
-    with csv_manager(file_path) as file:
-        df = pd.read_csv(file)
-    
-    # Convert all message data to string type
-    df['Message'] = df['Message'].astype(str)
-    
-    # Rest of the processing remains the same
-    required_columns = {'Message', 'Channel Title', 'Channel Username'}
-    if not required_columns.issubset(df.columns):
-        missing = required_columns - set(df.columns)
-        raise ValueError(f"Missing columns: {missing}")
-    
     # Convert Date column to datetime
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    if 'Date' in chunk.columns:
+        chunk['Date'] = pd.to_datetime(chunk['Date'], errors='coerce')
     else:
-        df['Date'] = pd.to_datetime(datetime.today().date())
-    
-    # Generator-based processing
-    processed_data = []
-    for batch in message_generator(df):
-        batch = batch.copy()
-        batch['Cleaned_Message'] = batch['Message'].apply(process_text)
-        batch['Tokens'] = batch['Cleaned_Message'].str.split()
-        processed_data.append(batch)
-    
-    structured_data = pd.concat(processed_data)
-    
-    # Save using context manager
-    output_path = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
-    with csv_manager(output_path, 'w') as file:
-        structured_data.to_csv(file, index=False)
-    
-    return structured_data
+        chunk['Date'] = pd.to_datetime(datetime.today().date())
 
-# ==============================================
-# Visualization Components with Metaprogramming
-# ==============================================
+    chunk['Cleaned_Message'] = clean_message_series(chunk['Message'])
+    chunk['Tokens'] = chunk['Cleaned_Message'].map(tokenize, na_action='ignore')
+    return chunk
+
+def iter_preprocessed_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, select=None):
+    """Stream a raw Telegram CSV and yield cleaned chunks of at most ``chunksize`` rows
+
+    ``select`` optionally filters each raw chunk before it is cleaned; chunks
+    left empty are skipped.
+    """
+    required_columns = {'Message', 'Channel Title', 'Channel Username'}
+    with csv_manager(file_path) as file:
+        reader = pd.read_csv(file, chunksize=chunksize)
+        for i in itertools.count():
+            with instrumentation.stage('read'):
+                chunk = next(reader, None)
+            if chunk is None:
+                return
+            if i == 0 and not required_columns.issubset(chunk.columns):
+                missing = required_columns - set(chunk.columns)
+                raise ValueError(f"Missing columns: {missing}")
+            instrumentation.count('preprocess.rows_read', len(chunk))
+            if select is not None:
+                with instrumentation.stage('select'):
+                    chunk = select(chunk)
+                if chunk.empty:
+                    continue
+            with instrumentation.stage('clean'):
+                chunk = preprocess_chunk(chunk)
+            yield chunk
+
+@log_execution_time
+@handle_errors
+def preprocess_telegram_data(file_path, output_path=CLEANED_DATA_PATH,
+                             chunksize=DEFAULT_CHUNKSIZE, return_data=False, deduplicator=None):
+    """Preprocess Telegram data chunk by chunk, appending each chunk to ``output_path``
+
+    A ``.parquet`` output path selects the columnar format (native token
+    lists, parsed dates, categorical channels); anything else is written as
+    CSV. Memory is bounded by ``chunksize`` unless ``return_data`` is set, in
+    which case the cleaned chunks are also concatenated and returned. With a
+    ``deduplicator`` (``src.dedup.NearDuplicateIndex``) only the first copy of
+    each near-duplicate message is kept. Returns the number of rows written
+    (or the cleaned frame) and prints the throughput in rows/sec.
+    """
+    start_time = time.perf_counter()
+    rows = 0
+    processed_data = [] if return_data else None
+
+    with cleaned_output(output_path) as write_chunk:
+        for chunk in iter_preprocessed_chunks(file_path, chunksize):
+            if deduplicator is not None:
+                with instrumentation.stage('dedup'):
+                    chunk = deduplicator.deduplicate(chunk)
+            with instrumentation.stage('write'):
+                write_chunk(chunk)
+            rows += len(chunk)
+            instrumentation.count('preprocess.rows_written', len(chunk))
+            instrumentation.count('preprocess.tokens', int(chunk['Tokens'].map(len, na_action='ignore').sum()))
+            if return_data:
+                processed_data.append(chunk)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Preprocessed {rows} rows at {rows / elapsed if elapsed else 0:,.0f} rows/sec")
+
+    if return_data:
+        return pd.concat(processed_data) if processed_data else pd.DataFrame()
+    return rows
 
-class Plotter:
-    """Class-based plotter with registry pattern"""
-    _plots = {}
-    
-    @classmethod
-    def register(cls, name):
-        """Decorator factory for plot registration"""
-        def decorator(func):
-            cls._plots[name] = func
-            return func
-        return decorator
-    
-    @classmethod
-    def execute_plots(cls, data):
-        """Execute all registered plots"""
-        for name, plot_func in cls._plots.items():
-            try:
-                plot_func(data)
-            except Exception as e:
-                print(f"Error in plot '{name}': {str(e)}")
-
-@Plotter.register('word_frequency')
-def plot_word_frequency(data):
-    """Plot word frequency distribution"""
-    all_tokens = data['Tokens'].explode()
-    common_words = all_tokens.value_counts().head(10)
-    
-    plt.figure(figsize=(10, 6))
-    common_words.plot.bar(color='skyblue')
-    plt.title('Top 10 Most Common Words')
-    plt.xlabel('Words')
-    plt.ylabel('Frequency')
-    plt.xticks(rotation=45)
-    plt.show()
-
-@Plotter.register('message_length')
-def plot_message_length(data):
-    """Plot message length distribution"""
-    data['Message_Length'] = data['Tokens'].str.len()
-    
-    plt.figure(figsize=(10, 6))
-    data['Message_Length'].plot.hist(bins=20, color='lightgreen', edgecolor='black')
-    plt.title('Distribution of Message Lengths')
-    plt.xlabel('Number of Words')
-    plt.ylabel('Frequency')
-    plt.show()
-
-@Plotter.register('time_series')
-def plot_time_series(data):
-    """Plot messages over time"""
-    if 'Date' in data.columns:
-        # Ensure Date column is datetime
-        data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-        # Drop rows with invalid dates
-        data = data.dropna(subset=['Date'])
-        
-        # Set index and resample
-        time_series = data.set_index('Date').resample('D').size()
-        
-        plt.figure(figsize=(12, 6))
-        time_series.plot(color='orange')
-        plt.title('Messages Over Time')
-        plt.xlabel('Date')
-        plt.ylabel('Message Count')
-        plt.grid(True)
-        plt.show()
-    else:
-        print("Skipping 'Messages Over Time' plot: 'Date' column not found.")
 # ==============================================
 # Main Execution
 # ==============================================
@@ -226,11 +199,9 @@ def plot_time_series(data):
 if __name__ == "__main__":
     input_path = "C:/Users/ibsan/Desktop/TenX/week-5/data/telegram_data.csv"
     font_path = 'C:/Users/ibsan/Desktop/TenX/week-5/data/fonts/AbyssinicaSIL-Regular.ttf'
-    
-    # Set up font before plotting
-    font_setup_success = setup_font(font_path)
-    
-    cleaned_data = preprocess_telegram_data(input_path)
-    
-    if cleaned_data is not None:
-        Plotter.execute_plots(cleaned_data)
\ No newline at end of file
+
+    preprocess_telegram_data(input_path)
+
+    # Plots are drawn from one streaming pass over the cleaned file and saved to disk
+    for name, path in Plotter.render(aggregate_file(CLEANED_DATA_PATH), font_path=font_path).items():
+        print(f"{name}: {path}")
\ No newline at end of file
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_storage import iter_frame_chunks
+
+CLEANED_DATA_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
+DEDUP_INDEX_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/dedup_index.npz"
+
+# ==============================================
+# MinHash signatures
+# ==============================================
+
+def shingle_hashes(tokens, shingle_size=3):
+    """Stable 32-bit hashes of the token ``shingle_size``-grams of one message
+
+    Messages of at most ``shingle_size`` tokens hash as a single shingle of
+    all their tokens, so they only match messages with exactly the same
+    tokens (an empty message hashes as the empty string).
+    """
+    if len(tokens) <= shingle_size:
+        return [zlib.crc32(' '.join(tokens).encode('utf-8'))]
+    return [zlib.crc32(' '.join(tokens[i:i + shingle_size]).encode('utf-8'))
+            for i in range(len(tokens) - shingle_size + 1)]
+
+class MinHasher:
+    """MinHash over shingle hashes with multiply-shift hash functions
+
+    ``h_i(x) = (a_i * x + b_i) mod 2**64 >> 32`` with random odd ``a_i``, so a
+    whole block of messages is signed with one broadcasted NumPy expression.
+    """
+    def __init__(self, num_perm=128, shingle_size=3, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signatures(self, token_lists, block_size=1024):
+        """``(messages, num_perm)`` uint32 signature matrix"""
+        result = np.empty((len(token_lists), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(token_lists), block_size):
+            block = [shingle_hashes(tokens, self.shingle_size) for tokens in token_lists[start:start + block_size]]
+            lengths = np.fromiter((len(hashes) for hashes in block), dtype=np.int64, count=len(block))
+            hashes = np.fromiter((h for hashes in block for h in hashes), dtype=np.uint64, count=int(lengths.sum()))
+            with np.errstate(over='ignore'):
+                permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)
+            offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+            result[start:start + len(block)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+# ==============================================
+# Incremental LSH clustering
+# ==============================================
+
+class NearDuplicateIndex:
+    """Incremental near-duplicate clustering of messages with MinHash LSH
+
+    Each cluster keeps its first message as the representative. Signatures
+    are split into ``bands`` bands; a new message is compared only with
+    representatives sharing a band bucket, and joins the best one whose
+    estimated Jaccard similarity reaches ``threshold``. Otherwise it starts
+    a new cluster. Work per message is independent of the number of messages
+    seen, so batches and later increments cost the same per row.
+
+    Messages of up to ``shingle_size`` tokens are one shingle, so they only
+    cluster with exact copies. Empty messages (media-only posts) carry no
+    text to compare and are always kept, outside any cluster.
+    """
+    def __init__(self, num_perm=128, bands=16, threshold=0.8, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands = bands
+        self.threshold = threshold
+        self.seed = seed
+        self.band_weights = np.random.default_rng(seed + 1).integers(
+            0, 2 ** 63, num_perm // bands, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.size = 0
+        self.channels, self.ids, self.counts, self.first_dates, self.last_dates = [], [], [], [], []
+        self.members = {}
+
+    def __len__(self):
+        return self.size
+
+    def _band_keys(self, signatures):
+        """``(messages, bands)`` bucket keys, one hash per band of each signature"""
+        rows = signatures.reshape(len(signatures), self.bands, -1).astype(np.uint64)
+        with np.errstate(over='ignore'):
+            return (rows * self.band_weights).sum(axis=2, dtype=np.uint64)
+
+    def _store(self, signature, band_keys, channel, message_id, date):
+        if self.size == len(self.signatures):
+            grown = np.empty((max(1024, 2 * self.size), self.signatures.shape[1]), dtype=np.uint32)
+            grown[:self.size] = self.signatures[:self.size]
+            self.signatures = grown
+        cluster = self.size
+        self.signatures[cluster] = signature
+        for band, key in enumerate(band_keys.tolist()):
+            self.buckets[band].setdefault(key, []).append(cluster)
+        self.channels.append(channel)
+        self.ids.append(message_id)
+        self.counts.append(1)
+        self.first_dates.append(date)
+        self.last_dates.append(date)
+        self.size += 1
+        return cluster
+
+    def add(self, channels, ids, token_lists, dates=None):
+        """Cluster a batch of messages in order
+
+        Returns ``(clusters, is_new)``: the cluster of each message and whether
+        it started that cluster (and so should be kept). A ``(channel, id)``
+        already seen is not counted again and keeps its cluster. Empty
+        messages get cluster -1 and are always kept.
+        """
+        signatures = self.hasher.signatures(token_lists)
+        band_keys = self._band_keys(signatures)
+        dates = [None] * len(token_lists) if dates is None else list(dates)
+        clusters = np.empty(len(token_lists), dtype=np.int64)
+        is_new = np.zeros(len(token_lists), dtype=bool)
+        for i, (channel, message_id) in enumerate(zip(channels, ids)):
+            if not token_lists[i]:
+                clusters[i] = -1
+                is_new[i] = True
+                continue
+            known = self.members.get((channel, message_id))
+            if known is not None:
+                # Re-emit an edited representative, never a duplicate
+                clusters[i] = known
+                is_new[i] = (self.channels[known], self.ids[known]) == (channel, message_id)
+                continue
+            candidates = {cluster for band, key in enumerate(band_keys[i].tolist())
+                          for cluster in self.buckets[band].get(key, ())}
+            best = None
+            if candidates:
+                candidates = np.fromiter(candidates, dtype=np.int64)
+                similarity = (self.signatures[candidates] == signatures[i]).mean(axis=1)
+                if similarity.max() >= self.threshold:
+                    best = int(candidates[similarity.argmax()])
+            if best is None:
+                best = self._store(signatures[i], band_keys[i], channel, message_id, dates[i])
+                is_new[i] = True
+            else:
+                self.counts[best] += 1
+                if dates[i] is not None:
+                    self.first_dates[best] = min(d for d in (self.first_dates[best], dates[i]) if d is not None)
+                    self.last_dates[best] = max(d for d in (self.last_dates[best], dates[i]) if d is not None)
+            self.members[(channel, message_id)] = best
+            clusters[i] = best
+        return clusters, is_new
+
+    def deduplicate(self, chunk, column='Cleaned_Message'):
+        """Keep only the rows of a cleaned chunk that start a new cluster"""
+        tokens = chunk[column].fillna('').astype(str).str.split().tolist()
+        dates = pd.to_datetime(chunk['Date'], errors='coerce') if 'Date' in chunk.columns else None
+        dates = None if dates is None else [None if pd.isna(d) else d for d in dates]
+        _, is_new = self.add(chunk['Channel Username'].astype(str).tolist(),
+                             chunk['ID'].tolist(), tokens, dates)
+        return chunk[is_new]
+
+    def clusters(self):
+        """One row per cluster: representative channel and ID, repost count and date range"""
+        return pd.DataFrame({
+            'Channel Username': self.channels,
+            'ID': self.ids,
+            'Reposts': self.counts,
+            'First Date': self.first_dates,
+            'Last Date': self.last_dates,
+        })
+
+    def save(self, file_path):
+        """Write the index atomically, so a crash never leaves a truncated file"""
+        clusters = self.clusters()
+        members = list(self.members.items())
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            self._write(file, clusters, members)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, file_path)
+
+    def _write(self, file, clusters, members):
+        """Plain numeric arrays only; channel names go in a UTF-8 JSON array, so loading never unpickles"""
+        channel_names = sorted(set(self.channels) | {key[0] for key, _ in members})
+        codes = {name: code for code, name in enumerate(channel_names)}
+        np.savez_compressed(
+            file,
+            params=np.array([self.hasher.num_perm, self.bands, self.hasher.shingle_size, self.seed]),
+            threshold=np.array(self.threshold),
+            signatures=self.signatures[:self.size],
+            channel_names=np.frombuffer(json.dumps(channel_names, ensure_ascii=False).encode('utf-8'),
+                                        dtype=np.uint8),
+            channels=np.array([codes[name] for name in self.channels], dtype=np.int32),
+            ids=np.array(self.ids, dtype=np.int64),
+            counts=np.array(self.counts, dtype=np.int64),
+            first_dates=pd.to_datetime(clusters['First Date']).to_numpy('datetime64[s]'),
+            last_dates=pd.to_datetime(clusters['Last Date']).to_numpy('datetime64[s]'),
+            member_channels=np.array([codes[key[0]] for key, _ in members], dtype=np.int32),
+            member_ids=np.array([key[1] for key, _ in members], dtype=np.int64),
+            member_clusters=np.array([cluster for _, cluster in members], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        data = np.load(file_path, allow_pickle=False)
+        if 'channel_names' not in data.files:
+            raise ValueError(f"{file_path} is an older pickled dedup index; delete it and rebuild")
+        num_perm, bands, shingle_size, seed = (int(v) for v in data['params'])
+        index = cls(num_perm, bands, float(data['threshold']), shingle_size, seed)
+        index.signatures = data['signatures'].copy()
+        index.size = len(index.signatures)
+        for cluster, keys in enumerate(index._band_keys(index.signatures).tolist()):
+            for band, key in enumerate(keys):
+                index.buckets[band].setdefault(key, []).append(cluster)
+        channel_names = json.loads(data['channel_names'].tobytes().decode('utf-8'))
+        index.channels = [channel_names[code] for code in data['channels'].tolist()]
+        index.ids = data['ids'].tolist()
+        index.counts = data['counts'].tolist()
+        to_dates = lambda values: [None if pd.isna(d) else pd.Timestamp(d) for d in values]
+        index.first_dates = to_dates(data['first_dates'])
+        index.last_dates = to_dates(data['last_dates'])
+        member_channels = [channel_names[code] for code in data['member_channels'].tolist()]
+        index.members = dict(zip(zip(member_channels, data['member_ids'].tolist()),
+                                 data['member_clusters'].tolist()))
+        return index
+
+def load_or_create(file_path, **kwargs):
+    """Load a saved index, or start an empty one with ``kwargs`` if none exists"""
+    return NearDuplicateIndex.load(file_path) if os.path.exists(file_path) else NearDuplicateIndex(**kwargs)
+
+# ==============================================
+# Command line
+# ==============================================
+
+def deduplicate_file(input_path, output_path, index_path=DEDUP_INDEX_PATH, chunksize=50_000,
+                     threshold=0.8):
+    """Write the cluster representatives of a cleaned file and save the updated index
+
+    An existing index at ``index_path`` is extended, so rows matching
+    earlier runs are dropped too and their reposts are counted.
+    """
+    from src.data_preprocessing import cleaned_output
+
+    start_time = time.perf_counter()
+    index = load_or_create(index_path, threshold=threshold)
+    rows = kept = 0
+    with cleaned_output(output_path) as write_chunk:
+        for chunk in iter_frame_chunks(input_path, None, chunksize):
+            representatives = index.deduplicate(chunk)
+            write_chunk(representatives)
+            rows += len(chunk)
+            kept += len(representatives)
+    index.save(index_path)
+    print(f"Kept {kept} of {rows} rows ({rows - kept} near-duplicates) "
+          f"in {time.perf_counter() - start_time:.2f} seconds")
+    return index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drop near-duplicate Telegram messages with MinHash LSH")
+    parser.add_argument('--input', default=CLEANED_DATA_PATH)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--index', default=DEDUP_INDEX_PATH)
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args(argv)
+    index = deduplicate_file(args.input, args.output, args.index, args.chunksize, args.threshold)
+    top = index.clusters().sort_values('Reposts', ascending=False).head(10)
+    print(top.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
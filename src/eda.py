@@ -0,0 +1,352 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import instrumentation
+from src.columnar_storage import is_parquet, iter_frame_chunks
+
+CLEANED_DATA_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
+EDA_OUTPUT_DIR = "C:/Users/ibsan/Desktop/TenX/week-5/reports/eda"
+FONT_PATH = 'C:/Users/ibsan/Desktop/TenX/week-5/data/fonts/AbyssinicaSIL-Regular.ttf'
+DEFAULT_CHUNKSIZE = 50_000
+
+# ==============================================
+# Mergeable statistics
+# ==============================================
+
+STATISTICS = {}
+
+def statistic(name):
+    """Class decorator registering a statistic computed by ``aggregate_chunks``"""
+    def decorator(cls):
+        cls.name = name
+        STATISTICS[name] = cls
+        return cls
+    return decorator
+
+class MessageChunk:
+    """One chunk of messages with its tokens and dates parsed once for every statistic"""
+    def __init__(self, frame):
+        self.frame = frame
+        if 'Cleaned_Message' in frame.columns:
+            cleaned = frame['Cleaned_Message'].fillna('').astype(str)
+        else:
+            from src.data_preprocessing import clean_message_series
+            cleaned = clean_message_series(frame['Message'].fillna(''))
+        self.tokens = cleaned.str.split()
+        self.lengths = self.tokens.str.len().to_numpy(dtype=np.int64)
+        self.dates = (pd.to_datetime(frame['Date'], errors='coerce', utc=True).dt.tz_localize(None)
+                      if 'Date' in frame.columns else None)
+
+@statistic('token_frequency')
+class TokenFrequency:
+    """Token counts, optionally bounded to about ``capacity`` distinct tokens
+
+    With a ``capacity`` the counter is pruned to its ``capacity`` most
+    frequent tokens whenever it grows past twice that size, so memory stays
+    bounded on any corpus. Frequent tokens are then exact or undercounted by
+    at most ``pruned`` occurrences; the tail is approximate.
+    """
+    def __init__(self, capacity=200_000):
+        self.capacity = capacity
+        self.counts = Counter()
+        self.pruned = 0
+
+    def update(self, chunk):
+        for tokens in chunk.tokens:
+            self.counts.update(tokens)
+        self._prune()
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.pruned += other.pruned
+        self._prune()
+        return self
+
+    def _prune(self):
+        if self.capacity and len(self.counts) > 2 * self.capacity:
+            kept = Counter(dict(self.counts.most_common(self.capacity)))
+            self.pruned += sum(self.counts.values()) - sum(kept.values())
+            self.counts = kept
+
+    def result(self, top_k=50):
+        return pd.Series(dict(self.counts.most_common(top_k)), dtype=np.int64)
+
+    def summary(self):
+        return {'distinct': len(self.counts), 'total': sum(self.counts.values()), 'pruned': self.pruned,
+                'top': self.counts.most_common(20)}
+
+@statistic('message_length')
+class MessageLengths:
+    """Histogram of message lengths in words; lengths above ``max_length`` share the last bin"""
+    def __init__(self, max_length=512):
+        self.max_length = max_length
+        self.histogram = np.zeros(max_length + 1, dtype=np.int64)
+
+    def update(self, chunk):
+        self.histogram += np.bincount(np.minimum(chunk.lengths, self.max_length), minlength=self.max_length + 1)
+
+    def merge(self, other):
+        self.histogram += other.histogram
+        return self
+
+    def result(self):
+        return self.histogram
+
+    def summary(self):
+        total = int(self.histogram.sum())
+        mean = float((np.arange(len(self.histogram)) * self.histogram).sum() / total) if total else None
+        return {'messages': total, 'mean_words': mean,
+                'max_words': int(np.flatnonzero(self.histogram).max()) if total else None}
+
+@statistic('time_series')
+class DailyCounts:
+    """Messages per calendar day; rows without a parseable date are counted separately"""
+    def __init__(self):
+        self.counts = Counter()
+        self.undated = 0
+
+    def update(self, chunk):
+        if chunk.dates is None:
+            self.undated += len(chunk.lengths)
+            return
+        days = chunk.dates.dt.floor('D')
+        self.undated += int(days.isna().sum())
+        self.counts.update(days.dropna().value_counts().to_dict())
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.undated += other.undated
+        return self
+
+    def result(self):
+        if not self.counts:
+            return pd.Series(dtype=np.int64)
+        # Days without messages are shown as zero, like resample('D').size()
+        return pd.Series(self.counts).sort_index().asfreq('D', fill_value=0)
+
+    def summary(self):
+        days = sorted(self.counts)
+        return {'days': len(days), 'undated': self.undated,
+                'first': str(days[0].date()) if days else None, 'last': str(days[-1].date()) if days else None}
+
+@statistic('channel_counts')
+class ChannelCounts:
+    """Messages per channel username"""
+    def __init__(self):
+        self.counts = Counter()
+
+    def update(self, chunk):
+        self.counts.update(chunk.frame['Channel Username'].astype(str).value_counts().to_dict())
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def result(self):
+        return pd.Series(dict(self.counts.most_common()), dtype=np.int64)
+
+    def summary(self):
+        return dict(self.counts.most_common())
+
+# ==============================================
+# Aggregation
+# ==============================================
+
+def create_statistics(names=None, options=None):
+    """Fresh registered statistics, ``options`` mapping a name to constructor keyword arguments"""
+    options = options or {}
+    return {name: STATISTICS[name](**options.get(name, {})) for name in (names or STATISTICS)}
+
+def aggregate_chunks(chunks, names=None, options=None):
+    """Compute every statistic in one pass over DataFrame chunks"""
+    statistics = create_statistics(names, options)
+    chunks = iter(chunks)
+    while True:
+        with instrumentation.stage('read'):
+            frame = next(chunks, None)
+        if frame is None:
+            return statistics
+        with instrumentation.stage('aggregate'):
+            chunk = MessageChunk(frame)
+            for stat in statistics.values():
+                stat.update(chunk)
+        instrumentation.count('eda.rows', len(frame))
+
+def merge_statistics(partials):
+    """Merge per-file (or per-worker) statistics into the first one"""
+    partials = list(partials)
+    merged = partials[0]
+    for partial in partials[1:]:
+        for name, stat in partial.items():
+            merged[name].merge(stat)
+    return merged
+
+def _frame_columns(file_path):
+    """The columns the statistics read, with the raw Message only when no cleaned text exists"""
+    if is_parquet(file_path):
+        import pyarrow.dataset as ds
+        available = ds.dataset(file_path, format='parquet').schema.names
+    else:
+        available = pd.read_csv(file_path, nrows=0, encoding='utf-8').columns
+    text = 'Cleaned_Message' if 'Cleaned_Message' in available else 'Message'
+    return [column for column in ('Channel Username', 'Date', text) if column in available]
+
+def aggregate_file(file_path, chunksize=DEFAULT_CHUNKSIZE, names=None, options=None):
+    """Statistics of a cleaned (or raw) CSV or Parquet file, reading ``chunksize`` rows at a time"""
+    chunks = iter_frame_chunks(file_path, _frame_columns(file_path), chunksize)
+    return aggregate_chunks(chunks, names, options)
+
+def aggregate_files(file_paths, chunksize=DEFAULT_CHUNKSIZE, names=None, options=None, workers=1):
+    """Aggregate several files, one worker process per file, and merge the partial results"""
+    if workers <= 1 or len(file_paths) <= 1:
+        return merge_statistics(aggregate_file(path, chunksize, names, options) for path in file_paths)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths)), mp_context=context) as pool:
+        futures = [pool.submit(aggregate_file, path, chunksize, names, options) for path in file_paths]
+        return merge_statistics(future.result() for future in futures)
+
+# ==============================================
+# Headless plot rendering
+# ==============================================
+
+class Plotter:
+    """Registry of plots drawn from aggregated statistics and saved as image files"""
+    _plots = {}
+
+    @classmethod
+    def register(cls, name, source):
+        """Decorator factory registering ``func(result, ax)`` drawn from statistic ``source``"""
+        def decorator(func):
+            cls._plots[name] = (source, func)
+            return func
+        return decorator
+
+    @classmethod
+    def render(cls, statistics, output_dir=EDA_OUTPUT_DIR, font_path=None, workers=1, image_format='png'):
+        """Render every plot whose statistic was computed; returns ``{plot name: file path}``
+
+        Only the small plot inputs (top tokens, histogram, daily series) are
+        sent to the rendering workers, never the messages themselves.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [(name, statistics[source].result(), os.path.join(output_dir, f"{name}.{image_format}"), font_path)
+                for name, (source, _) in cls._plots.items() if source in statistics]
+        with instrumentation.stage('render'):
+            if workers <= 1 or len(jobs) <= 1:
+                paths = [_render_plot(*job) for job in jobs]
+            else:
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+                    paths = list(pool.map(_render_plot, *zip(*jobs)))
+        return dict(zip((job[0] for job in jobs), paths))
+
+    @classmethod
+    def execute_plots(cls, data, output_dir=EDA_OUTPUT_DIR, font_path=None, workers=1):
+        """Aggregate an in-memory DataFrame in one pass and render every registered plot to files"""
+        return cls.render(aggregate_chunks([data]), output_dir, font_path, workers)
+
+def _render_plot(name, result, output_path, font_path=None):
+    """Draw one registered plot with the non-interactive Agg backend and save it"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
+    if font_path and os.path.exists(font_path):
+        font_manager.fontManager.addfont(font_path)
+        plt.rcParams['font.family'] = font_manager.FontProperties(fname=font_path).get_name()
+
+    _, func = Plotter._plots[name]
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        func(result, ax)
+        fig.tight_layout()
+        fig.savefig(output_path, dpi=100)
+    finally:
+        plt.close(fig)
+    return output_path
+
+@Plotter.register('word_frequency', 'token_frequency')
+def plot_word_frequency(top_tokens, ax, top_k=10):
+    """Plot word frequency distribution"""
+    top_tokens.head(top_k).plot.bar(ax=ax, color='skyblue')
+    ax.set_title(f'Top {top_k} Most Common Words')
+    ax.set_xlabel('Words')
+    ax.set_ylabel('Frequency')
+    ax.tick_params(axis='x', rotation=45)
+
+@Plotter.register('message_length', 'message_length')
+def plot_message_length(histogram, ax, bins=20):
+    """Plot message length distribution"""
+    longest = int(np.flatnonzero(histogram).max()) if histogram.any() else 0
+    lengths = np.arange(longest + 1)
+    ax.hist(lengths, bins=bins, weights=histogram[:longest + 1], color='lightgreen', edgecolor='black')
+    ax.set_title('Distribution of Message Lengths')
+    ax.set_xlabel('Number of Words')
+    ax.set_ylabel('Frequency')
+
+@Plotter.register('time_series', 'time_series')
+def plot_time_series(daily_counts, ax):
+    """Plot messages over time"""
+    if not daily_counts.empty:
+        daily_counts.plot(ax=ax, color='orange')
+    ax.set_title('Messages Over Time')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Message Count')
+    ax.grid(True)
+
+@Plotter.register('channel_counts', 'channel_counts')
+def plot_channel_counts(channel_counts, ax):
+    """Plot messages per channel"""
+    channel_counts.plot.barh(ax=ax, color='steelblue')
+    ax.invert_yaxis()
+    ax.set_title('Messages per Channel')
+    ax.set_xlabel('Message Count')
+    ax.set_ylabel('Channel')
+
+# ==============================================
+# Command line
+# ==============================================
+
+def write_summary(statistics, file_path):
+    """Write a JSON summary of every statistic atomically"""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({name: stat.summary() for name, stat in statistics.items()}, file,
+                  indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, file_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Single-pass EDA statistics and headless plots")
+    parser.add_argument('inputs', nargs='*', default=[CLEANED_DATA_PATH],
+                        help="Cleaned (or raw) CSV or Parquet files")
+    parser.add_argument('--output-dir', default=EDA_OUTPUT_DIR)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--capacity', type=int, default=200_000,
+                        help="Distinct tokens kept by the frequency counter (0 = exact)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--font', default=FONT_PATH)
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+    options = {'token_frequency': {'capacity': args.capacity or None}}
+    with instrumentation.monitored_run('eda'):
+        statistics = aggregate_files(args.inputs, args.chunksize, options=options, workers=args.workers)
+        os.makedirs(args.output_dir, exist_ok=True)
+        write_summary(statistics, os.path.join(args.output_dir, 'summary.json'))
+        paths = Plotter.render(statistics, args.output_dir, args.font, args.workers)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+    rows = int(statistics['message_length'].histogram.sum())
+    print(f"Aggregated {rows} messages in {time.perf_counter() - start_time:.2f} seconds")
+
+if __name__ == "__main__":
+    main()
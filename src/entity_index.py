@@ -0,0 +1,352 @@
+import argparse
+import re
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_storage import iter_frame_chunks
+from src.CoNLL_processing import CoNLLFormatter
+from src.normalization import ethiopic_numeral_value, fold_key
+from src.tokenization import NUMBER, tokenize, tokenize_typed
+
+CLEANED_DATA_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/cleaned_telegram_data.csv"
+INDEX_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/entity_index.sqlite"
+
+# Ethiopian phone numbers (0911223344, +251911223344) are numbers but never prices
+PHONE_PATTERN = re.compile(r'(?:\+?251|0)?[79]\d{8}')
+
+# ==============================================
+# Entity values
+# ==============================================
+
+def normalize_value(text, matcher=None):
+    """Index key of an entity surface form: normalized, case-folded, single-spaced, prefix-stripped
+
+    With a gazetteer ``matcher``, a leading Amharic prefix on the first word
+    (``በቦሌ`` -> ``ቦሌ``) is removed when the stem is a known entry.
+    """
+    words = fold_key(text).split()
+    if words and matcher is not None:
+        words[0] = matcher.strip_prefix(words[0]) or words[0]
+    return ' '.join(words)
+
+def entity_values(text, matcher=None):
+    """Index keys of an entity span: one per gazetteer entry it contains, plus runs of other words
+
+    The labeler merges adjacent entities of the same type, so ``Nike ጫማ``
+    is one PRODUCT span; it is indexed (and queried) as ``nike`` and ``ጫማ``.
+    """
+    words = tokenize(text)
+    if matcher is None:
+        return [normalize_value(' '.join(words))] if words else []
+    parts = []
+    position = 0
+    for start, end, _ in matcher.find_spans(words):
+        if start > position:
+            parts.append(words[position:start])
+        parts.append(words[start:end])
+        position = end
+    if position < len(words):
+        parts.append(words[position:])
+    return [normalize_value(' '.join(part), matcher) for part in parts]
+
+def parse_prices(text):
+    """Numeric value of every number in a price mention (``ዋጋ 1500 ብር 2500`` -> 1500.0, 2500.0)
+
+    Phone numbers are skipped.
+    """
+    prices = []
+    for token, kind in zip(*tokenize_typed(text)):
+        if kind != NUMBER or PHONE_PATTERN.fullmatch(token):
+            continue
+        if token[0].isdigit():
+            prices.append(float(token.replace(',', '')))
+        else:
+            prices.append(float(ethiopic_numeral_value(token)))
+    return prices
+
+def frame_entities(labeled, label_names):
+    """Collapse a ``label_frame`` token table into one row per entity span
+
+    Returns columns ``message_id``, ``entity_type`` and ``text`` (the span's
+    tokens joined by spaces).
+    """
+    label_ids = labeled['label_id'].to_numpy()
+    messages = labeled['message_id'].to_numpy()
+    is_entity = label_ids > 0
+    prefixes = np.array([name[:1] for name in label_names])
+    types = np.array([name[2:] for name in label_names], dtype=object)
+
+    starts = is_entity & (prefixes[label_ids] == 'B')
+    starts[1:] |= is_entity[1:] & ((messages[1:] != messages[:-1]) | ~is_entity[:-1])
+    starts[:1] |= is_entity[:1]
+    span_ids = np.cumsum(starts)[is_entity]
+
+    spans = pd.DataFrame({
+        'span': span_ids,
+        'message_id': messages[is_entity],
+        'entity_type': types[label_ids[is_entity]],
+        'token': labeled['token'].to_numpy()[is_entity],
+    })
+    return (spans.groupby('span', sort=False)
+                 .agg(message_id=('message_id', 'first'), entity_type=('entity_type', 'first'),
+                      text=('token', ' '.join))
+                 .reset_index(drop=True))
+
+# ==============================================
+# Persistent inverted index
+# ==============================================
+
+class EntityIndex:
+    """SQLite inverted index from entity values to the messages that mention them
+
+    ``postings`` is clustered by ``(entity_type, value, doc)`` so each
+    lookup is a range scan, and ``prices`` is clustered by ``(price, doc)``
+    so price filters are range scans too. Messages are keyed by
+    ``(channel, message_id)``; re-adding a message replaces its entries,
+    so appends and edits are both incremental.
+    """
+    def __init__(self, index_path=INDEX_PATH, matcher=None):
+        self.index_path = index_path
+        self.matcher = matcher
+        self.connection = sqlite3.connect(index_path)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS messages (
+                doc INTEGER PRIMARY KEY,
+                channel TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                date TEXT,
+                UNIQUE (channel, message_id)
+            );
+            CREATE INDEX IF NOT EXISTS messages_date ON messages (date);
+            CREATE TABLE IF NOT EXISTS postings (
+                entity_type TEXT NOT NULL,
+                value TEXT NOT NULL,
+                doc INTEGER NOT NULL,
+                PRIMARY KEY (entity_type, value, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+            CREATE TABLE IF NOT EXISTS prices (
+                price REAL NOT NULL,
+                doc INTEGER NOT NULL,
+                PRIMARY KEY (price, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS prices_doc ON prices (doc);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def _assign_docs(self, messages, dates):
+        """Upsert a batch of messages and return their doc ids, clearing old entries of re-added ones"""
+        keys = list(zip(messages['channel'].astype(str), messages['message_id'].astype(np.int64).tolist()))
+        self.connection.executemany(
+            "INSERT INTO messages (channel, message_id, date) VALUES (?, ?, ?) "
+            "ON CONFLICT (channel, message_id) DO UPDATE SET date = excluded.date",
+            [(channel, message_id, date) for (channel, message_id), date in zip(keys, dates)],
+        )
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS batch (channel TEXT, message_id INTEGER)")
+        self.connection.execute("DELETE FROM batch")
+        self.connection.executemany("INSERT INTO batch (channel, message_id) VALUES (?, ?)", keys)
+        docs = dict(((channel, message_id), doc) for channel, message_id, doc in self.connection.execute(
+            "SELECT m.channel, m.message_id, m.doc FROM batch b "
+            "JOIN messages m ON m.channel = b.channel AND m.message_id = b.message_id"
+        ))
+        self.connection.execute("DELETE FROM postings WHERE doc IN "
+                                "(SELECT m.doc FROM batch b JOIN messages m USING (channel, message_id))")
+        self.connection.execute("DELETE FROM prices WHERE doc IN "
+                                "(SELECT m.doc FROM batch b JOIN messages m USING (channel, message_id))")
+        return np.array([docs[key] for key in keys], dtype=np.int64)
+
+    def add_entities(self, messages, entities):
+        """Index one batch of messages in a single transaction
+
+        ``messages`` has ``channel``, ``message_id`` and ``date`` columns and is
+        indexed by the same ids ``entities.message_id`` refers to; ``entities``
+        has ``message_id``, ``entity_type`` and ``text``. Messages without
+        entities are still recorded, so they can be found by date. When a
+        batch holds a message twice (an edit appended after the original), only
+        the last row and its entities are indexed. Each span is split into its
+        gazetteer entries and every number in a price span is its own price;
+        both are computed once per distinct surface form.
+        """
+        messages = messages.drop_duplicates(['channel', 'message_id'], keep='last')
+        dates = pd.to_datetime(messages['date'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+        dates = dates.astype(object).where(dates.notna(), None).tolist()
+        with self.connection:
+            docs = pd.Series(self._assign_docs(messages, dates), index=messages.index)
+            entities = entities[entities['message_id'].isin(docs.index)]
+            doc_ids = docs.loc[entities['message_id']].to_numpy()
+            texts = entities['text'].astype(str)
+            distinct = pd.unique(texts)
+            values = texts.map({text: entity_values(text, self.matcher) for text in distinct})
+            postings = pd.DataFrame({
+                'entity_type': entities['entity_type'].to_numpy(),
+                'value': values.to_numpy(),
+                'doc': doc_ids,
+            }).explode('value').dropna().drop_duplicates()
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO postings (entity_type, value, doc) VALUES (?, ?, ?)",
+                postings.itertuples(index=False, name=None),
+            )
+
+            is_price = (entities['entity_type'] == 'PRICE').to_numpy()
+            prices = texts[is_price].map({text: parse_prices(text) for text in pd.unique(texts[is_price])})
+            prices = (pd.DataFrame({'price': prices.to_numpy(), 'doc': doc_ids[is_price]})
+                      .explode('price').dropna().drop_duplicates())
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO prices (price, doc) VALUES (?, ?)",
+                ((float(price), int(doc)) for price, doc in prices.itertuples(index=False, name=None)),
+            )
+        return len(messages)
+
+    def add_labeled_chunk(self, chunk, formatter, column='Cleaned_Message'):
+        """Label a preprocessed chunk with ``CoNLLFormatter.label_frame`` and index it"""
+        chunk = chunk.reset_index(drop=True)
+        labeled = formatter.label_frame(chunk, column=column)
+        return self.add_entities(_message_keys(chunk), frame_entities(labeled, formatter.label_names))
+
+    def add_predictions(self, chunk, predictions):
+        """Index ``NERPredictor.predict_batch`` output aligned with the rows of ``chunk``"""
+        chunk = chunk.reset_index(drop=True)
+        entities = pd.DataFrame(
+            [(row, entity['entity'], entity['word'])
+             for row, message_entities in enumerate(predictions) for entity in message_entities],
+            columns=['message_id', 'entity_type', 'text'],
+        )
+        return self.add_entities(_message_keys(chunk), entities)
+
+    def values(self, entity_type, prefix=''):
+        """Indexed values of one entity type (optionally starting with ``prefix``) with message counts"""
+        prefix = normalize_value(prefix, self.matcher)
+        return self.connection.execute(
+            "SELECT value, COUNT(*) FROM postings WHERE entity_type = ? AND value >= ? AND value < ? "
+            "GROUP BY value ORDER BY COUNT(*) DESC",
+            (entity_type, prefix, prefix + '\U0010ffff'),
+        ).fetchall()
+
+    def query(self, entities=None, min_price=None, max_price=None, since=None, until=None,
+              channels=None, limit=None):
+        """Messages matching every condition, as a DataFrame of channel, message_id and date
+
+        ``entities`` maps an entity type to a value or list of values; a
+        message must mention every listed value (a multi-entry value such as
+        ``Nike ጫማ`` needs each of its entries). Prices are inclusive bounds
+        on any price in the message; ``since``/``until`` are inclusive dates.
+        """
+        conditions, parameters = [], []
+        for entity_type, values in (entities or {}).items():
+            for value in [values] if isinstance(values, str) else values:
+                for key in entity_values(value, self.matcher):
+                    conditions.append("m.doc IN (SELECT doc FROM postings WHERE entity_type = ? AND value = ?)")
+                    parameters += [entity_type, key]
+        if min_price is not None or max_price is not None:
+            conditions.append("m.doc IN (SELECT doc FROM prices WHERE price BETWEEN ? AND ?)")
+            parameters += [float('-inf') if min_price is None else min_price,
+                           float('inf') if max_price is None else max_price]
+        if since is not None:
+            conditions.append("m.date >= ?")
+            parameters.append(pd.Timestamp(since).strftime('%Y-%m-%d %H:%M:%S'))
+        if until is not None:
+            conditions.append("m.date < ?")
+            parameters.append((pd.Timestamp(until) + pd.Timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))
+        if channels:
+            channels = [channels] if isinstance(channels, str) else list(channels)
+            conditions.append(f"m.channel IN ({','.join('?' * len(channels))})")
+            parameters += channels
+
+        sql = "SELECT m.channel, m.message_id, m.date FROM messages m"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY m.date DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = self.connection.execute(sql, parameters).fetchall()
+        return pd.DataFrame(rows, columns=['channel', 'message_id', 'date'])
+
+def _message_keys(chunk):
+    return pd.DataFrame({
+        'channel': chunk['Channel Username'],
+        'message_id': chunk['ID'],
+        'date': chunk['Date'] if 'Date' in chunk.columns else pd.NaT,
+    }, index=chunk.index).dropna(subset=['channel', 'message_id'])
+
+# ==============================================
+# Building the index
+# ==============================================
+
+def build_index(cleaned_path=CLEANED_DATA_PATH, index_path=INDEX_PATH, chunksize=10_000,
+                formatter=None, predictor=None):
+    """Index a cleaned messages file chunk by chunk, with gazetteer labels or model predictions
+
+    Re-running on a file that grew only rewrites the entries of messages it
+    sees again; existing entries for other messages are kept. Only the last
+    row of a message is indexed, and a message edited to empty text keeps no
+    entities.
+    """
+    start_time = time.perf_counter()
+    formatter = formatter or CoNLLFormatter()
+    columns = ['Channel Username', 'ID', 'Date', 'Cleaned_Message']
+    rows = 0
+    with EntityIndex(index_path, matcher=formatter.matcher) as index:
+        for chunk in iter_frame_chunks(cleaned_path, columns, chunksize):
+            # Edited messages are appended after their old version
+            chunk = chunk.drop_duplicates(['Channel Username', 'ID'], keep='last')
+            if predictor is not None:
+                present = chunk['Cleaned_Message'].notna().to_numpy()
+                predicted = iter(predictor.predict_batch(
+                    chunk['Cleaned_Message'][present].astype(str).tolist()))
+                predictions = [next(predicted) if has_text else [] for has_text in present]
+                rows += index.add_predictions(chunk, predictions)
+            else:
+                rows += index.add_labeled_chunk(chunk, formatter)
+    print(f"Indexed {rows} messages in {time.perf_counter() - start_time:.2f} seconds")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the entity inverted index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build')
+    build.add_argument('--input', default=CLEANED_DATA_PATH)
+    build.add_argument('--index', default=INDEX_PATH)
+    build.add_argument('--chunksize', type=int, default=10_000)
+    build.add_argument('--model', help="Index model predictions from this checkpoint instead of gazetteer labels")
+    query = subparsers.add_parser('query')
+    query.add_argument('--index', default=INDEX_PATH)
+    query.add_argument('--product', action='append', default=[])
+    query.add_argument('--location', action='append', default=[])
+    query.add_argument('--min-price', type=float)
+    query.add_argument('--max-price', type=float)
+    query.add_argument('--since')
+    query.add_argument('--until')
+    query.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        predictor = None
+        if args.model:
+            from src.ner_inference import NERPredictor
+            predictor = NERPredictor.from_pretrained(args.model)
+        build_index(args.input, args.index, args.chunksize, predictor=predictor)
+    else:
+        with EntityIndex(args.index, matcher=CoNLLFormatter().matcher) as index:
+            start = time.perf_counter()
+            result = index.query({'PRODUCT': args.product, 'LOC': args.location},
+                                 args.min_price, args.max_price, args.since, args.until, limit=args.limit)
+            print(result.to_string(index=False))
+            print(f"{len(result)} messages in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from src.model_export import entity_spans
+
+# ==============================================
+# Memoized, batched model backend
+# ==============================================
+
+class EvaluationBudgetExceeded(RuntimeError):
+    """Raised when an explanation needs more model evaluations than ``max_evals`` allows"""
+
+class ExplanationBackend:
+    """Word-level label probabilities for perturbed messages, batched and memoized
+
+    Perturbations replace words with the tokenizer's mask token instead of
+    deleting them, so word ``i`` of a perturbed text is still word ``i`` of
+    the original and span targets stay aligned. Repeated perturbations are
+    served from an LRU cache; only distinct unseen texts reach the model,
+    in batches of ``predictor.batch_size``. ``max_evals`` caps the number of
+    texts sent to the model over the backend's lifetime.
+    """
+    def __init__(self, predictor, cache_size=4096, max_evals=None):
+        self.predictor = predictor
+        self.cache_size = cache_size
+        self.max_evals = max_evals
+        self.cache = OrderedDict()
+        self.evaluations = 0
+        self.hits = 0
+        self.mask_token = predictor.tokenizer.mask_token or predictor.tokenizer.unk_token
+        self.label_names = [predictor.id2label[i] for i in range(len(predictor.id2label))]
+
+    def cache_info(self):
+        return {'hits': self.hits, 'evaluations': self.evaluations, 'size': len(self.cache)}
+
+    def word_probabilities(self, texts):
+        """``(words, labels)`` probability arrays for each text"""
+        results = [None] * len(texts)
+        missing = OrderedDict()
+        for i, text in enumerate(texts):
+            cached = self.cache.get(text)
+            if cached is not None:
+                self.cache.move_to_end(text)
+                self.hits += 1
+                results[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if self.max_evals is not None and self.evaluations + len(missing) > self.max_evals:
+            raise EvaluationBudgetExceeded(
+                f"{len(missing)} new evaluations would exceed the budget of {self.max_evals} "
+                f"({self.evaluations} used)"
+            )
+        pending = list(missing)
+        batch_size = self.predictor.batch_size
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            for text, (_, probabilities) in zip(chunk, self.predictor.predict_word_probabilities(chunk)):
+                self.evaluations += 1
+                self.cache[text] = probabilities
+                for i in missing[text]:
+                    results[i] = probabilities
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return results
+
+    def span_scores(self, texts, span, label_ids):
+        """Mean probability of ``label_ids`` (one per word) over the words ``span = (start, end)``
+
+        This is the quantity explained: how strongly the model still assigns
+        the original entity labels to the target span.
+        """
+        start, end = span
+        positions = np.arange(start, end)
+        return np.array([probabilities[positions, label_ids].mean()
+                         for probabilities in self.word_probabilities(list(texts))])
+
+    def mask_words(self, words, keep):
+        """Rebuild a message keeping the words where ``keep`` is true and masking the rest"""
+        return ' '.join(word if flag else self.mask_token for word, flag in zip(words, keep))
+
+# ==============================================
+# Targets
+# ==============================================
+
+def predicted_entities(backend, text):
+    """Predicted ``(start, end, type)`` word spans, the words and each word's predicted label id"""
+    (spans, labels, _), = backend.predictor.predict_word_labels([text])
+    words = [text[start:end] for start, end in spans]
+    label_ids = [backend.label_names.index(label) for label in labels]
+    return sorted(entity_spans(labels)), words, label_ids
+
+# ==============================================
+# LIME and SHAP front ends
+# ==============================================
+
+def explain_span_lime(backend, words, span, label_ids, num_samples=500, num_features=10, seed=0):
+    """LIME weights per word position for the target span keeping its labels"""
+    from lime.lime_text import LimeTextExplainer
+
+    explainer = LimeTextExplainer(
+        class_names=['changed', 'kept'],
+        bow=False,
+        split_expression=r'\s+',
+        mask_string=backend.mask_token,
+        random_state=seed,
+    )
+    def classifier(texts):
+        scores = backend.span_scores(texts, span, label_ids)
+        return np.column_stack([1 - scores, scores])
+
+    explanation = explainer.explain_instance(
+        ' '.join(words), classifier, labels=(1,), num_features=num_features, num_samples=num_samples,
+    )
+    return {int(index): float(weight) for index, weight in explanation.as_map()[1]}
+
+def explain_span_shap(backend, words, span, label_ids, max_evals=500):
+    """Kernel SHAP values per word position for the target span keeping its labels
+
+    Features are word presence flags; an absent word is replaced by the mask
+    token, and the all-masked message is the background.
+    """
+    import shap
+
+    words = list(words)
+
+    def model(keep_matrix):
+        texts = [backend.mask_words(words, keep) for keep in keep_matrix]
+        return backend.span_scores(texts, span, label_ids)
+
+    explainer = shap.KernelExplainer(model, np.zeros((1, len(words))))
+    values = explainer.shap_values(np.ones((1, len(words))), nsamples=max_evals, silent=True)
+    return dict(enumerate(np.asarray(values).reshape(-1).tolist()))
+
+def explain_entities(backend, text, method='lime', budget=500, num_features=10):
+    """Explain every predicted entity in ``text`` with per-word attributions
+
+    The explained score is the mean probability of the span's predicted
+    labels. ``budget`` is the number of perturbations per entity (LIME
+    samples or SHAP evaluations); cached perturbations shared between entities are
+    only run once. Returns a list of ``{'entity', 'start', 'end', 'words',
+    'attributions'}`` with attributions as ``(word_index, word, weight)``
+    sorted by absolute weight.
+    """
+    entities, words, label_ids = predicted_entities(backend, text)
+    results = []
+    for start, end, entity_type in entities:
+        target = label_ids[start:end]
+        if method == 'lime':
+            weights = explain_span_lime(backend, words, (start, end), target,
+                                        num_samples=budget, num_features=num_features)
+        elif method == 'shap':
+            weights = explain_span_shap(backend, words, (start, end), target, max_evals=budget)
+        else:
+            raise ValueError(f"Unknown explanation method: {method}")
+        attributions = sorted(
+            ((index, words[index], weight) for index, weight in weights.items()),
+            key=lambda item: -abs(item[2]),
+        )[:num_features]
+        results.append({
+            'entity': entity_type,
+            'start': start,
+            'end': end,
+            'words': words[start:end],
+            'attributions': attributions,
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explain predicted entities with LIME or SHAP word attributions")
+    parser.add_argument('model_path')
+    parser.add_argument('samples', help="Text file with one message per line")
+    parser.add_argument('--method', choices=('lime', 'shap'), default='lime')
+    parser.add_argument('--budget', type=int, default=500, help="Perturbations per entity")
+    parser.add_argument('--max-evals', type=int, help="Hard cap on model evaluations for the whole run")
+    parser.add_argument('--output', default='explanations.json')
+    args = parser.parse_args(argv)
+
+    from src.ner_inference import NERPredictor
+
+    with open(args.samples, 'r', encoding='utf-8') as file:
+        texts = [line.strip() for line in file if line.strip()]
+    backend = ExplanationBackend(NERPredictor.from_pretrained(args.model_path), max_evals=args.max_evals)
+    report = [{'text': text, 'entities': explain_entities(backend, text, args.method, args.budget)}
+              for text in texts]
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Explained {len(texts)} messages: {backend.cache_info()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+
+from src.normalization import fold_key
+
+# ==============================================
+# Amharic morphology helpers
+# ==============================================
+
+# Prepositional prefixes that attach directly to the following word
+# (በአዲስ -> በ + አዲስ, ለልጅዎ -> ለ + ልጅዎ). Longest prefixes are tried first.
+AMHARIC_PREFIXES = ('እንደ', 'ስለ', 'ወደ', 'በ', 'ለ', 'የ', 'ከ')
+
+_TERMINAL = None  # Trie key holding the entity type of a complete entry
+
+
+class GazetteerMatcher:
+    """Token trie over lexicon entries with longest-match-wins span labeling"""
+
+    def __init__(self, prefixes=AMHARIC_PREFIXES):
+        self._root = {}
+        self._max_span = 0
+        self._size = 0
+        self.prefixes = tuple(sorted(prefixes, key=len, reverse=True))
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _key(token):
+        """Normalize a token for lookup (homophones folded, Latin case-folded)."""
+        return fold_key(token)
+
+    def add(self, phrase, entity_type):
+        """Add a (possibly multi-word) entry. The first type registered for a phrase wins."""
+        tokens = phrase.split()
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(self._key(token), {})
+        if _TERMINAL not in node:
+            node[_TERMINAL] = entity_type
+            self._size += 1
+        self._max_span = max(self._max_span, len(tokens))
+
+    def add_many(self, phrases, entity_type):
+        """Add an iterable of entries of the same entity type."""
+        for phrase in phrases:
+            self.add(phrase, entity_type)
+        return self
+
+    def add_file(self, file_path, entity_type=None):
+        """Load a gazetteer file with one entry per line.
+
+        Lines are either ``entry`` (requires ``entity_type``) or
+        ``TYPE<TAB>entry``. Blank lines and ``#`` comments are ignored.
+        """
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if '\t' in line:
+                    line_type, phrase = line.split('\t', 1)
+                else:
+                    line_type, phrase = entity_type, line
+                if line_type is None:
+                    raise ValueError(
+                        f"No entity type for '{line}' in {os.path.basename(file_path)}"
+                    )
+                self.add(phrase, line_type.strip())
+        return self
+
+    @property
+    def max_span(self):
+        """Number of tokens in the longest entry."""
+        return self._max_span
+
+    def entries(self):
+        """Yield ``(key_tokens, entity_type)`` for every entry, keys normalized."""
+        stack = [((), self._root)]
+        while stack:
+            path, node = stack.pop()
+            for key, child in node.items():
+                if key is _TERMINAL:
+                    yield path, child
+                else:
+                    stack.append((path + (key,), child))
+
+    def strip_prefix(self, key):
+        """Return ``key`` if it starts an entry, else its prefix-stripped stem that does, else None."""
+        if key in self._root:
+            return key
+        for prefix in self.prefixes:
+            if len(key) > len(prefix) and key.startswith(prefix) and key[len(prefix):] in self._root:
+                return key[len(prefix):]
+        return None
+
+    def _first_node(self, token):
+        """Return the child of the root for a token, stripping a known prefix if needed."""
+        key = self.strip_prefix(self._key(token))
+        return None if key is None else self._root[key]
+
+    def match_at(self, tokens, start):
+        """Return ``(end, entity_type)`` of the longest entry starting at ``start``, or None."""
+        node = self._first_node(tokens[start])
+        if node is None:
+            return None
+        best = None
+        position = start + 1
+        limit = min(len(tokens), start + self._max_span)
+        while True:
+            if _TERMINAL in node:
+                best = (position, node[_TERMINAL])
+            if position >= limit:
+                break
+            node = node.get(self._key(tokens[position]))
+            if node is None:
+                break
+            position += 1
+        return best
+
+    def find_spans(self, tokens):
+        """Scan tokens left to right, yielding non-overlapping ``(start, end, type)`` spans.
+
+        Work per token is bounded by the longest entry, not by lexicon size.
+        """
+        i = 0
+        n = len(tokens)
+        while i < n:
+            found = self.match_at(tokens, i)
+            if found is None:
+                i += 1
+                continue
+            end, entity_type = found
+            yield i, end, entity_type
+            i = end
@@ -0,0 +1,267 @@
+import argparse
+import os
+import shutil
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.data_preprocessing import (
+    CLEANED_DATA_PATH, DEFAULT_CHUNKSIZE, cleaned_output, iter_preprocessed_chunks,
+)
+from src.CoNLL_processing import CoNLLFormatter
+from src.conll_io import drop_marked_sentences, message_marker
+from src.dedup import DEDUP_INDEX_PATH, load_or_create
+from src import instrumentation
+
+RAW_DATA_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/telegram_data.csv"
+LABELED_DATA_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/labeled_messages.conll"
+MANIFEST_PATH = "C:/Users/ibsan/Desktop/TenX/week-5/data/processing_manifest.sqlite"
+
+KEY_COLUMNS = ['Channel Username', 'ID']
+
+# ==============================================
+# Manifest of processed (channel, message ID) keys
+# ==============================================
+
+def message_digests(messages):
+    """Vectorized 64-bit content hash of each message, used to detect edits"""
+    hashed = pd.util.hash_pandas_object(messages.astype(str), index=False)
+    return hashed.to_numpy().view(np.int64)
+
+class ProcessingManifest:
+    """SQLite store of processed message keys with a per-channel high-water mark"""
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.connection = sqlite3.connect(manifest_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS processed (
+                channel TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                digest INTEGER NOT NULL,
+                PRIMARY KEY (channel, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS high_water (
+                channel TEXT PRIMARY KEY,
+                max_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS superseded (
+                key TEXT PRIMARY KEY,
+                relabeled INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        self._high_water = dict(self.connection.execute("SELECT channel, max_id FROM high_water"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def high_water_mark(self, channel):
+        """Largest message ID processed for ``channel`` (-1 if none)"""
+        return self._high_water.get(channel, -1)
+
+    def _stored_digests(self, channel, ids):
+        """Stored digests for ``ids`` of one channel, as a dict"""
+        stored = {}
+        ids = [int(i) for i in ids]
+        for start in range(0, len(ids), 900):  # stay under SQLite's bound-parameter limit
+            batch = ids[start:start + 900]
+            placeholders = ','.join('?' * len(batch))
+            stored.update(self.connection.execute(
+                f"SELECT id, digest FROM processed WHERE channel = ? AND id IN ({placeholders})",
+                [channel, *batch],
+            ))
+        return stored
+
+    def select_changed(self, chunk):
+        """Return the rows of a raw chunk that are new or whose text changed
+
+        Rows above the channel's high-water mark are new without a lookup; only
+        older rows are checked against their stored digest. Rows without a
+        channel or ID cannot be keyed and are dropped. The digest is attached
+        as ``_digest`` for ``commit``.
+        """
+        chunk = chunk.dropna(subset=KEY_COLUMNS).copy()
+        chunk['ID'] = chunk['ID'].astype(np.int64)
+        chunk['_digest'] = message_digests(chunk['Message'])
+        keep = np.zeros(len(chunk), dtype=bool)
+        for channel, positions in chunk.groupby('Channel Username', sort=False).indices.items():
+            ids = chunk['ID'].to_numpy()[positions]
+            is_new = ids > self.high_water_mark(channel)
+            keep[positions[is_new]] = True
+            old = positions[~is_new]
+            if len(old):
+                stored = self._stored_digests(channel, ids[~is_new])
+                digests = chunk['_digest'].to_numpy()[old]
+                changed = [stored.get(int(i)) != int(d) for i, d in zip(ids[~is_new], digests)]
+                keep[old[np.asarray(changed, dtype=bool)]] = True
+        return chunk[keep]
+
+    def commit(self, chunk, superseded=None):
+        """Record processed rows and advance the high-water marks in one transaction
+
+        ``superseded`` maps the keys of edited messages to whether a new
+        sentence was written for them. They are stored in the same transaction,
+        so their stale CoNLL sentences are still removed if the run stops
+        before compacting.
+        """
+        rows = zip(
+            chunk['Channel Username'].astype(str),
+            chunk['ID'].astype(np.int64).tolist(),
+            chunk['_digest'].astype(np.int64).tolist(),
+        )
+        marks = chunk.groupby('Channel Username')['ID'].max()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO processed (channel, id, digest) VALUES (?, ?, ?)", rows
+            )
+            for channel, max_id in marks.items():
+                max_id = max(int(max_id), self.high_water_mark(channel))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO high_water (channel, max_id) VALUES (?, ?)",
+                    (channel, max_id),
+                )
+                self._high_water[channel] = max_id
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO superseded (key, relabeled) VALUES (?, ?)",
+                ((key, int(relabeled)) for key, relabeled in (superseded or {}).items()),
+            )
+
+    def pending_superseded(self):
+        """``{key: relabeled}`` for edited messages whose stale sentences are not yet removed"""
+        return {key: bool(relabeled) for key, relabeled in
+                self.connection.execute("SELECT key, relabeled FROM superseded")}
+
+    def clear_superseded(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM superseded")
+
+# ==============================================
+# Incremental pipeline
+# ==============================================
+
+def _remove_output(path):
+    """Delete a previous output file or Parquet part directory"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def compact_conll(manifest, conll_path):
+    """Remove the stale CoNLL sentences of the edited messages pending in ``manifest``
+
+    A relabeled message keeps only its last sentence and a message that was
+    not relabeled (now empty or a near-duplicate) loses all of them, so
+    repeating an interrupted compaction is harmless.
+    """
+    pending = manifest.pending_superseded()
+    if not pending:
+        return 0
+    dropped = 0
+    if os.path.exists(conll_path):
+        with instrumentation.stage('compact'):
+            keep_last = [key for key, relabeled in pending.items() if relabeled]
+            dropped = drop_marked_sentences(conll_path, pending, keep_last=keep_last)
+        instrumentation.count('incremental.superseded_sentences', dropped)
+    manifest.clear_superseded()
+    return dropped
+
+def preprocess_incremental(file_path=RAW_DATA_PATH, output_path=CLEANED_DATA_PATH,
+                           conll_path=LABELED_DATA_PATH, manifest_path=MANIFEST_PATH,
+                           rebuild=False, chunksize=DEFAULT_CHUNKSIZE, formatter=None,
+                           dedup_path=None, dedup_save_every=20):
+    """Clean, tokenize and label only new or edited messages, appending to existing outputs
+
+    Edited messages are appended to the cleaned output again, so its readers
+    should keep the last row per (channel, ID). Each CoNLL sentence follows a
+    ``# message_id = channel/ID`` marker. Edited keys are committed to the
+    manifest with their chunk, and their earlier sentences are removed from
+    the CoNLL file at the start and end of each run, which also finishes the
+    work of an interrupted run. Each chunk is committed to the manifest only
+    after its outputs are written. ``rebuild`` clears the manifest and
+    outputs first. With ``dedup_path``, near-duplicates of messages seen in
+    this or earlier runs are skipped (but still committed); the dedup index
+    is saved there after every ``dedup_save_every`` committed chunks and at
+    the end of the run. Returns the number of rows processed in this run.
+    """
+    if rebuild:
+        for path in (output_path, conll_path, manifest_path, dedup_path):
+            if path:
+                _remove_output(path)
+
+    formatter = formatter or CoNLLFormatter()
+    deduplicator = load_or_create(dedup_path) if dedup_path else None
+    rows = chunks = 0
+    with ProcessingManifest(manifest_path) as manifest, \
+            cleaned_output(output_path, append=True) as write_chunk:
+        if conll_path:
+            compact_conll(manifest, conll_path)
+        conll_file = open(conll_path, 'a', encoding='utf-8') if conll_path else None
+        try:
+            for chunk in iter_preprocessed_chunks(file_path, chunksize, select=manifest.select_changed):
+                keys = chunk['Channel Username'].astype(str) + '/' + chunk['ID'].astype(str)
+                seen = chunk['ID'] <= chunk['Channel Username'].map(manifest.high_water_mark)
+                kept = chunk
+                superseded = {}
+                if deduplicator is not None:
+                    with instrumentation.stage('dedup'):
+                        kept = deduplicator.deduplicate(chunk)
+                with instrumentation.stage('write'):
+                    write_chunk(kept.drop(columns='_digest'))
+                if conll_file is not None:
+                    with instrumentation.stage('label'):
+                        messages = kept['Cleaned_Message'].dropna()
+                        relabeled = chunk.index.isin(messages.index)
+                        superseded = dict(zip(keys[seen], relabeled[seen.to_numpy()]))
+                        for key, sentence in formatter.iter_labeled_messages(
+                                messages, normalized=True, keys=keys[messages.index]):
+                            conll_file.write(f"{message_marker(key)}{sentence}\n\n")
+                        conll_file.flush()
+                with instrumentation.stage('commit'):
+                    manifest.commit(chunk, superseded)
+                    chunks += 1
+                    # Saved after the manifest commit: an index ahead of the manifest
+                    # would treat the re-read chunk as duplicates of itself
+                    if deduplicator is not None and chunks % dedup_save_every == 0:
+                        deduplicator.save(dedup_path)
+                rows += len(chunk)
+                instrumentation.count('incremental.rows', len(chunk))
+                instrumentation.count('incremental.duplicates', len(chunk) - len(kept))
+        finally:
+            if conll_file is not None:
+                conll_file.close()
+
+        if deduplicator is not None and chunks % dedup_save_every:
+            deduplicator.save(dedup_path)
+        if conll_path:
+            compact_conll(manifest, conll_path)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally preprocess and label Telegram messages")
+    parser.add_argument('--input', default=RAW_DATA_PATH)
+    parser.add_argument('--output', default=CLEANED_DATA_PATH)
+    parser.add_argument('--conll', default=LABELED_DATA_PATH)
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--dedup', nargs='?', const=DEDUP_INDEX_PATH, metavar='INDEX',
+                        help="Skip near-duplicate messages, keeping the MinHash index at INDEX")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard the manifest and outputs and reprocess everything")
+    parser.add_argument('--report', help="Write the JSON run report (stage timings, counters) here")
+    parser.add_argument('--profile', nargs='*', default=[], metavar='STAGE',
+                        help="Run these stages under cProfile and include the top functions in the report")
+    args = parser.parse_args(argv)
+    with instrumentation.monitored_run('incremental', args.report, profile_stages=args.profile) as monitor:
+        rows = preprocess_incremental(args.input, args.output, args.conll, args.manifest,
+                                      rebuild=args.rebuild, chunksize=args.chunksize, dedup_path=args.dedup)
+    print(f"Incremental run processed {rows} new or edited rows")
+    print("\n".join(monitor.summary_lines()))
+
+if __name__ == "__main__":
+    main()
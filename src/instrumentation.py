@@ -0,0 +1,298 @@
+import contextvars
+import cProfile
+import inspect
+import io
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+# ==============================================
+# Memory
+# ==============================================
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where ``resource`` is unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+# ==============================================
+# Latency histogram
+# ==============================================
+
+class Histogram:
+    """Log-bucketed latency histogram (about 9% relative bucket width) with exact min/max/mean"""
+    BUCKETS_PER_OCTAVE = 8
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        bucket = math.floor(math.log2(max(seconds, 1e-9)) * self.BUCKETS_PER_OCTAVE)
+        self.buckets[bucket] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile ``q``, clamped to the observed range"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.max, max(self.min, 2 ** ((bucket + 1) / self.BUCKETS_PER_OCTAVE)))
+        return self.max
+
+    def summary(self):
+        to_ms = lambda value: None if value is None else round(value * 1000, 4)
+        return {
+            'count': self.count,
+            'mean_ms': to_ms(self.total / self.count) if self.count else None,
+            'min_ms': to_ms(self.min) if self.count else None,
+            'p50_ms': to_ms(self.quantile(0.50)),
+            'p95_ms': to_ms(self.quantile(0.95)),
+            'p99_ms': to_ms(self.quantile(0.99)),
+            'max_ms': to_ms(self.max) if self.count else None,
+        }
+
+# ==============================================
+# Run monitor
+# ==============================================
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.peak_rss_mb = None
+        self.tracemalloc_peak_mb = None
+        self.profile = None
+
+    def summary(self):
+        result = {'calls': self.calls, 'seconds': round(self.seconds, 6), 'errors': self.errors}
+        if self.peak_rss_mb is not None:
+            result['peak_rss_mb'] = round(self.peak_rss_mb, 1)
+        if self.tracemalloc_peak_mb is not None:
+            result['tracemalloc_peak_mb'] = round(self.tracemalloc_peak_mb, 3)
+        if self.profile is not None:
+            result['profile'] = self.profile
+        return result
+
+_stage_path = contextvars.ContextVar('stage_path', default=())
+
+class RunMonitor:
+    """Stage timers, counters and latency histograms for one pipeline run
+
+    Stages nest: a stage opened inside another is reported under the path
+    ``outer/inner``. The current path is a context variable, so concurrent
+    asyncio tasks and threads each keep their own nesting. Stages named in
+    ``profile_stages`` run under cProfile (the outermost one wins when they
+    nest) and their top functions are added to the report. Each stage also
+    records peak RSS at its end and, with ``trace_memory`` (tracemalloc for
+    the whole run), the peak traced Python allocation so far.
+    """
+    def __init__(self, name='run', trace_memory=False, profile_stages=(), profile_top=25):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.stages = {}
+        self.counters = Counter()
+        self.histograms = {}
+        self.errors = []
+        self.profile_stages = set(profile_stages)
+        self.profile_top = profile_top
+        self.trace_memory = trace_memory
+        self._profiling = False
+        self._lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as a stage nested under the currently open stage"""
+        path = _stage_path.get() + (name,)
+        token = _stage_path.set(path)
+        profiler = None
+        if name in self.profile_stages and not self._profiling:
+            self._profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            _stage_path.reset(token)
+            key = '/'.join(path)
+            with self._lock:
+                stats = self.stages.get(key)
+                if stats is None:
+                    stats = self.stages[key] = StageStats()
+                stats.calls += 1
+                stats.seconds += elapsed
+                stats.errors += failed
+                stats.peak_rss_mb = peak_rss_mb()
+                if self.trace_memory and tracemalloc.is_tracing():
+                    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                    stats.tracemalloc_peak_mb = max(stats.tracemalloc_peak_mb or 0.0, peak)
+                if profiler is not None:
+                    stats.profile = self._profile_rows(profiler)
+                self.histograms.setdefault(f"stage:{key}", Histogram()).observe(elapsed)
+
+    def _profile_rows(self, profiler):
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream).sort_stats('cumulative')
+        rows = []
+        for (file_name, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f"{os.path.basename(file_name)}:{line}({function})",
+                'calls': calls,
+                'tottime_s': round(tottime, 6),
+                'cumtime_s': round(cumtime, 6),
+            })
+        rows.sort(key=lambda row: row['cumtime_s'], reverse=True)
+        return rows[:self.profile_top]
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def count_many(self, counts, prefix=''):
+        """Add a mapping of counts, e.g. entities by type, under ``prefix``"""
+        with self._lock:
+            for name, value in counts.items():
+                self.counters[f"{prefix}{name}"] += value
+
+    def observe(self, name, seconds):
+        """Record one latency sample in the histogram ``name``"""
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(seconds)
+
+    def record_error(self, where, error):
+        """Keep a failure in the report (the caller still decides whether to re-raise)"""
+        with self._lock:
+            self.counters[f"errors.{where}"] += 1
+            self.errors.append({'where': where, 'type': type(error).__name__, 'message': str(error)})
+
+    def memory_snapshot(self):
+        snapshot = {'peak_rss_mb': peak_rss_mb()}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot['tracemalloc_current_mb'] = current / 2 ** 20
+            snapshot['tracemalloc_peak_mb'] = peak / 2 ** 20
+        return snapshot
+
+    def report(self):
+        """Machine-readable run report"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'started_at': self.started_at,
+                'wall_seconds': round(time.perf_counter() - self.started, 6),
+                'memory': self.memory_snapshot(),
+                'stages': {key: stats.summary() for key, stats in sorted(self.stages.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'histograms': {key: histogram.summary() for key, histogram in sorted(self.histograms.items())},
+                'errors': list(self.errors),
+            }
+
+    def write_report(self, file_path):
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+
+    def summary_lines(self):
+        """Human-readable stage timings, slowest first"""
+        stages = sorted(self.stages.items(), key=lambda item: -item[1].seconds)
+        return [f"{key:<50} {stats.calls:>8} calls {stats.seconds:10.3f}s" for key, stats in stages]
+
+# ==============================================
+# Process-wide monitor
+# ==============================================
+
+_monitor = RunMonitor()
+
+def get_monitor():
+    """The monitor instrumented code reports to"""
+    return _monitor
+
+def set_monitor(monitor):
+    """Replace the process-wide monitor and return the previous one"""
+    global _monitor
+    previous, _monitor = _monitor, monitor
+    return previous
+
+@contextmanager
+def monitored_run(name, report_path=None, trace_memory=False, profile_stages=()):
+    """Run a block with a fresh monitor, writing its JSON report on exit (also after a failure)"""
+    monitor = RunMonitor(name, trace_memory=trace_memory, profile_stages=profile_stages)
+    previous = set_monitor(monitor)
+    try:
+        with monitor.stage(name):
+            yield monitor
+    finally:
+        set_monitor(previous)
+        if report_path:
+            monitor.write_report(report_path)
+
+def stage(name):
+    """Open a stage on the process-wide monitor"""
+    return _monitor.stage(name)
+
+def count(name, value=1):
+    _monitor.count(name, value)
+
+def count_many(counts, prefix=''):
+    _monitor.count_many(counts, prefix)
+
+def observe(name, seconds):
+    _monitor.observe(name, seconds)
+
+def record_error(where, error):
+    _monitor.record_error(where, error)
+
+def timed(name=None):
+    """Decorator timing each call as a stage of whichever monitor is current at call time"""
+    def decorator(func):
+        stage_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_monitor().stage(stage_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_monitor().stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
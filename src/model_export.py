@@ -0,0 +1,272 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+import torch
+
+from src.conll_io import read_conll_file
+from src.ner_inference import NERPredictor, split_label
+
+MANIFEST_NAME = 'variants.json'
+
+# ==============================================
+# Graph wrappers
+# ==============================================
+
+class LogitsOnly(torch.nn.Module):
+    """Expose a Hugging Face token classifier as ``(input_ids, attention_mask) -> logits``"""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+class ScriptedTokenClassifier:
+    """Make a TorchScript graph look like a token classifier to ``NERPredictor``"""
+    def __init__(self, module, config):
+        self.module = module
+        self.config = config
+
+    def eval(self):
+        self.module.eval()
+        return self
+
+    def __call__(self, input_ids, attention_mask=None, token_type_ids=None):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        return SimpleNamespace(logits=self.module(input_ids, attention_mask))
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations fp32)"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def trace(model, tokenizer):
+    """Trace the model into a TorchScript graph using a small padded example batch"""
+    example = tokenizer(['ዋጋ 500 ብር', 'ቦሌ'], padding=True, return_tensors='pt')
+    with torch.inference_mode():
+        return torch.jit.trace(
+            LogitsOnly(model).eval(),
+            (example['input_ids'], example['attention_mask']),
+            strict=False,
+            check_trace=False,
+        )
+
+def state_size_bytes(model):
+    """Serialized size of a model's weights (what the variant costs on disk, not its RSS)"""
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+# ==============================================
+# Entity-level evaluation
+# ==============================================
+
+def entity_spans(labels):
+    """Set of ``(start, end, type)`` word spans in a BIO label sequence"""
+    spans = set()
+    start, current = None, None
+    for i, label in enumerate(list(labels) + ['O']):
+        prefix, entity_type = split_label(label)
+        if current is not None and (entity_type != current or prefix == 'B'):
+            spans.add((start, i, current))
+            current = None
+        if entity_type is not None and current is None:
+            start, current = i, entity_type
+    return spans
+
+def entity_f1(gold_sequences, predicted_sequences):
+    """Micro-averaged entity-level F1 (exact span and type match)"""
+    true_positives = gold_total = predicted_total = 0
+    for gold, predicted in zip(gold_sequences, predicted_sequences):
+        gold_spans, predicted_spans = entity_spans(gold), entity_spans(predicted)
+        true_positives += len(gold_spans & predicted_spans)
+        gold_total += len(gold_spans)
+        predicted_total += len(predicted_spans)
+    if not gold_total and not predicted_total:
+        return 1.0
+    precision = true_positives / predicted_total if predicted_total else 0.0
+    recall = true_positives / gold_total if gold_total else 0.0
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+def _word_labels(predictor, texts):
+    return [labels for _, labels, _ in predictor.predict_word_labels(texts)]
+
+def aligned_gold_sentences(predictor, texts, token_lists):
+    """Indices of the sentences whose predicted words are exactly the gold tokens
+
+    Gold sentences are re-joined and re-tokenized by the predictor, so a token
+    the scanner splits or merges differently would shift every label after it.
+    Only sentences with identical word boundaries can be scored.
+    """
+    aligned = []
+    for i, (text, tokens, (spans, _, _)) in enumerate(
+            zip(texts, token_lists, predictor.predict_word_labels(texts))):
+        if [text[start:end] for start, end in spans] == list(tokens):
+            aligned.append(i)
+    return aligned
+
+def _median_latency(predictor, texts, repeats):
+    predictor.predict_batch(texts[:1])  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict_batch(texts)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+# ==============================================
+# Export and selection
+# ==============================================
+
+def export_model_variants(model_path, output_dir, sample_texts=None, gold=None,
+                          repeats=5, batch_size=16, num_threads=None):
+    """Export int8 and TorchScript variants of a checkpoint and benchmark them against fp32
+
+    ``gold`` is an optional ``(token_lists, label_lists)`` pair; without it the
+    fp32 predictions on ``sample_texts`` serve as the reference, so F1 then
+    measures agreement with fp32. Latency is timed on ``sample_texts`` (the
+    gold texts if not given). Gold sentences whose words the predictor
+    splits differently are left out of F1 and counted in
+    ``skipped_gold_sentences``. ``size_mb`` is the serialized weight size,
+    not resident memory. Writes ``variants.json`` and returns it.
+    """
+    if sample_texts is None and gold is None:
+        raise ValueError("export_model_variants needs sample_texts or gold data")
+
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    fp32 = AutoModelForTokenClassification.from_pretrained(model_path).eval()
+    fp32.save_pretrained(os.path.join(output_dir, 'fp32'))
+    tokenizer.save_pretrained(output_dir)
+    fp32.config.save_pretrained(output_dir)
+
+    int8 = quantize_int8(fp32)
+    graphs = {'traced': trace(fp32, tokenizer), 'traced-int8': trace(int8, tokenizer)}
+    for name, graph in graphs.items():
+        torch.jit.save(graph, os.path.join(output_dir, f"{name}.pt"))
+
+    models = {
+        'fp32': fp32,
+        'int8': int8,
+        'traced': ScriptedTokenClassifier(graphs['traced'], fp32.config),
+        'traced-int8': ScriptedTokenClassifier(graphs['traced-int8'], fp32.config),
+    }
+    sizes = {
+        'fp32': state_size_bytes(fp32),
+        'int8': state_size_bytes(int8),
+        'traced': state_size_bytes(graphs['traced']),
+        'traced-int8': state_size_bytes(graphs['traced-int8']),
+    }
+
+    report = {'model_path': model_path, 'variants': {}}
+    if gold is not None:
+        texts = [' '.join(tokens) for tokens in gold[0]]
+        aligned = aligned_gold_sentences(NERPredictor(fp32, tokenizer, batch_size=batch_size), texts, gold[0])
+        if not aligned:
+            raise ValueError("No gold sentence lines up with the predictor's word tokenization")
+        report['skipped_gold_sentences'] = len(texts) - len(aligned)
+        if report['skipped_gold_sentences']:
+            print(f"Skipping {report['skipped_gold_sentences']} of {len(texts)} gold sentences "
+                  f"whose tokens the predictor splits differently")
+        eval_texts = [texts[i] for i in aligned]
+        reference = [gold[1][i] for i in aligned]
+    else:
+        eval_texts = sample_texts
+        reference = None
+    sample_texts = sample_texts or eval_texts
+
+    for name, model in models.items():
+        predictor = NERPredictor(model, tokenizer, batch_size=batch_size, num_threads=num_threads)
+        predicted = _word_labels(predictor, eval_texts)
+        if reference is None:
+            reference = predicted  # fp32 runs first
+        report['variants'][name] = {
+            'latency_s': _median_latency(predictor, sample_texts, repeats),
+            'size_mb': sizes[name] / 2 ** 20,
+            'f1': entity_f1(reference, predicted),
+        }
+
+    base = report['variants']['fp32']
+    for name, row in report['variants'].items():
+        row['speedup'] = base['latency_s'] / row['latency_s'] if row['latency_s'] else None
+        row['size_saved_mb'] = base['size_mb'] - row['size_mb']
+        row['f1_delta'] = row['f1'] - base['f1']
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    return report
+
+def _load_variant(output_dir, name):
+    from transformers import AutoConfig, AutoModelForTokenClassification
+
+    if name == 'fp32':
+        return AutoModelForTokenClassification.from_pretrained(os.path.join(output_dir, 'fp32'))
+    if name == 'int8':
+        # Dynamic quantization is cheap, so eager int8 is rebuilt from the fp32 weights
+        return quantize_int8(_load_variant(output_dir, 'fp32').eval())
+    module = torch.jit.load(os.path.join(output_dir, f"{name}.pt"))
+    return ScriptedTokenClassifier(module, AutoConfig.from_pretrained(output_dir))
+
+def _variant_available(output_dir, name):
+    if name in ('int8', 'traced-int8') and torch.backends.quantized.engine == 'none':
+        return False
+    path = os.path.join(output_dir, 'fp32' if name in ('fp32', 'int8') else f"{name}.pt")
+    return os.path.exists(path)
+
+def load_fastest_predictor(output_dir, max_f1_drop=0.01, **predictor_kwargs):
+    """Build a ``NERPredictor`` on the fastest exported variant within ``max_f1_drop`` of fp32"""
+    from transformers import AutoTokenizer
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as file:
+        report = json.load(file)
+    candidates = sorted(
+        (row['latency_s'], name) for name, row in report['variants'].items()
+        if row['f1_delta'] >= -max_f1_drop and _variant_available(output_dir, name)
+    )
+    name = candidates[0][1] if candidates else 'fp32'
+    predictor = NERPredictor(
+        _load_variant(output_dir, name), AutoTokenizer.from_pretrained(output_dir), **predictor_kwargs
+    )
+    predictor.variant = name
+    return predictor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export int8 and TorchScript variants of NER checkpoints")
+    parser.add_argument('model_paths', nargs='+')
+    parser.add_argument('--output-root', default='model_variants')
+    parser.add_argument('--samples', help="Text file with one sample message per line (timed and compared with fp32)")
+    parser.add_argument('--gold', help="Labeled CoNLL file; F1 is then measured against its labels")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+    if not args.samples and not args.gold:
+        parser.error("pass --samples and/or --gold so the variants are compared on real messages")
+
+    samples = gold = None
+    if args.samples:
+        with open(args.samples, 'r', encoding='utf-8') as file:
+            samples = [line.strip() for line in file if line.strip()]
+    if args.gold:
+        data = read_conll_file(args.gold)
+        gold = (data['tokens'], data['labels'])
+
+    for model_path in args.model_paths:
+        output_dir = os.path.join(args.output_root, os.path.basename(os.path.normpath(model_path)))
+        report = export_model_variants(model_path, output_dir, samples, gold=gold, repeats=args.repeats)
+        print(f"\n{model_path}")
+        for name, row in report['variants'].items():
+            print(f"  {name:<12} {row['latency_s'] * 1000:8.1f} ms  x{row['speedup']:.2f}  "
+                  f"{row['size_mb']:7.1f} MB (saved {row['size_saved_mb']:.1f})  "
+                  f"F1 {row['f1']:.4f} ({row['f1_delta']:+.4f})")
+
+if __name__ == "__main__":
+    main()
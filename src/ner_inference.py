@@ -0,0 +1,191 @@
+import time
+from collections import Counter
+
+import numpy as np
+import torch
+
+from src import instrumentation
+from src.normalization import normalize_with_offsets
+from src.tokenization import token_spans
+
+# ==============================================
+# Label helpers
+# ==============================================
+
+def split_label(label):
+    """Split a BIO label into ``(prefix, entity_type)``; ``('O', None)`` for outside"""
+    if label == 'O' or not label:
+        return 'O', None
+    if label[:2] in ('B-', 'I-'):
+        return label[0], label[2:]
+    return 'B', label
+
+def merge_word_predictions(text, words, labels, scores):
+    """Merge word-level BIO predictions into entity spans with character offsets
+
+    ``words`` are ``(start, end)`` offsets into ``text``. An ``I-`` label
+    continues the open span only when its type matches; otherwise it starts a
+    new span.
+    """
+    entities = []
+    current = None
+    for (start, end), label, score in zip(words, labels, scores):
+        prefix, entity_type = split_label(label)
+        if entity_type is None:
+            current = None
+            continue
+        if prefix == 'I' and current is not None and current['entity'] == entity_type:
+            current['end'] = end
+            current['scores'].append(score)
+            continue
+        current = {'entity': entity_type, 'start': start, 'end': end, 'scores': [score]}
+        entities.append(current)
+    for entity in entities:
+        scores = entity.pop('scores')
+        entity['word'] = text[entity['start']:entity['end']]
+        entity['score'] = sum(scores) / len(scores)
+    return entities
+
+# ==============================================
+# Batched predictor
+# ==============================================
+
+class NERPredictor:
+    """Batched, length-bucketed token-classification inference returning entity spans
+
+    Messages longer than ``max_length`` subwords are split into overlapping
+    windows that share ``stride`` subwords; short messages stay one window.
+    """
+    def __init__(self, model, tokenizer, batch_size=32, max_length=512, stride=128,
+                 num_threads=None):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.stride = stride
+        self.id2label = model.config.id2label
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+    @classmethod
+    def from_pretrained(cls, model_path, **kwargs):
+        """Load a fine-tuned checkpoint and its tokenizer"""
+        from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+        model = AutoModelForTokenClassification.from_pretrained(model_path)
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        return cls(model, tokenizer, **kwargs)
+
+    def _encode(self, texts):
+        """Split texts into words and tokenize them once into windows, without padding
+
+        Texts are normalized first, as the training data was, but the word
+        offsets returned per text point into the raw text. Also returns the
+        window encodings and, per window, the index of the text it came from.
+        """
+        words, word_texts = [], []
+        for text in texts:
+            normalized, starts, ends = normalize_with_offsets(text)
+            spans = token_spans(normalized)
+            words.append([(starts[start], ends[end - 1]) for start, end in spans])
+            word_texts.append([normalized[start:end] for start, end in spans])
+        encodings = self.tokenizer(
+            word_texts,
+            is_split_into_words=True,
+            truncation=True,
+            max_length=self.max_length,
+            stride=self.stride,
+            return_overflowing_tokens=True,
+        )
+        return words, encodings, encodings['overflow_to_sample_mapping']
+
+    def _length_buckets(self, lengths):
+        """Batches of indices sorted by length, so each batch pads only to its own maximum"""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        return [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+
+    def _collate(self, encodings, indices):
+        """Pad the encodings at ``indices`` to the longest one in the bucket"""
+        pad_id = self.tokenizer.pad_token_id or 0
+        keys = [key for key in ('input_ids', 'attention_mask', 'token_type_ids') if key in encodings]
+        width = max(len(encodings['input_ids'][i]) for i in indices)
+        batch = {}
+        for key in keys:
+            pad_value = pad_id if key == 'input_ids' else 0
+            batch[key] = torch.tensor([
+                encodings[key][i] + [pad_value] * (width - len(encodings[key][i])) for i in indices
+            ])
+        return batch
+
+    def predict_word_probabilities(self, texts):
+        """Return, per text, word offsets and a ``(words, labels)`` array of label probabilities
+
+        Each word takes the distribution of its first subword (as in
+        training). Windows from all texts are batched together; where windows
+        overlap, the most confident distribution for a word wins. A word no
+        window covered keeps an all-zero row.
+        """
+        with instrumentation.stage('encode'):
+            words, encodings, sample_map = self._encode(texts)
+        num_labels = len(self.id2label)
+        probabilities = [np.zeros((len(spans), num_labels), dtype=np.float32) for spans in words]
+        confidence = [np.zeros(len(spans), dtype=np.float32) for spans in words]
+        lengths = [len(ids) for ids in encodings['input_ids']]
+        instrumentation.count('inference.texts', len(texts))
+        instrumentation.count('inference.windows', len(lengths))
+        instrumentation.count('inference.subword_tokens', sum(lengths))
+
+        # A window that starts inside a word only sees that word's trailing subwords
+        cut_words = [None] * len(lengths)
+        for window in range(1, len(lengths)):
+            if sample_map[window] == sample_map[window - 1]:
+                previous_ids = set(encodings.word_ids(batch_index=window - 1))
+                first = next((w for w in encodings.word_ids(batch_index=window) if w is not None), None)
+                if first in previous_ids:
+                    cut_words[window] = first
+
+        with torch.inference_mode():
+            for indices in self._length_buckets(lengths):
+                started = time.perf_counter()
+                with instrumentation.stage('forward'):
+                    logits = self.model(**self._collate(encodings, indices)).logits
+                    batch_probabilities = torch.softmax(logits.float(), dim=-1).numpy()
+                instrumentation.observe('inference.batch', time.perf_counter() - started)
+                for row, window in enumerate(indices):
+                    text_index = sample_map[window]
+                    previous = cut_words[window]
+                    for position, word_id in enumerate(encodings.word_ids(batch_index=window)):
+                        if word_id is not None and word_id != previous:
+                            distribution = batch_probabilities[row, position]
+                            score = distribution.max()
+                            if score > confidence[text_index][word_id]:
+                                probabilities[text_index][word_id] = distribution
+                                confidence[text_index][word_id] = score
+                        previous = word_id
+        return list(zip(words, probabilities))
+
+    def predict_word_labels(self, texts):
+        """Return, per text, word offsets with their predicted label and confidence"""
+        results = []
+        for spans, probabilities in self.predict_word_probabilities(texts):
+            predictions = probabilities.argmax(axis=-1)
+            scores = probabilities.max(axis=-1)
+            labels = [self.id2label[int(p)] if score > 0 else 'O' for p, score in zip(predictions, scores)]
+            results.append((spans, labels, scores.tolist()))
+        return results
+
+    def predict_batch(self, texts):
+        """Predict merged PRODUCT/PRICE/LOC spans for each text
+
+        Returns one list per text of ``{'entity', 'word', 'start', 'end', 'score'}``
+        dicts with character offsets into the original text.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        results = [
+            merge_word_predictions(text, words, labels, scores)
+            for text, (words, labels, scores) in zip(texts, self.predict_word_labels(texts))
+        ]
+        instrumentation.count_many(Counter(entity['entity'] for entities in results for entity in entities),
+                                   prefix='inference.entities.')
+        return results
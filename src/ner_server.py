@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, deque
+
+from src.ner_inference import NERPredictor
+
+# ==============================================
+# Metrics
+# ==============================================
+
+class ServerMetrics:
+    """Request latency percentiles (over a sliding window), batch-size counts and failures"""
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.batches = 0
+        self.failures = 0
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batch_sizes[size] += 1
+
+    def record_latency(self, seconds):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def record_failure(self):
+        self.failures += 1
+
+    @staticmethod
+    def _percentile(ordered, q):
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+        to_ms = lambda value: None if value is None else round(value * 1000, 3)
+        batched = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            'requests': self.requests,
+            'failed_requests': self.failures,
+            'batches': self.batches,
+            'latency_ms': {
+                'p50': to_ms(self._percentile(ordered, 0.50)),
+                'p99': to_ms(self._percentile(ordered, 0.99)),
+            },
+            'mean_batch_size': (batched / self.batches) if self.batches else None,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+        }
+
+# ==============================================
+# Micro-batching
+# ==============================================
+
+class MicroBatcher:
+    """Gathers concurrent requests into batches bounded by size and wait time
+
+    A batch is dispatched when ``max_batch_size`` texts are waiting or
+    ``max_wait_ms`` has passed since its first text arrived. The model runs
+    in a worker thread so the event loop keeps accepting requests. A batch
+    that fails is retried one text at a time, so only the texts that fail
+    on their own get an error.
+    """
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=5.0, metrics=None):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServerMetrics()
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, text):
+        """Queue one text and wait for its entities"""
+        future = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        await self.queue.put((text, future))
+        result = await future
+        self.metrics.record_latency(time.perf_counter() - started)
+        return result
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            self.metrics.record_batch(len(batch))
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch):
+        try:
+            results = await asyncio.to_thread(self.predictor.predict_batch, [text for text, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                for item in batch:
+                    await self._dispatch([item])
+                return
+            _, future = batch[0]
+            self.metrics.record_failure()
+            if not future.done():
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+# ==============================================
+# Minimal HTTP/1.1 front end (TCP or Unix socket)
+# ==============================================
+
+MAX_BODY_BYTES = 1 << 20
+
+class NERServer:
+    """Long-running local NER service
+
+    ``POST /predict`` with ``{"text": ...}`` or ``{"texts": [...]}`` returns
+    entities; ``GET /metrics`` returns latency and batch-size metrics;
+    ``GET /health`` returns ``{"status": "ok"}``. A malformed request line
+    or ``Content-Length`` gets 400 and a body over ``max_body_bytes`` gets
+    413 without being read; both close the connection.
+    """
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=5.0, max_body_bytes=MAX_BODY_BYTES):
+        self.batcher = MicroBatcher(predictor, max_batch_size, max_wait_ms)
+        self.max_body_bytes = max_body_bytes
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8008, unix_socket=None):
+        self.batcher.start()
+        if unix_socket:
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=unix_socket)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.batcher.metrics.snapshot()
+        if method == 'POST' and path == '/predict':
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {'error': 'invalid JSON'}
+            if not isinstance(payload, dict):
+                return 400, {'error': "expected a JSON object with 'text' or 'texts'"}
+            if 'texts' in payload:
+                texts = payload['texts']
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    return 400, {'error': "'texts' must be a list of strings"}
+                entities = await asyncio.gather(*(self.batcher.predict(text) for text in texts))
+                return 200, {'entities': list(entities)}
+            if 'text' in payload:
+                if not isinstance(payload['text'], str):
+                    return 400, {'error': "'text' must be a string"}
+                return 200, {'entities': await self.batcher.predict(payload['text'])}
+            return 400, {'error': "expected 'text' or 'texts'"}
+        return 404, {'error': 'not found'}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+            + data
+        )
+        await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+                method, path, _ = parts
+                length = headers.get('content-length', '0')
+                if not length.isdecimal():
+                    await self._respond(writer, 400, {'error': 'invalid Content-Length'}, False)
+                    break
+                if int(length) > self.max_body_bytes:
+                    await self._respond(writer, 413, {
+                        'error': f"body larger than {self.max_body_bytes} bytes"}, False)
+                    break
+                body = await reader.readexactly(int(length))
+
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(model_path, host='127.0.0.1', port=8008, unix_socket=None,
+                max_batch_size=32, max_wait_ms=5.0, num_threads=None, max_body_bytes=MAX_BODY_BYTES):
+    """Load a checkpoint once and serve it until cancelled"""
+    predictor = NERPredictor.from_pretrained(model_path, num_threads=num_threads)
+    server = NERServer(predictor, max_batch_size, max_wait_ms, max_body_bytes)
+    listener = await server.start(host, port, unix_socket)
+    print(f"Serving {model_path} on {unix_socket or f'http://{host}:{port}'}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching NER inference server")
+    parser.add_argument('model_path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8008)
+    parser.add_argument('--unix-socket')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--max-body-bytes', type=int, default=MAX_BODY_BYTES,
+                        help="Reject request bodies larger than this with 413")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.model_path, args.host, args.port, args.unix_socket,
+                      args.max_batch_size, args.max_wait_ms, args.threads, args.max_body_bytes))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import dataclasses
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.conll_io import ConllReadReport, encode_conll_file, file_sha256, to_hf_dataset
+
+CACHE_DIR = "C:/Users/ibsan/Desktop/TenX/week-5/data/tokenized_cache"
+
+# ==============================================
+# Cache keys
+# ==============================================
+
+def tokenizer_fingerprint(tokenizer):
+    """Hash of everything about a tokenizer that changes its output
+
+    The fast backend's ``truncation`` and ``padding`` entries are left out:
+    they hold whatever the last call set, and the parameters that matter
+    are part of the cache key anyway.
+    """
+    digest = hashlib.sha256()
+    digest.update(type(tokenizer).__name__.encode())
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    if backend is not None:
+        state = json.loads(backend.to_str())
+        state.pop('truncation', None)
+        state.pop('padding', None)
+        digest.update(json.dumps(state, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    else:
+        digest.update(json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False).encode('utf-8'))
+    digest.update(json.dumps(tokenizer.special_tokens_map, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+def dataset_cache_key(conll_path, tokenizer, **params):
+    """Cache key from the CoNLL file hash, tokenizer fingerprint and tokenization parameters"""
+    digest = hashlib.sha256()
+    digest.update(file_sha256(conll_path).encode())
+    digest.update(tokenizer_fingerprint(tokenizer).encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()[:20]
+
+# ==============================================
+# Tokenization and label alignment
+# ==============================================
+
+def tokenize_and_align_labels(examples, tokenizer, max_length=512):
+    """Tokenize pre-split words without padding and align labels to first subwords
+
+    Padding is left to the data collator, so every batch is padded only to
+    its own longest sequence. Continuation subwords and special tokens get
+    -100 so the loss ignores them.
+    """
+    tokenized_inputs = tokenizer(
+        examples["tokens"],
+        truncation=True,
+        max_length=max_length,
+        is_split_into_words=True,
+    )
+
+    labels = []
+    for i, label in enumerate(examples["labels"]):
+        word_ids = tokenized_inputs.word_ids(batch_index=i)
+        previous_word_idx = None
+        label_ids = []
+        for word_idx in word_ids:
+            if word_idx is None:  # Special tokens (e.g., [CLS], [SEP])
+                label_ids.append(-100)
+            elif word_idx != previous_word_idx:  # New word
+                label_ids.append(label[word_idx])
+            else:  # Same word (subword)
+                label_ids.append(-100)
+            previous_word_idx = word_idx
+        labels.append(label_ids)
+
+    tokenized_inputs["labels"] = labels
+    tokenized_inputs["length"] = [len(ids) for ids in tokenized_inputs["input_ids"]]
+    return tokenized_inputs
+
+def build_dataset(data, label_names):
+    """Hugging Face ``Dataset`` with labels encoded as a ``ClassLabel`` sequence"""
+    from datasets import ClassLabel, Dataset, Features, Sequence, Value
+
+    features = Features({
+        "tokens": Sequence(Value("string")),
+        "labels": Sequence(ClassLabel(names=label_names)),
+    })
+    return Dataset.from_dict(data, features=features)
+
+def load_tokenized_dataset(conll_path, tokenizer, cache_dir=CACHE_DIR, max_length=512,
+                           test_size=0.2, seed=42):
+    """Return ``(tokenized DatasetDict, label_names)``, reusing the on-disk cache when possible
+
+    The cache entry is keyed by the CoNLL file hash, the tokenizer
+    fingerprint and the split/tokenization parameters, so repeat runs (and
+    other models sharing a tokenizer) skip tokenization entirely.
+    """
+    from datasets import load_from_disk
+
+    key = dataset_cache_key(conll_path, tokenizer, max_length=max_length,
+                            test_size=test_size, seed=seed)
+    cache_path = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(cache_path, 'label_names.json')):
+        with open(os.path.join(cache_path, 'label_names.json'), 'r', encoding='utf-8') as f:
+            label_names = json.load(f)
+        return load_from_disk(os.path.join(cache_path, 'dataset')), label_names
+
+    report = ConllReadReport()
+    arrays = encode_conll_file(conll_path, report=report).with_sorted_labels()
+    if report.malformed:
+        print(f"{conll_path}: skipped {report.malformed} malformed lines, e.g. {report.examples[:3]}")
+    label_names = arrays.label_names
+    dataset = to_hf_dataset(arrays).train_test_split(test_size=test_size, seed=seed)
+    tokenized = dataset.map(
+        tokenize_and_align_labels,
+        batched=True,
+        fn_kwargs={'tokenizer': tokenizer, 'max_length': max_length},
+        remove_columns=["tokens", "token_ids"],
+    )
+
+    os.makedirs(cache_path, exist_ok=True)
+    tokenized.save_to_disk(os.path.join(cache_path, 'dataset'))
+    # Written last: its presence marks a complete cache entry
+    with open(os.path.join(cache_path, 'label_names.json'), 'w', encoding='utf-8') as f:
+        json.dump(label_names, f)
+    return tokenized, label_names
+
+# ==============================================
+# Trainer setup
+# ==============================================
+
+def make_compute_metrics(label_names):
+    """seqeval precision/recall/F1/accuracy over first-subword positions"""
+    from seqeval.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    def compute_metrics(p):
+        predictions, labels = p
+        predictions = np.argmax(predictions, axis=2)
+        true_labels = [[label_names[l] for l in label if l != -100] for label in labels]
+        true_predictions = [
+            [label_names[p] for (p, l) in zip(prediction, label) if l != -100]
+            for prediction, label in zip(predictions, labels)
+        ]
+        return {
+            "precision": precision_score(true_labels, true_predictions, zero_division=0),
+            "recall": recall_score(true_labels, true_predictions, zero_division=0),
+            "f1": f1_score(true_labels, true_predictions, zero_division=0),
+            "accuracy": accuracy_score(true_labels, true_predictions),
+        }
+    return compute_metrics
+
+def make_trainer(model_checkpoint, tokenizer, tokenized_dataset, label_names, output_dir,
+                 compute_metrics=True, **training_overrides):
+    """Trainer with per-batch dynamic padding and length-grouped batches
+
+    ``DataCollatorForTokenClassification`` pads inputs and labels (with -100)
+    to the longest sequence in each batch, and ``group_by_length`` samples
+    batches of similar length using the precomputed ``length`` column.
+    """
+    from transformers import (
+        AutoModelForTokenClassification, DataCollatorForTokenClassification, Trainer,
+        TrainingArguments,
+    )
+
+    model = AutoModelForTokenClassification.from_pretrained(
+        model_checkpoint,
+        num_labels=len(label_names),
+        id2label=dict(enumerate(label_names)),
+        label2id={label: i for i, label in enumerate(label_names)},
+    )
+    arguments = dict(
+        output_dir=output_dir,
+        eval_strategy="epoch",
+        learning_rate=2e-5,
+        per_device_train_batch_size=16,
+        per_device_eval_batch_size=16,
+        num_train_epochs=3,
+        weight_decay=0.01,
+        save_strategy="epoch",
+        logging_steps=10,
+        report_to="none",
+        length_column_name="length",
+    )
+    # Length-grouped sampling was renamed in transformers 5
+    if 'train_sampling_strategy' in {field.name for field in dataclasses.fields(TrainingArguments)}:
+        arguments['train_sampling_strategy'] = 'group_by_length'
+    else:
+        arguments['group_by_length'] = True
+    arguments.update(training_overrides)
+    return Trainer(
+        model=model,
+        args=TrainingArguments(**arguments),
+        train_dataset=tokenized_dataset["train"],
+        eval_dataset=tokenized_dataset["test"],
+        data_collator=DataCollatorForTokenClassification(tokenizer),
+        processing_class=tokenizer,
+        compute_metrics=make_compute_metrics(label_names) if compute_metrics else None,
+    )
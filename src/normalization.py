@@ -0,0 +1,285 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# ==============================================
+# Character classes
+# ==============================================
+
+# Homophone series folded onto one spelling, (variant, canonical) first syllables.
+# Each series has seven orders (vowels) at consecutive code points.
+HOMOPHONE_SERIES = (
+    ('ሐ', 'ሀ'),
+    ('ኀ', 'ሀ'),
+    ('ሠ', 'ሰ'),
+    ('ዐ', 'አ'),
+    ('ፀ', 'ጸ'),
+)
+# Single syllables with the same sound: fourth-order ha/a and labialized variants
+HOMOPHONE_SYLLABLES = {
+    'ሃ': 'ሀ', 'ኣ': 'አ',
+    'ሗ': 'ኋ', 'ሧ': 'ሷ',
+}
+
+# Ethiopic punctuation and the ASCII used for it; separators become spaces
+ETHIOPIC_PUNCTUATION = {
+    '፠': ' ', '፡': ' ', '።': '.', '፣': ',', '፤': ';', '፥': ':', '፦': ':', '፧': '?', '፨': ' ',
+}
+QUOTES_AND_DASHES = {
+    '“': '"', '”': '"', '„': '"', '«': '"', '»': '"', '‘': "'", '’': "'", '‚': "'",
+    '–': '-', '—': '-', '‐': '-', '‑': '-', '−': '-',
+}
+# Invisible characters dropped outright (zero-width spaces and joiners, BOM, soft hyphen)
+INVISIBLE = '\u200b\u200c\u200d\u2060\ufeff\u00ad'
+
+ETHIOPIC_DIGITS = {chr(0x1369 + i): i + 1 for i in range(9)}   # ፩-፱
+ETHIOPIC_TENS = {chr(0x1372 + i): 10 * (i + 1) for i in range(9)}  # ፲-፺
+ETHIOPIC_HUNDRED = '፻'
+ETHIOPIC_TEN_THOUSAND = '፼'
+ETHIOPIC_NUMERAL_PATTERN = re.compile('[፩-፼]+')
+
+# Cleaning deletes these instead of spacing them, so 2,500 and don't stay one token
+JOINING_PUNCTUATION = ",'"
+
+# Code points beyond the precomputed table (emoji and other astral characters)
+ASTRAL_PATTERN = re.compile('[\U00010000-\U0010FFFF]')
+
+# ==============================================
+# Translation tables
+# ==============================================
+
+DELETED = 0xFFFFFFFF  # code point array entry of a character the table removes
+
+class TranslationTable:
+    """Character mapping precomputed for the whole Basic Multilingual Plane
+
+    ``bmp`` is a list indexed by code point for ``str.translate`` on single
+    strings. ``translate_many`` applies the same mapping to a whole column
+    at once as a NumPy code point array, which avoids ``str.translate``'s
+    per-character object lookups. Astral characters (emoji) are resolved
+    once and cached when ``map_astral`` is set, and left alone otherwise.
+    Ethiopic numerals are spelled out afterwards, only in texts that have them.
+    """
+    def __init__(self, resolve, map_astral=False):
+        self.resolve = resolve
+        self.map_astral = map_astral
+        self.bmp = [resolve(chr(codepoint)) for codepoint in range(0x10000)]
+        self.astral = {}
+        patterns = [ETHIOPIC_NUMERAL_PATTERN.pattern] + ([ASTRAL_PATTERN.pattern] if map_astral else [])
+        self.pattern = re.compile('|'.join(patterns))
+        self._codes = None
+
+    def _resolve_astral(self, char):
+        value = self.astral.get(char)
+        if value is None:
+            value = self.astral[char] = self.resolve(char) or ''
+        return value
+
+    def _replace(self, match):
+        text = match.group()
+        if ETHIOPIC_NUMERAL_PATTERN.fullmatch(text):
+            return str(ethiopic_numeral_value(text))
+        return self._resolve_astral(text)
+
+    def translate(self, text):
+        """Map every character of ``text`` and spell out Ethiopic numerals"""
+        return self.finish(text.translate(self.bmp))
+
+    def finish(self, text):
+        """Second step of ``translate``, only doing work when the text needs it"""
+        if self.pattern.search(text) is None:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def codes(self):
+        """The BMP mapping as a uint32 code point array (``DELETED`` for removed characters)"""
+        import numpy as np
+
+        if self._codes is None:
+            self._codes = np.array([DELETED if value is None else ord(value) for value in self.bmp],
+                                   dtype=np.uint32)
+        return self._codes
+
+    def translate_many(self, texts):
+        """``translate`` over a list of strings in one encode, table lookup and decode"""
+        import numpy as np
+
+        if not texts:
+            return []
+        codes = np.frombuffer(''.join(texts).encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+        mapped = self.codes()[np.minimum(codes, 0xFFFF)]
+        astral = codes > 0xFFFF
+        if astral.any():
+            values, inverse = np.unique(codes[astral], return_inverse=True)
+            if self.map_astral:
+                resolved = [self._resolve_astral(chr(value)) for value in values.tolist()]
+                values = np.array([ord(value) if value else DELETED for value in resolved], dtype=np.uint32)
+            mapped[astral] = values[inverse]
+
+        kept = mapped != DELETED
+        kept_before = np.r_[0, np.cumsum(kept)]
+        text = mapped[kept].astype('<u4').tobytes().decode('utf-32-le', 'surrogatepass')
+        result = [text[start:end] for start, end in
+                  zip(kept_before[starts].tolist(), kept_before[ends].tolist())]
+
+        numerals = (codes >= 0x1369) & (codes <= 0x137C)
+        if numerals.any():
+            numerals_before = np.r_[0, np.cumsum(numerals)]
+            for row in np.flatnonzero(numerals_before[ends] > numerals_before[starts]).tolist():
+                result[row] = self.finish(result[row])
+        return result
+
+def _homophones():
+    folded = dict(HOMOPHONE_SYLLABLES)
+    for variant, canonical in HOMOPHONE_SERIES:
+        for order in range(7):
+            folded[chr(ord(variant) + order)] = chr(ord(canonical) + order)
+    # Fourth orders of the folded series are the same sound as the first order
+    folded.update({'ሓ': 'ሀ', 'ኃ': 'ሀ', 'ዓ': 'አ'})
+    return folded
+
+def _resolve_normalized(char, homophones):
+    """Canonical form of one character; case and punctuation are kept"""
+    if char in homophones:
+        return homophones[char]
+    if char in ETHIOPIC_PUNCTUATION:
+        return ETHIOPIC_PUNCTUATION[char]
+    if char in QUOTES_AND_DASHES:
+        return QUOTES_AND_DASHES[char]
+    if char in INVISIBLE:
+        return None
+    category = unicodedata.category(char)
+    if category == 'Nd' and not char.isascii():
+        # Arabic-Indic, full-width and other decimal digits become ASCII
+        return str(unicodedata.digit(char))
+    if category in ('Zs', 'Zl', 'Zp') or char in '\t\n\r\x0b\x0c':
+        return ' '
+    if category in ('Cc', 'Cs'):
+        # Control characters and lone surrogates (which no encoder accepts)
+        return None
+    return char
+
+def _resolve_cleaned(char, homophones):
+    """Like ``_resolve_normalized``, then lower-cased with punctuation and symbols as spaces"""
+    if char in JOINING_PUNCTUATION:
+        return None
+    char = _resolve_normalized(char, homophones)
+    if char is None or char == ' ':
+        return char
+    if char.isalnum():
+        lower = char.lower()
+        return lower if len(lower) == 1 else char
+    category = unicodedata.category(char)
+    if category[0] in 'PS':
+        return ' '
+    # Combining marks belong to the letter before them
+    return char
+
+@lru_cache(maxsize=None)
+def translation_table(mode='normalize'):
+    """The shared table for ``mode`` ('normalize' or 'clean'), built on first use (about 0.1s)"""
+    homophones = _homophones()
+    if mode == 'normalize':
+        return TranslationTable(lambda char: _resolve_normalized(char, homophones))
+    if mode == 'clean':
+        return TranslationTable(lambda char: _resolve_cleaned(char, homophones), map_astral=True)
+    raise ValueError(f"Unknown normalization mode: {mode}")
+
+# ==============================================
+# Ethiopic numerals
+# ==============================================
+
+def ethiopic_numeral_value(numeral):
+    """Integer value of an Ethiopic numeral such as ``፲፪`` (12) or ``፪፻፶`` (250)
+
+    Ones and tens add up; ``፻`` multiplies the group before it by 100 and
+    ``፼`` multiplies everything before it by 10,000.
+    """
+    total = group = current = 0
+    for char in numeral:
+        if char in ETHIOPIC_DIGITS:
+            current += ETHIOPIC_DIGITS[char]
+        elif char in ETHIOPIC_TENS:
+            current += ETHIOPIC_TENS[char]
+        elif char == ETHIOPIC_HUNDRED:
+            group += (current or 1) * 100
+            current = 0
+        elif char == ETHIOPIC_TEN_THOUSAND:
+            total = (total + group + current or 1) * 10_000
+            group = current = 0
+    return total + group + current
+
+# ==============================================
+# Normalization
+# ==============================================
+
+def normalize_text(text):
+    """Fold homophones, map Ethiopic punctuation and numerals to ASCII and drop invisible characters
+
+    Case, punctuation and digits are kept, and every character except
+    Ethiopic numerals and invisible characters maps to exactly one
+    character, so offsets into the text mostly survive.
+    """
+    return translation_table('normalize').translate(text)
+
+def clean_text(text):
+    """``normalize_text`` plus lower-casing, with punctuation and symbols turned into spaces
+
+    Latin letters and digits are kept. Commas and apostrophes are deleted
+    rather than spaced, so ``2,500`` stays one price token.
+    """
+    return translation_table('clean').translate(text).strip()
+
+def normalize_with_offsets(text):
+    """``normalize_text`` plus the raw ``(start, end)`` each output character came from
+
+    Returns ``(normalized, starts, ends)``. Invisible characters have no
+    output character, and every digit of a spelled-out Ethiopic numeral
+    points at the whole numeral, so a span of the normalized text maps back
+    to ``text[starts[first]:ends[last]]``.
+    """
+    table = translation_table('normalize')
+    mapped = text.translate(table.bmp)
+    if len(mapped) == len(text) and table.pattern.search(mapped) is None:
+        return mapped, list(range(len(text))), list(range(1, len(text) + 1))
+
+    pieces, starts, ends = [], [], []
+    position = 0
+    for match in [*ETHIOPIC_NUMERAL_PATTERN.finditer(text), None]:
+        stop = len(text) if match is None else match.start()
+        for index in range(position, stop):
+            char = text[index].translate(table.bmp)
+            pieces.append(char)
+            starts.extend([index] * len(char))
+            ends.extend([index + 1] * len(char))
+        if match is not None:
+            digits = str(ethiopic_numeral_value(match.group()))
+            pieces.append(digits)
+            starts.extend([match.start()] * len(digits))
+            ends.extend([match.end()] * len(digits))
+            position = match.end()
+    return ''.join(pieces), starts, ends
+
+def fold_key(text):
+    """Lookup key for gazetteer entries and index values: normalized and case-folded"""
+    return translation_table('normalize').translate(text).casefold()
+
+def normalize_series(messages):
+    """Vectorized ``normalize_text`` over a pandas column of strings (missing values stay missing)"""
+    return _translate_series(messages, translation_table('normalize'))
+
+def clean_series(messages):
+    """Vectorized ``clean_text`` over a pandas column of strings (missing values stay missing)"""
+    return _translate_series(messages, translation_table('clean')).str.strip()
+
+def _translate_series(messages, table):
+    import pandas as pd
+
+    missing = messages.isna()
+    texts = [str(text) for text in messages.fillna('').tolist()]
+    translated = pd.Series(table.translate_many(texts), index=messages.index, dtype=object)
+    return translated.mask(missing) if missing.any() else translated
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import platform
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from src.CoNLL_processing import CoNLLFormatter
+from src.columnar_storage import iter_column_chunks
+
+# ==============================================
+# Worker side: one formatter per process
+# ==============================================
+
+_worker_formatter = None
+
+def _init_worker(gazetteer_files):
+    """Build the formatter once per worker process."""
+    global _worker_formatter
+    _worker_formatter = CoNLLFormatter(gazetteer_files)
+
+def _label_shard(messages):
+    """Label a shard of messages and return its CoNLL text."""
+    return "".join(
+        f"{sentence}\n\n" for sentence in _worker_formatter.iter_labeled_messages(messages)
+    )
+
+# ==============================================
+# Driver side: sharding and ordered merge
+# ==============================================
+
+def shard_messages(messages, chunk_size):
+    """Split a message iterable into lists of at most ``chunk_size`` messages."""
+    iterator = iter(messages)
+    while True:
+        shard = list(islice(iterator, chunk_size))
+        if not shard:
+            return
+        yield shard
+
+def label_messages_parallel(messages, output_path, workers=None, chunk_size=1000,
+                            gazetteer_files=None, max_pending=None):
+    """Label messages across a process pool and write one CoNLL file in input order.
+
+    At most ``max_pending`` shards (default ``2 * workers``) are in flight, so
+    the input stream is consumed lazily. Shards are written strictly in
+    submission order, making the output identical to a single-process run.
+    Returns the number of shards written.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    shards = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(gazetteer_files,)) as executor, \
+            open(output_path, 'w', encoding='utf-8') as file:
+        for shard in shard_messages(messages, chunk_size):
+            pending.append(executor.submit(_label_shard, shard))
+            if len(pending) >= max_pending:
+                file.write(pending.popleft().result())
+                shards += 1
+        while pending:
+            file.write(pending.popleft().result())
+            shards += 1
+    return shards
+
+def label_csv_parallel(input_path, output_path, column='Message', read_chunksize=10_000, limit=None,
+                       **kwargs):
+    """Stream a message CSV or Parquet file through ``label_messages_parallel``.
+
+    ``limit`` caps the number of non-null messages, as in ``stream_csv_to_conll``.
+    """
+    def messages():
+        for chunk in iter_column_chunks(input_path, column, read_chunksize):
+            yield from chunk.dropna().astype(str)
+
+    return label_messages_parallel(islice(messages(), limit), output_path, **kwargs)
+
+# ==============================================
+# Scaling benchmark
+# ==============================================
+
+def benchmark_scaling(messages, output_path, worker_counts=(1, 2, 4, 8, 16), chunk_size=1000):
+    """Time ``label_messages_parallel`` for each worker count and report speedup vs. 1 worker.
+
+    Each row also records the usable CPU count: worker counts above it can
+    only time-slice, so their speedup says nothing about scaling.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        label_messages_parallel(messages, output_path, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        results.append({
+            'workers': workers,
+            'cpus': cpus,
+            'seconds': elapsed,
+            'messages_per_sec': len(messages) / elapsed,
+            'speedup': baseline / elapsed,
+        })
+    return results
+
+def main(argv=None):
+    """Run the scaling benchmark on a synthetic corpus."""
+    parser = argparse.ArgumentParser(description="Scaling benchmark for multi-process CoNLL labeling")
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--json', dest='json_path', help="Also write the results (with CPU count) here")
+    args = parser.parse_args(argv)
+
+    sample = "በአዲስ አበባ ቦሌ Nike ጫማ ዋጋ 2500 ብር ለልጅዎ ቦርሳ በቅናሽ ይገኛል"
+    messages = [f"{sample} {i}" for i in range(args.messages)]
+    output_path = "parallel_labeling_benchmark.conll"
+    try:
+        rows = benchmark_scaling(messages, output_path, args.workers, args.chunk_size)
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    for row in rows:
+        note = "  (more workers than CPUs)" if row['workers'] > row['cpus'] else ""
+        print(f"workers={row['workers']:>2}  {row['seconds']:.2f}s  "
+              f"{row['messages_per_sec']:,.0f} msg/s  speedup x{row['speedup']:.2f}{note}")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump({'messages': args.messages, 'platform': platform.platform(), 'results': rows}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import re
+from itertools import chain
+
+# ==============================================
+# Token classes
+# ==============================================
+
+# Ethiopic letters: syllables with their combining marks and the supplement and
+# extended blocks. Ethiopic punctuation (U+1360-1368) and numerals are not letters.
+ETHIOPIC_LETTERS = 'ሀ-፟ᎀ-᎟ⶀ-⷟꬀-꬯'
+
+# Currency units split off the numbers they are glued to (5000ብር, 250birr)
+CURRENCY_UNITS = ('ብር', 'ብሩ', 'birr', 'br', 'etb', 'usd')
+
+# Model special tokens (BERT and XLM-R style) stay whole, so text masked for
+# explanations re-tokenizes into the same words
+SPECIAL_TOKENS = ('[MASK]', '[UNK]', '[PAD]', '[CLS]', '[SEP]', '<mask>', '<unk>', '<pad>', '<s>', '</s>')
+
+SPECIAL = 'special'
+NUMBER = 'number'
+CURRENCY = 'currency'
+ETHIOPIC = 'ethiopic'
+LATIN = 'latin'
+PUNCTUATION = 'punct'
+
+_UNIT_INITIALS = re.escape(''.join(sorted({unit[0] for unit in CURRENCY_UNITS}
+                                           | {unit[0].upper() for unit in CURRENCY_UNITS})))
+_UNIT = rf'(?i:{"|".join(CURRENCY_UNITS)})(?![^\W\d_])'
+# Letters and digits outside Ethiopic: the characters of Latin words and codes like A52
+_ALNUM = rf'[^\W_{ETHIOPIC_LETTERS}]'
+
+# Tried in this order at every position; the first class that matches wins
+TOKEN_CLASSES = (
+    (SPECIAL, r'(?=[\[<])(?:' + '|'.join(re.escape(token) for token in SPECIAL_TOKENS) + ')'),
+    # 1500, 2,500 and 1,500.50 are one number; Ethiopic numerals (፲፪) too. A
+    # number never ends inside a run of Latin letters and digits (52A is a
+    # code, not a price) unless the letters are a currency unit (250birr).
+    (NUMBER, rf'\d+(?:[.,]\d+)*(?:(?!{_ALNUM})|(?={_UNIT}))|[፩-፼]+'),
+    # A unit only when no letter follows it, so ብርሃን stays one word. The
+    # lookahead on first letters keeps other words from trying every unit.
+    (CURRENCY, rf'(?=[{_UNIT_INITIALS}$])(?:{_UNIT}|\$)'),
+    (ETHIOPIC, f'[{ETHIOPIC_LETTERS}]+'),
+    # Words of any other script, including letter-digit codes (A52, iphone13)
+    (LATIN, f'{_ALNUM}+'),
+    # Every other non-space character is a token of its own
+    (PUNCTUATION, r'\S'),
+)
+PRICE_KINDS = frozenset((NUMBER, CURRENCY))
+
+# Each match consumes the whitespace before its token, so the scanner never
+# tries the token classes at a space. Offsets come from the token's group.
+TOKEN_PATTERN = re.compile(r'\s*(?:' + '|'.join(
+    f'(?P<{kind}>{pattern})' for kind, pattern in TOKEN_CLASSES
+) + ')')
+# Same scanner with one group, so ``findall`` returns the token strings directly
+WORD_PATTERN = re.compile(r'\s*(' + '|'.join(f'(?:{pattern})' for _, pattern in TOKEN_CLASSES) + ')')
+PRICE_TOKEN_PATTERN = re.compile('|'.join(
+    f'(?:{pattern})' for kind, pattern in TOKEN_CLASSES if kind in PRICE_KINDS
+))
+
+# ==============================================
+# Scanner
+# ==============================================
+
+class Token:
+    """A typed token stored as offsets into its message; ``text`` is sliced on access"""
+    __slots__ = ('message', 'start', 'end', 'kind')
+
+    def __init__(self, message, start, end, kind):
+        self.message = message
+        self.start = start
+        self.end = end
+        self.kind = kind
+
+    @property
+    def text(self):
+        return self.message[self.start:self.end]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"Token({self.text!r}, {self.start}, {self.end}, {self.kind!r})"
+
+def _scannable(text):
+    """``text`` without trailing whitespace, which the scanner would retry at every position
+
+    Stripping the end leaves every token offset unchanged.
+    """
+    return text.rstrip() if text[-1:].isspace() else text
+
+def scan(text):
+    """Split ``text`` into typed ``Token`` objects in one left-to-right pass"""
+    return [Token(text, match.start(match.lastindex), match.end(), match.lastgroup)
+            for match in TOKEN_PATTERN.finditer(_scannable(text))]
+
+def token_spans(text):
+    """``(start, end)`` offsets of every token, for callers that slice the text themselves"""
+    return [match.span(1) for match in WORD_PATTERN.finditer(_scannable(text))]
+
+def token_kind(token):
+    """Kind of a single token string, or None if it is not exactly one token"""
+    match = TOKEN_PATTERN.fullmatch(token)
+    return None if match is None or match.start(match.lastindex) else match.lastgroup
+
+# ==============================================
+# Word-level memo
+# ==============================================
+
+# No token contains whitespace and no class looks past one, so a message
+# tokenizes to the concatenated tokens of its ``str.split()`` words. Messages
+# repeat a small vocabulary, so each distinct word is scanned once; the
+# remaining per-message work is the same split the whitespace tokenizer does.
+WORD_CACHE_SIZE = 100_000
+
+class _WordCache(dict):
+    """``word -> scanner result``, scanning a word on its first lookup
+
+    Emptied when it reaches ``WORD_CACHE_SIZE`` words so a stream of unique
+    words cannot grow it without bound.
+    """
+    def __init__(self, scan_word):
+        super().__init__()
+        self.scan_word = scan_word
+
+    def __missing__(self, word):
+        if len(self) >= WORD_CACHE_SIZE:
+            self.clear()
+        result = self[word] = self.scan_word(word)
+        return result
+
+def _word_tokens(word):
+    tokens = tuple(WORD_PATTERN.findall(word))
+    # Most words are one token: keep the key itself instead of a second copy
+    return (word,) if tokens == (word,) else tokens
+
+def _word_pairs(word):
+    return tuple((match.group(match.lastindex), match.lastgroup) for match in TOKEN_PATTERN.finditer(word))
+
+_WORD_TOKENS = _WordCache(_word_tokens)
+_WORD_PAIRS = _WordCache(_word_pairs)
+
+def clear_word_cache():
+    """Forget the memoized words (benchmarks use this to time cold passes)"""
+    _WORD_TOKENS.clear()
+    _WORD_PAIRS.clear()
+
+def tokenize(text):
+    """Token strings of ``text`` (``5000ብር`` -> ``5000``, ``ብር``)"""
+    return list(chain.from_iterable(map(_WORD_TOKENS.__getitem__, text.split())))
+
+def tokenize_typed(text):
+    """Token strings and their kinds as two parallel lists"""
+    pairs = list(chain.from_iterable(map(_WORD_PAIRS.__getitem__, text.split())))
+    if not pairs:
+        return [], []
+    tokens, kinds = zip(*pairs)
+    return list(tokens), list(kinds)
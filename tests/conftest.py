@@ -0,0 +1,10 @@
+import pytest
+
+@pytest.fixture(scope='session')
+def tiny_checkpoints(tmp_path_factory):
+    """Tiny randomly initialized BERT, DistilBERT and XLM-R checkpoints (no network needed)"""
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    from src.benchmark import build_tiny_checkpoints, sample_corpus
+
+    return build_tiny_checkpoints(str(tmp_path_factory.mktemp('tiny')), sample_corpus(64))
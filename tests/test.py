@@ -1,15 +1,20 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification
-
-# Load the fine-tuned model and tokenizer
+# The fine-tuned model to test
 model_name = "distilbert-fine-tuned"  # Change this to the model you want to test
 model_path = "C:/Users/ibsan/Desktop/TenX/week-5/model_output/results/xlm-roberta-fine-tuned"
-tokenizer = AutoTokenizer.from_pretrained(model_path)
-model = AutoModelForTokenClassification.from_pretrained(model_path)
+
+def load_model(path=model_path):
+    """Load the fine-tuned model and tokenizer (explicitly, never at import)"""
+    from transformers import AutoTokenizer, AutoModelForTokenClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    model = AutoModelForTokenClassification.from_pretrained(path)
+    return tokenizer, model
 
 # Function to perform NER on a given text
 
-def predict_entities(text):
+def predict_entities(text, tokenizer, model):
+    import torch
+
     # Tokenize the input text
     inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
     # Get model predictions
@@ -24,7 +29,9 @@ def predict_entities(text):
     # Return the tokens and their corresponding labels
     return list(zip(tokens, labels))
 
-# Test the function with a sample text
-sample_text = "በአዲስ �በባ ውስጥ አዲስ ስልክ በ 5000 ብር ይገኛል።"
-entities = predict_entities(sample_text)
-print(entities)
\ No newline at end of file
+if __name__ == "__main__":
+    # Test the function with a sample text
+    tokenizer, model = load_model()
+    sample_text = "በአዲስ �በባ ውስጥ አዲስ ስልክ በ 5000 ብር ይገኛል።"
+    entities = predict_entities(sample_text, tokenizer, model)
+    print(entities)
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+from src.benchmark import (
+    GLUED_SAMPLE_WORDS, benchmark_checkpoint, benchmark_tokenizers, percentile, sample_corpus,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_sample_corpus_is_reproducible():
+    corpus = sample_corpus(16, seed=3, words=GLUED_SAMPLE_WORDS)
+    assert corpus == sample_corpus(16, seed=3, words=GLUED_SAMPLE_WORDS)
+    assert all(4 <= len(message.split()) <= 60 for message in corpus)
+    assert percentile([1, 2, 3, 4], 0.5) == 3 and percentile([1, 2, 3, 4], 0.99) == 4
+
+def test_tokenizer_benchmark_rows():
+    rows = benchmark_tokenizers(sample_corpus(8), repeats=1)
+    assert [row['tokenizer'] for row in rows][0] == 'whitespace (lru_cache)'
+    assert all(row['messages'] == 8 and row['tokens_per_s'] > 0 for row in rows)
+
+def test_checkpoint_rows(tiny_checkpoints):
+    rows = benchmark_checkpoint(tiny_checkpoints[1], sample_corpus(6), batch_sizes=(1, 4), warmup=1)
+    assert [(row['threads'], row['batch_size']) for row in rows] == [(1, 1), (1, 4)]
+    assert all(row['messages'] == 6 and row['load_time_s'] > 0 for row in rows)
+
+def test_token_count_includes_overlapping_windows(tiny_checkpoints):
+    """A message longer than one window is counted with its overlap, as the predictor encoded it"""
+    from src.ner_inference import NERPredictor
+    from src.instrumentation import monitored_run
+
+    corpus = [' '.join(['ጫማ 500 ብር'] * 200), 'ቦርሳ 900 ብር']
+    predictor = NERPredictor.from_pretrained(tiny_checkpoints[0])
+    with monitored_run('expected') as monitor:
+        predictor.predict_batch(corpus)
+    expected = monitor.counters['inference.subword_tokens']
+    assert monitor.counters['inference.windows'] > len(corpus)
+
+    rows = benchmark_checkpoint(tiny_checkpoints[0], corpus, batch_sizes=(2,), repeats=2, warmup=0)
+    assert rows[0]['tokens'] == 2 * expected
+
+def test_load_timer_excludes_library_imports(tiny_checkpoints):
+    """In a fresh interpreter, the modeling code must already be imported when the load timer starts"""
+    script = (
+        "import sys\n"
+        "from src.ner_inference import NERPredictor\n"
+        "from src.benchmark import benchmark_checkpoint\n"
+        "loaded = []\n"
+        "original = NERPredictor.from_pretrained.__func__\n"
+        "def from_pretrained(cls, path, **kwargs):\n"
+        "    loaded.append('transformers.models.auto.modeling_auto' in sys.modules)\n"
+        "    return original(cls, path, **kwargs)\n"
+        "NERPredictor.from_pretrained = classmethod(from_pretrained)\n"
+        f"benchmark_checkpoint({tiny_checkpoints[0]!r}, ['ጫማ 500 ብር'], batch_sizes=(1,), warmup=0)\n"
+        "print(loaded)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == '[True]'
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from src import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def messages_csv(tmp_path):
+    path = tmp_path / 'messages.csv'
+    pd.DataFrame({'Message': ['ጫማ 500 ብር', None, 'ቦርሳ', 'ድስት', 'ዘይት']}).to_csv(path, index=False)
+    return str(path)
+
+def sentences(path):
+    return open(path, encoding='utf-8').read().strip().split('\n\n')
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_label_limit_applies_with_any_worker_count(messages_csv, tmp_path, workers):
+    output = str(tmp_path / 'out.conll')
+    cli.main(['label', '--input', messages_csv, '--output', output, '--limit', '2', '--workers', workers])
+    assert [sentence.split()[0] for sentence in sentences(output)] == ['ጫማ', 'ቦርሳ']
+
+def test_label_checkpoint_needs_a_single_worker(messages_csv, tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        cli.main(['label', '--input', messages_csv, '--output', str(tmp_path / 'out.conll'),
+                  '--workers', '2', '--checkpoint', str(tmp_path / 'checkpoint.json')])
+    assert '--checkpoint' in capsys.readouterr().err
+
+@pytest.mark.parametrize('module', ['src.cli', 'tests.test'])
+def test_import_does_not_load_torch(module):
+    script = f"import sys, {module}; print('torch' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.columnar_storage import (
+    ParquetChunkWriter, iter_column_chunks, read_cleaned_messages, read_token_arena,
+)
+from src.data_preprocessing import preprocess_telegram_data
+
+def cleaned_chunk(dates):
+    return pd.DataFrame({
+        'Channel Title': ['Shop'] * len(dates),
+        'Channel Username': ['@shop'] * len(dates),
+        'ID': range(1, len(dates) + 1),
+        'Message': ['ጫማ 500 ብር'] * len(dates),
+        'Date': dates,
+        'Cleaned_Message': ['ጫማ 500 ብር'] * len(dates),
+        'Tokens': [['ጫማ', '500', 'ብር']] * len(dates),
+    })
+
+def test_round_trip_with_timezone_aware_dates(tmp_path):
+    path = str(tmp_path / 'cleaned.parquet')
+    aware = pd.Series(pd.to_datetime(['2024-01-01 00:00:00', '2024-01-02 03:30:00'], utc=True))
+    with ParquetChunkWriter(path) as writer:
+        writer.write(cleaned_chunk(aware))
+        # Scraper CSV strings (any offset), a naive date and an unparseable one
+        writer.write(cleaned_chunk(['2024-01-03 15:00:00+03:00', '2024-01-04 08:00:00', 'not a date']))
+
+    dates = read_cleaned_messages(path)['Date']
+    assert dates.iloc[:4].tolist() == [
+        pd.Timestamp('2024-01-01 00:00:00'), pd.Timestamp('2024-01-02 03:30:00'),
+        pd.Timestamp('2024-01-03 12:00:00'), pd.Timestamp('2024-01-04 08:00:00'),
+    ]
+    assert pd.isna(dates.iloc[4])
+    frame = read_cleaned_messages(path, columns=['Tokens'])
+    assert frame['Tokens'].map(list).tolist() == [['ጫማ', '500', 'ብር']] * 5
+
+    tokens, offsets = read_token_arena(path)
+    assert len(tokens) == 15 and offsets.tolist() == [0, 3, 6, 9, 12, 15]
+    assert [len(chunk) for chunk in iter_column_chunks(path, 'ID', chunksize=2, skip=1, nrows=3)] == [1, 2]
+
+def test_preprocess_scraper_csv_to_parquet(tmp_path):
+    raw = tmp_path / 'raw.csv'
+    pd.DataFrame({
+        'Channel Title': ['Shop', 'Shop'],
+        'Channel Username': ['@shop', '@shop'],
+        'ID': [1, 2],
+        'Message': ['ጫማ 500ብር', 'Nike'],
+        'Date': [datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc)],
+    }).to_csv(raw, index=False)
+
+    output = str(tmp_path / 'cleaned.parquet')
+    assert preprocess_telegram_data(str(raw), output, return_data=False) == 2
+    frame = read_cleaned_messages(output)
+    assert frame['Date'].tolist() == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')]
+    assert frame['Tokens'].map(list).tolist() == [['ጫማ', '500', 'ብር'], ['nike']]
@@ -0,0 +1,50 @@
+import pytest
+
+from src.conll_io import (
+    ConllReadReport, drop_marked_sentences, encode_conll_file, iter_conll_sentences, load_conll_arrays,
+    message_marker, read_conll_file,
+)
+
+CONLL = 'ጫማ B-PRODUCT\n500 B-PRICE\nብር I-PRICE\n\nbroken line here\nቦሌ B-LOC\n\n\nዋጋ B-PRICE'
+
+@pytest.fixture
+def conll_path(tmp_path):
+    path = tmp_path / 'labeled.conll'
+    path.write_text(CONLL, encoding='utf-8')
+    return str(path)
+
+def test_reader_reports_malformed_lines(conll_path):
+    report = ConllReadReport()
+    data = read_conll_file(conll_path, report)
+    assert data['tokens'] == [['ጫማ', '500', 'ብር'], ['ቦሌ'], ['ዋጋ']]
+    assert (report.sentences, report.tokens, report.malformed) == (3, 5, 1)
+    assert report.examples == [(5, 'broken line here')]
+    with pytest.raises(ValueError):
+        list(iter_conll_sentences(conll_path, strict=True))
+
+def test_encoding_round_trip_and_cache(conll_path, tmp_path):
+    arrays = encode_conll_file(conll_path)
+    assert len(arrays) == 3 and arrays.sentence(0) == (['ጫማ', '500', 'ብር'], ['B-PRODUCT', 'B-PRICE', 'I-PRICE'])
+    assert arrays.with_sorted_labels().label_names == sorted(arrays.label_names)
+
+    cache = str(tmp_path / 'cache')
+    cached = load_conll_arrays(conll_path, cache_dir=cache)
+    again = load_conll_arrays(conll_path, cache_dir=cache)
+    assert again.token_ids.tolist() == cached.token_ids.tolist() == arrays.token_ids.tolist()
+    assert again.sentence(2) == (['ዋጋ'], ['B-PRICE'])
+
+def test_marked_sentences_are_dropped_before_the_run_offset(tmp_path):
+    path = tmp_path / 'marked.conll'
+    old = f"{message_marker('@a/1')}ጫማ O\n\n{message_marker('@a/2')}ቦርሳ O\n\nunmarked O\n\n"
+    new = f"{message_marker('@a/1')}ጫማ B-PRODUCT\n\n"
+    path.write_text(old + new, encoding='utf-8')
+    assert drop_marked_sentences(str(path), {'@a/1'}, before=len(old.encode('utf-8'))) == 1
+    assert [tokens for tokens, _ in iter_conll_sentences(str(path))] == [['ቦርሳ'], ['unmarked'], ['ጫማ']]
+
+def test_keep_last_makes_compaction_repeatable(tmp_path):
+    path = tmp_path / 'marked.conll'
+    path.write_text(f"{message_marker('@a/1')}ጫማ O\n\n{message_marker('@a/2')}ቦርሳ O\n\n"
+                    f"{message_marker('@a/1')}ጫማ B-PRODUCT\n\n", encoding='utf-8')
+    assert drop_marked_sentences(str(path), {'@a/1', '@a/2'}, keep_last={'@a/1'}) == 2
+    assert drop_marked_sentences(str(path), {'@a/1', '@a/2'}, keep_last={'@a/1'}) == 0
+    assert list(iter_conll_sentences(str(path))) == [(['ጫማ'], ['B-PRODUCT'])]
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from src.CoNLL_processing import CoNLLFormatter
+from src.normalization import normalize_text
+from src.tokenization import tokenize_typed
+
+# "red shoe" and "shoe store bole" overlap on "shoe"; "store" alone is shorter than both
+GAZETTEER = 'PRODUCT\tred shoe\nLOC\tshoe store bole\nLOC\tstore\nPRODUCT\tstore bole mall\n'
+
+MESSAGES = [
+    'red shoe store bole 500 ብር',
+    'shoe store bole mall',
+    'store bole mall red shoe',
+    'በቦሌ ጫማ ዋጋ 1500 ብር',
+    'red',
+    'Nike ጫማ Under armour ቦርሳ',
+]
+
+@pytest.fixture(scope='module')
+def formatter(tmp_path_factory):
+    path = tmp_path_factory.mktemp('gazetteer') / 'entries.tsv'
+    path.write_text(GAZETTEER, encoding='utf-8')
+    return CoNLLFormatter(gazetteer_files=[str(path)])
+
+def frame_labels(formatter, messages):
+    frame = formatter.label_frame(pd.DataFrame({'Message': messages}))
+    names = frame['label_id'].map(dict(enumerate(formatter.label_names)))
+    return [names[frame['message_id'] == i].tolist() for i in range(len(messages))]
+
+def test_label_frame_matches_label_tokens_on_overlapping_entries(formatter):
+    expected = [formatter.label_tokens(*tokenize_typed(normalize_text(m))) for m in MESSAGES]
+    assert frame_labels(formatter, MESSAGES) == expected
+    # Left to right: "red shoe" wins over the longer "shoe store bole" that starts inside it
+    assert expected[0] == ['B-PRODUCT', 'I-PRODUCT', 'B-LOC', 'O', 'B-PRICE', 'I-PRICE']
+    assert expected[1] == ['B-LOC', 'I-LOC', 'I-LOC', 'O']
+
+def test_stream_limit_counts_messages_not_rows(formatter, tmp_path):
+    source = tmp_path / 'messages.csv'
+    pd.DataFrame({'Message': [None, 'ጫማ 500 ብር', None, None, 'ቦርሳ', 'ድስት', None, 'ዘይት']}).to_csv(
+        source, index=False)
+    output, checkpoint = str(tmp_path / 'out.conll'), str(tmp_path / 'out.checkpoint')
+
+    assert formatter.stream_csv_to_conll(str(source), output, chunksize=3, limit=2,
+                                         checkpoint_path=checkpoint) == 2
+    assert formatter.stream_csv_to_conll(str(source), output, chunksize=3, limit=3,
+                                         checkpoint_path=checkpoint) == 1
+    assert formatter.stream_csv_to_conll(str(source), output, chunksize=3, limit=3,
+                                         checkpoint_path=checkpoint) == 0
+    sentences = open(output, encoding='utf-8').read().strip().split('\n\n')
+    assert [sentence.split()[0] for sentence in sentences] == ['ጫማ', 'ቦርሳ', 'ድስት']
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from src.data_preprocessing import iter_preprocessed_chunks, preprocess_telegram_data
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    path = tmp_path / 'raw.csv'
+    pd.DataFrame({
+        'Channel Title': ['Shop'] * 3,
+        'Channel Username': ['@shop'] * 3,
+        'ID': [1, 2, 3],
+        'Message': ['ጫማ 500ብር!', 'NIKE ቦርሳ', None],
+        'Date': ['2024-01-01 10:00:00+00:00'] * 3,
+    }).to_csv(path, index=False)
+    return str(path)
+
+def test_default_streams_and_reports_throughput(raw_csv, tmp_path, capsys):
+    output = tmp_path / 'cleaned.csv'
+    assert preprocess_telegram_data(raw_csv, str(output), chunksize=2) == 3
+    assert 'rows/sec' in capsys.readouterr().out
+    cleaned = pd.read_csv(output)
+    assert cleaned['Cleaned_Message'].tolist()[:2] == ['ጫማ 500ብር', 'nike ቦርሳ']
+
+def test_return_data_concatenates_chunks(raw_csv, tmp_path):
+    frame = preprocess_telegram_data(raw_csv, str(tmp_path / 'cleaned.csv'), chunksize=2, return_data=True)
+    assert len(frame) == 3
+    assert frame['Tokens'].tolist()[:2] == [['ጫማ', '500', 'ብር'], ['nike', 'ቦርሳ']]
+
+def test_missing_columns_are_rejected(tmp_path):
+    path = tmp_path / 'raw.csv'
+    pd.DataFrame({'Message': ['ጫማ']}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='Missing columns'):
+        next(iter_preprocessed_chunks(str(path)))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dedup import NearDuplicateIndex, deduplicate_file, load_or_create, shingle_hashes
+
+BASE = 'አዲስ ጫማ በ 1500 ብር ቦሌ መገናኛ ድረስ እናደርሳለን ለማዘዝ ይደውሉ 0911223344 ጥራት ያለው ምርት'
+
+def chunk(messages, channel='@shop', start_id=1):
+    return pd.DataFrame({
+        'Channel Username': [channel] * len(messages),
+        'ID': range(start_id, start_id + len(messages)),
+        'Date': pd.date_range('2024-01-01', periods=len(messages), freq='D'),
+        'Cleaned_Message': messages,
+    })
+
+def test_short_messages_are_one_shingle():
+    assert shingle_hashes(['ጫማ', '500']) == shingle_hashes(['ጫማ', '500'])
+    assert shingle_hashes(['ጫማ', '500']) != shingle_hashes(['ጫማ', '600'])
+    assert len(shingle_hashes(BASE.split())) == len(BASE.split()) - 2
+
+def test_reposts_cluster_and_empty_messages_are_kept():
+    index = NearDuplicateIndex()
+    messages = [BASE, BASE + ' ቅናሽ', 'ቦርሳ 900 ብር', 'ቦርሳ 950 ብር', '', None, 'ቦርሳ 900 ብር']
+    kept = index.deduplicate(chunk(messages))
+    assert kept['ID'].tolist() == [1, 3, 4, 5, 6]
+    assert len(index) == 3
+    assert sorted(index.clusters()['Reposts'].tolist()) == [1, 2, 2]
+
+def test_save_load_without_pickle(tmp_path):
+    path = str(tmp_path / 'index.npz')
+    index = NearDuplicateIndex(threshold=0.7)
+    index.deduplicate(chunk([BASE, 'ቦርሳ 900 ብር']))
+    index.deduplicate(chunk([BASE + ' ቅናሽ'], channel='@ሱቅ', start_id=9))
+    index.save(path)
+
+    data = np.load(path, allow_pickle=False)
+    assert all(data[name].dtype != object for name in data.files)
+
+    loaded = load_or_create(path)
+    assert loaded.threshold == 0.7 and len(loaded) == len(index)
+    assert loaded.members == index.members
+    pd.testing.assert_frame_equal(loaded.clusters(), index.clusters(), check_dtype=False)
+    # The loaded index keeps clustering against what it has seen
+    assert loaded.deduplicate(chunk(['ቦርሳ 900 ብር'], start_id=20)).empty
+
+def test_old_pickled_index_is_rejected(tmp_path):
+    path = str(tmp_path / 'old.npz')
+    np.savez(path, params=np.array([128, 16, 3, 1]), channels=np.array(['@shop'], dtype=object))
+    with pytest.raises(ValueError, match='older pickled'):
+        NearDuplicateIndex.load(path)
+
+def test_deduplicate_file_extends_the_saved_index(tmp_path):
+    source, output, index_path = (str(tmp_path / name) for name in ('in.csv', 'out.csv', 'index.npz'))
+    chunk([BASE, BASE + ' ቅናሽ', 'ቦርሳ 900 ብር']).to_csv(source, index=False)
+    deduplicate_file(source, output, index_path)
+    assert pd.read_csv(output)['ID'].tolist() == [1, 3]
+    deduplicate_file(source, output, index_path)
+    assert pd.read_csv(output)['ID'].tolist() == [1, 3]  # representatives are re-emitted, never duplicates
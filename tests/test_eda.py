@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from src.eda import aggregate_chunks, aggregate_file, aggregate_files, merge_statistics, write_summary
+
+def frame(messages, channel='@shop', dates=None):
+    return pd.DataFrame({
+        'Channel Username': [channel] * len(messages),
+        'Date': dates or ['2024-01-01 10:00:00+00:00'] * len(messages),
+        'Cleaned_Message': messages,
+    })
+
+def test_one_pass_statistics():
+    chunks = [frame(['ጫማ 500 ብር', 'ጫማ ቦርሳ'], dates=['2024-01-01 10:00:00+00:00', '2024-01-03 09:00:00+03:00']),
+              frame([None, 'ብር'], channel='@ሱቅ', dates=['not a date', '2024-01-01'])]
+    stats = aggregate_chunks(chunks)
+    assert stats['token_frequency'].result(2).to_dict() == {'ጫማ': 2, 'ብር': 2}
+    assert stats['message_length'].result()[:4].tolist() == [1, 1, 1, 1]
+    daily = stats['time_series'].result()
+    assert daily.tolist() == [2, 0, 1] and stats['time_series'].undated == 1
+    assert stats['channel_counts'].result().to_dict() == {'@shop': 2, '@ሱቅ': 2}
+
+def test_merging_partials_equals_one_pass(tmp_path):
+    first, second = frame(['ጫማ 500 ብር'] * 3), frame(['ቦርሳ'] * 2, channel='@ሱቅ')
+    paths = [str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')]
+    first.to_csv(paths[0], index=False)
+    second.to_csv(paths[1], index=False)
+
+    merged = aggregate_files(paths, chunksize=2)
+    single = aggregate_chunks([first, second])
+    partials = merge_statistics([aggregate_chunks([first]), aggregate_chunks([second])])
+    for name in single:
+        assert merged[name].summary() == single[name].summary() == partials[name].summary()
+    assert aggregate_file(paths[0], chunksize=1)['message_length'].summary()['messages'] == 3
+    write_summary(merged, str(tmp_path / 'summary.json'))
+    assert (tmp_path / 'summary.json').exists()
+
+def test_frequency_capacity_bounds_memory():
+    stats = aggregate_chunks([frame([f"w{i} common" for i in range(50)])],
+                             options={'token_frequency': {'capacity': 5}})
+    counter = stats['token_frequency']
+    assert len(counter.counts) <= 10 and counter.counts['common'] == 50 and counter.pruned > 0
+
+def test_plots_are_rendered_headless(tmp_path):
+    pytest.importorskip('matplotlib')
+    from src.eda import Plotter
+
+    paths = Plotter.render(aggregate_chunks([frame(['ጫማ 500 ብር', 'ቦርሳ'])]), output_dir=str(tmp_path))
+    assert set(paths) == {'word_frequency', 'message_length', 'time_series', 'channel_counts'}
+    assert all((tmp_path / f"{name}.png").exists() for name in paths)
@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+
+from src.CoNLL_processing import CoNLLFormatter
+from src.entity_index import EntityIndex, entity_values, frame_entities, parse_prices
+
+MESSAGES = pd.DataFrame({
+    'Channel Username': ['@shop', '@shop', '@shop'],
+    'ID': [1, 2, 3],
+    'Date': ['2024-01-01 10:00:00', '2024-01-02 10:00:00', '2024-01-03 10:00:00'],
+    'Cleaned_Message': [
+        'nike ጫማ በቦሌ ዋጋ 1500 ብር 2500',
+        'ጫማ ዋጋ 2500 ብር 0911223344',
+        'ቦርሳ 5000 ብር',
+    ],
+})
+
+@pytest.fixture(scope='module')
+def formatter():
+    return CoNLLFormatter()
+
+@pytest.fixture
+def index(tmp_path, formatter):
+    with EntityIndex(str(tmp_path / 'index.sqlite'), matcher=formatter.matcher) as index:
+        index.add_labeled_chunk(MESSAGES, formatter)
+        yield index
+
+def ids(result):
+    return sorted(result['message_id'].tolist())
+
+def test_parse_prices_one_per_number():
+    assert parse_prices('ዋጋ 1500 ብር 2500') == [1500.0, 2500.0]
+    assert parse_prices('2,500 ብር') == [2500.0]
+    assert parse_prices('ዋጋ 2500 ብር 0911223344') == [2500.0]
+    assert parse_prices('፲፪ ብር') == [12.0]
+    assert parse_prices('ብር') == []
+
+def test_entity_values_split_merged_spans(formatter):
+    assert entity_values('nike ጫማ', formatter.matcher) == ['nike', 'ጫማ']
+    assert entity_values('በቦሌ', formatter.matcher) == ['ቦሌ']
+    assert entity_values('Under armour', formatter.matcher) == ['under armour']
+    assert entity_values('አዲስ ስልክ', formatter.matcher) == ['አዲስ', 'ስልክ']
+    assert entity_values('ስልክ ቻርጀር') == ['ስልክ ቻርጀር']
+
+def test_frame_entities_merges_adjacent_labels(formatter):
+    labeled = formatter.label_frame(MESSAGES, column='Cleaned_Message')
+    spans = frame_entities(labeled, formatter.label_names)
+    first = spans[spans['message_id'] == 0]
+    assert first[['entity_type', 'text']].values.tolist() == [
+        ['PRODUCT', 'nike ጫማ'], ['LOC', 'በቦሌ'], ['PRICE', 'ዋጋ 1500 ብር 2500'],
+    ]
+
+def test_price_filter_uses_each_number(index):
+    assert ids(index.query({'PRODUCT': 'ጫማ'}, max_price=3000)) == [1, 2]
+    assert ids(index.query(min_price=2000, max_price=3000)) == [1, 2]
+    assert ids(index.query(min_price=1_000_000)) == []
+    assert ids(index.query(max_price=5000, min_price=4000)) == [3]
+
+def test_merged_product_span_is_searchable_by_each_entry(index):
+    assert ids(index.query({'PRODUCT': 'nike'})) == [1]
+    assert ids(index.query({'PRODUCT': 'Nike', 'LOC': 'ቦሌ'})) == [1]
+    assert ids(index.query({'PRODUCT': 'Nike ጫማ'})) == [1]
+    assert ids(index.query({'PRODUCT': 'ጫማ'})) == [1, 2]
+    assert ids(index.query({'PRODUCT': 'ቦርሳ'}, since='2024-01-02')) == [3]
+
+def test_readding_messages_replaces_their_entries(index, formatter):
+    edited = MESSAGES.iloc[[2]].assign(Cleaned_Message='ጫማ 900 ብር')
+    index.add_labeled_chunk(edited, formatter)
+    assert len(index) == 3
+    assert ids(index.query({'PRODUCT': 'ቦርሳ'})) == []
+    assert ids(index.query({'PRODUCT': 'ጫማ'}, max_price=1000)) == [3]
+
+def test_predictions_are_split_the_same_way(tmp_path, formatter):
+    predictions = [[{'entity': 'PRODUCT', 'word': 'Nike ጫማ'}, {'entity': 'PRICE', 'word': '1500 ብር 2500'}]]
+    with EntityIndex(str(tmp_path / 'index.sqlite'), matcher=formatter.matcher) as index:
+        index.add_predictions(MESSAGES.iloc[:1], predictions)
+        assert ids(index.query({'PRODUCT': 'nike'}, max_price=2000)) == [1]
+
+def test_edit_in_the_same_chunk_replaces_the_original(tmp_path, formatter):
+    edited = MESSAGES.iloc[[2]].assign(Cleaned_Message='ጫማ 900 ብር')
+    with EntityIndex(str(tmp_path / 'index.sqlite'), matcher=formatter.matcher) as index:
+        index.add_labeled_chunk(pd.concat([MESSAGES, edited]), formatter)
+        assert len(index) == 3
+        assert ids(index.query({'PRODUCT': 'ቦርሳ'})) == []
+        assert ids(index.query(min_price=4000)) == []
+        assert ids(index.query({'PRODUCT': 'ጫማ'}, max_price=1000)) == [3]
+
+def test_build_index_keeps_the_last_version_of_each_message(tmp_path, formatter):
+    from src.entity_index import build_index
+
+    cleaned = tmp_path / 'cleaned.csv'
+    edits = MESSAGES.iloc[[1, 2]].assign(Cleaned_Message=['ቦርሳ 700 ብር', None])
+    pd.concat([MESSAGES, edits]).to_csv(cleaned, index=False)
+    build_index(str(cleaned), str(tmp_path / 'index.sqlite'), formatter=formatter)
+    with EntityIndex(str(tmp_path / 'index.sqlite'), matcher=formatter.matcher) as index:
+        assert len(index) == 3
+        assert ids(index.query({'PRODUCT': 'ጫማ'})) == [1]
+        assert ids(index.query({'PRODUCT': 'ቦርሳ'})) == [2]
+
+def test_build_index_predicts_only_the_last_non_empty_versions(tmp_path, formatter):
+    from src.entity_index import build_index
+
+    class FakePredictor:
+        def __init__(self):
+            self.texts = []
+
+        def predict_batch(self, texts):
+            self.texts += texts
+            return [[{'entity': 'PRODUCT', 'word': text.split()[0]}] for text in texts]
+
+    cleaned = tmp_path / 'cleaned.csv'
+    pd.concat([MESSAGES, MESSAGES.iloc[[2]].assign(Cleaned_Message=None)]).to_csv(cleaned, index=False)
+    predictor = FakePredictor()
+    build_index(str(cleaned), str(tmp_path / 'index.sqlite'), formatter=formatter, predictor=predictor)
+    assert predictor.texts == MESSAGES['Cleaned_Message'].tolist()[:2]
+    with EntityIndex(str(tmp_path / 'index.sqlite'), matcher=formatter.matcher) as index:
+        assert len(index) == 3 and ids(index.query({'PRODUCT': 'ቦርሳ'})) == []
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.explanations import EvaluationBudgetExceeded, ExplanationBackend, predicted_entities
+
+LABELS = {0: 'O', 1: 'B-PRICE', 2: 'I-PRICE'}
+
+class FakePredictor:
+    """Labels numerals B-PRICE, a following 'ብር' I-PRICE and everything else O"""
+    batch_size = 2
+    id2label = LABELS
+    tokenizer = SimpleNamespace(mask_token='[MASK]', unk_token='[UNK]')
+
+    def __init__(self):
+        self.calls = []
+
+    def _labels(self, words):
+        labels = []
+        for i, word in enumerate(words):
+            if word.isdigit():
+                labels.append(1)
+            elif word == 'ብር' and i and words[i - 1].isdigit():
+                labels.append(2)
+            else:
+                labels.append(0)
+        return labels
+
+    def predict_word_probabilities(self, texts):
+        self.calls.append(list(texts))
+        for text in texts:
+            words = text.split()
+            probabilities = np.full((len(words), 3), 0.05)
+            probabilities[np.arange(len(words)), self._labels(words)] = 0.9
+            yield words, probabilities
+
+    def predict_word_labels(self, texts):
+        for text in texts:
+            spans, start = [], 0
+            for word in text.split():
+                start = text.index(word, start)
+                spans.append((start, start + len(word)))
+                start += len(word)
+            yield spans, [LABELS[label] for label in self._labels(text.split())], None
+
+def test_repeated_perturbations_are_served_from_the_cache():
+    predictor = FakePredictor()
+    backend = ExplanationBackend(predictor)
+    texts = ['ዋጋ 500 ብር', 'ዋጋ [MASK] ብር', 'ዋጋ 500 ብር']
+    backend.word_probabilities(texts)
+    backend.word_probabilities(texts[:1])
+    assert predictor.calls == [['ዋጋ 500 ብር', 'ዋጋ [MASK] ብር']]
+    assert backend.cache_info() == {'hits': 1, 'evaluations': 2, 'size': 2}
+
+def test_span_scores_follow_masking():
+    backend = ExplanationBackend(FakePredictor())
+    words = ['ዋጋ', '500', 'ብር']
+    entities, predicted_words, label_ids = predicted_entities(backend, ' '.join(words))
+    assert entities == [(1, 3, 'PRICE')] and predicted_words == words and label_ids == [0, 1, 2]
+
+    texts = [backend.mask_words(words, keep) for keep in ([1, 1, 1], [1, 0, 1])]
+    assert texts[1] == 'ዋጋ [MASK] ብር'
+    kept, masked = backend.span_scores(texts, (1, 3), label_ids[1:3])
+    assert kept == pytest.approx(0.9) and masked == pytest.approx(0.05)
+
+def test_budget_counts_only_new_texts():
+    backend = ExplanationBackend(FakePredictor(), max_evals=2)
+    backend.word_probabilities(['a', 'b', 'a'])
+    backend.word_probabilities(['b'])
+    with pytest.raises(EvaluationBudgetExceeded):
+        backend.word_probabilities(['c'])
+
+def test_lru_cache_is_bounded():
+    backend = ExplanationBackend(FakePredictor(), cache_size=2)
+    backend.word_probabilities(['a', 'b', 'c'])
+    assert list(backend.cache) == ['b', 'c']
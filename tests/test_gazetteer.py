@@ -0,0 +1,30 @@
+import pytest
+
+from src.gazetteer import GazetteerMatcher
+
+@pytest.fixture
+def matcher():
+    return (GazetteerMatcher()
+            .add_many(['አዲስ አበባ', 'ቦሌ', 'አዲስ'], 'LOC')
+            .add_many(['Under armour', 'ጫማ', 'ቦሌ'], 'PRODUCT'))
+
+def test_longest_match_and_first_type_win(matcher):
+    tokens = 'በአዲስ አበባ ቦሌ under ARMOUR ጫማ አዲስ'.split()
+    assert list(matcher.find_spans(tokens)) == [
+        (0, 2, 'LOC'), (2, 3, 'LOC'), (3, 5, 'PRODUCT'), (5, 6, 'PRODUCT'), (6, 7, 'LOC'),
+    ]
+    assert len(matcher) == 5 and matcher.max_span == 2
+
+def test_prefixes_are_stripped_only_from_the_first_token(matcher):
+    assert matcher.match_at(['ለጫማ'], 0) == (1, 'PRODUCT')
+    assert matcher.match_at(['አዲስ', 'ባበባ'], 0) == (1, 'LOC')
+    assert matcher.strip_prefix('በ') is None
+
+def test_add_file(tmp_path, matcher):
+    path = tmp_path / 'extra.tsv'
+    path.write_text('# comment\n\nLOC\tመገናኛ\nቦርሳ\n', encoding='utf-8')
+    matcher.add_file(str(path), entity_type='PRODUCT')
+    assert matcher.match_at(['መገናኛ'], 0) == (1, 'LOC')
+    assert matcher.match_at(['ቦርሳ'], 0) == (1, 'PRODUCT')
+    with pytest.raises(ValueError):
+        GazetteerMatcher().add_file(str(path))
@@ -0,0 +1,94 @@
+import pandas as pd
+import pytest
+
+from src.CoNLL_processing import CoNLLFormatter
+from src.conll_io import ConllReadReport, MESSAGE_MARKER, iter_conll_sentences
+from src.dedup import NearDuplicateIndex
+from src.incremental import ProcessingManifest, preprocess_incremental
+
+def write_raw(path, messages):
+    pd.DataFrame({
+        'Channel Title': ['Shop'] * len(messages),
+        'Channel Username': ['@shop'] * len(messages),
+        'ID': list(messages),
+        'Message': list(messages.values()),
+        'Date': ['2024-01-01 10:00:00+00:00'] * len(messages),
+    }).to_csv(path, index=False)
+
+def run(tmp_path, messages):
+    raw = tmp_path / 'raw.csv'
+    write_raw(raw, messages)
+    return preprocess_incremental(str(raw), str(tmp_path / 'cleaned.csv'), str(tmp_path / 'labeled.conll'),
+                                  str(tmp_path / 'manifest.sqlite'), chunksize=2)
+
+def conll_sentences(tmp_path):
+    report = ConllReadReport()
+    sentences = [tokens for tokens, _ in iter_conll_sentences(str(tmp_path / 'labeled.conll'), report)]
+    markers = [line[len(MESSAGE_MARKER):].strip()
+               for line in open(tmp_path / 'labeled.conll', encoding='utf-8') if line.startswith(MESSAGE_MARKER)]
+    assert report.malformed == 0
+    return dict(zip(markers, sentences)), len(sentences)
+
+def test_only_new_or_edited_rows_are_processed(tmp_path):
+    assert run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ', 3: 'ድስት'}) == 3
+    assert run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ', 3: 'ድስት'}) == 0
+    assert run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ 900 ብር', 3: 'ድስት', 4: 'ዘይት'}) == 2
+    with ProcessingManifest(str(tmp_path / 'manifest.sqlite')) as manifest:
+        assert manifest.high_water_mark('@shop') == 4
+
+def test_edited_message_replaces_its_stale_sentence(tmp_path):
+    run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ', 3: 'ድስት'})
+    run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ 900 ብር', 3: 'ድስት', 4: 'ዘይት'})
+    run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ 900 ብር', 3: 'ድስት ዋጋ', 4: 'ዘይት'})
+    sentences, count = conll_sentences(tmp_path)
+    assert count == 4
+    assert sentences == {
+        '@shop/1': ['ጫማ', '500', 'ብር'], '@shop/2': ['ቦርሳ', '900', 'ብር'],
+        '@shop/3': ['ድስት', 'ዋጋ'], '@shop/4': ['ዘይት'],
+    }
+
+class FailingFormatter(CoNLLFormatter):
+    """Raises while labelling the chunk that contains ``fail_on``"""
+    def __init__(self, fail_on):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def iter_labeled_messages(self, messages, normalized=False, keys=None):
+        if any(key.endswith(f"/{self.fail_on}") for key in keys):
+            raise RuntimeError("labelling failed")
+        return super().iter_labeled_messages(messages, normalized=normalized, keys=keys)
+
+def test_stale_sentences_are_removed_after_an_interrupted_run(tmp_path):
+    run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ', 3: 'ድስት'})
+    raw = tmp_path / 'raw.csv'
+    write_raw(raw, {1: 'ጫማ 700 ብር', 2: 'ቦርሳ', 3: 'ድስት', 4: 'ዘይት'})
+    with pytest.raises(RuntimeError):
+        preprocess_incremental(str(raw), str(tmp_path / 'cleaned.csv'), str(tmp_path / 'labeled.conll'),
+                               str(tmp_path / 'manifest.sqlite'), chunksize=2, formatter=FailingFormatter(4))
+    # The first chunk (the edit of message 1) was committed before the failure
+    with ProcessingManifest(str(tmp_path / 'manifest.sqlite')) as manifest:
+        assert manifest.pending_superseded() == {'@shop/1': True}
+
+    assert run(tmp_path, {1: 'ጫማ 700 ብር', 2: 'ቦርሳ', 3: 'ድስት', 4: 'ዘይት'}) == 1
+    sentences, count = conll_sentences(tmp_path)
+    assert count == 4 and sentences['@shop/1'] == ['ጫማ', '700', 'ብር']
+    with ProcessingManifest(str(tmp_path / 'manifest.sqlite')) as manifest:
+        assert manifest.pending_superseded() == {}
+
+def test_message_edited_to_empty_loses_its_sentence(tmp_path):
+    run(tmp_path, {1: 'ጫማ 500 ብር', 2: 'ቦርሳ'})
+    run(tmp_path, {1: 'ጫማ 500 ብር', 2: ''})
+    sentences, count = conll_sentences(tmp_path)
+    assert count == 1 and list(sentences) == ['@shop/1']
+
+def test_dedup_index_is_not_rewritten_after_every_chunk(tmp_path, monkeypatch):
+    saves = []
+    monkeypatch.setattr(NearDuplicateIndex, 'save', lambda self, path: saves.append(path))
+    raw = tmp_path / 'raw.csv'
+    write_raw(raw, {i: f"ዋጋ {i}00 ብር ጫማ ቁጥር {i}" for i in range(1, 12)})
+    index_path = str(tmp_path / 'dedup.npz')
+    preprocess_incremental(str(raw), str(tmp_path / 'cleaned.csv'), str(tmp_path / 'labeled.conll'),
+                           str(tmp_path / 'manifest.sqlite'), chunksize=2, dedup_path=index_path,
+                           dedup_save_every=4)
+    # Six chunks: saved after the fourth commit and once at the end
+    assert saves == [index_path, index_path]
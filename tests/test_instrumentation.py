@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import pytest
+
+from src import instrumentation
+
+def test_nested_stages_counters_and_report(tmp_path):
+    report_path = str(tmp_path / 'report.json')
+    with instrumentation.monitored_run('job', report_path) as monitor:
+        with instrumentation.stage('read'):
+            with instrumentation.stage('parse'):
+                instrumentation.count('rows', 3)
+        instrumentation.count_many({'LOC': 2}, prefix='entities.')
+        instrumentation.observe('latency', 0.01)
+    assert instrumentation.get_monitor() is not monitor
+
+    report = json.load(open(report_path, encoding='utf-8'))
+    assert {'job', 'job/read', 'job/read/parse'} <= set(report['stages'])
+    assert report['counters'] == {'entities.LOC': 2, 'rows': 3}
+    assert 'latency' in report['histograms']
+
+def test_errors_are_recorded_and_the_report_still_written(tmp_path):
+    report_path = str(tmp_path / 'report.json')
+    with pytest.raises(KeyError):
+        with instrumentation.monitored_run('job', report_path):
+            try:
+                raise KeyError('missing')
+            except KeyError as e:
+                instrumentation.record_error('load', e)
+                raise
+    report = json.load(open(report_path, encoding='utf-8'))
+    assert report['errors'][0]['type'] == 'KeyError' and report['stages']['job']['errors'] == 1
+
+def test_timed_decorator_uses_the_current_monitor():
+    @instrumentation.timed('work')
+    def work():
+        return 1
+
+    @instrumentation.timed()
+    async def fetch():
+        return 2
+
+    with instrumentation.monitored_run('run') as monitor:
+        assert work() == 1 and asyncio.run(fetch()) == 2
+    assert {'run/work', 'run/fetch'} <= set(monitor.stages)
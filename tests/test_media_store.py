@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import os
+from types import SimpleNamespace
+
+from scripts.media_store import ContentAddressedStore, download_media, run_media_stage
+
+class FakeMediaClient:
+    """Writes each message's payload to the given file object in small chunks, like Telethon"""
+    def __init__(self, payloads, chunk_size=4):
+        self.payloads = payloads
+        self.chunk_size = chunk_size
+
+    async def download_media(self, message, file):
+        assert file is not bytes and hasattr(file, 'write')
+        payload = self.payloads[message.id]
+        if isinstance(payload, Exception):
+            raise payload
+        for start in range(0, len(payload), self.chunk_size):
+            file.write(payload[start:start + self.chunk_size])
+            await asyncio.sleep(0)
+        return file
+
+def message(message_id, mime_type='application/pdf'):
+    return SimpleNamespace(id=message_id, photo=None, document=SimpleNamespace(mime_type=mime_type))
+
+def stored_files(root):
+    return sorted(os.path.relpath(os.path.join(path, name), root)
+                  for path, _, names in os.walk(root) for name in names)
+
+def test_downloads_are_streamed_hashed_and_deduplicated(tmp_path):
+    store = ContentAddressedStore(str(tmp_path))
+    payloads = {1: b'same document', 2: b'same document', 3: b'another one', 4: b'', 5: ConnectionError('gone')}
+    messages = [message(i) for i in payloads]
+    results = asyncio.run(download_media(FakeMediaClient(payloads), messages, store, workers=3))
+
+    digest = hashlib.sha256(b'same document').hexdigest()
+    assert results[0] == results[1] == (digest, store.path_for(digest, '.pdf'))
+    assert open(results[2][1], 'rb').read() == b'another one'
+    assert results[3] is None and results[4] is None
+    # Two stored files, and no staging file left behind by the duplicate or the failures
+    assert len(stored_files(str(tmp_path))) == 2
+    assert os.listdir(os.path.join(str(tmp_path), 'tmp')) == []
+
+def test_put_bytes_and_put_file_agree(tmp_path):
+    store = ContentAddressedStore(str(tmp_path))
+    digest, path, is_new = store.put(b'photo bytes', '.jpg')
+    staged = store.temp_path()
+    with open(staged, 'wb') as file:
+        file.write(b'photo bytes')
+    assert store.put_file(staged, '.jpg') == (digest, path, False)
+    assert is_new and not os.path.exists(staged)
+
+def test_run_media_stage_from_sync_code(tmp_path):
+    store = ContentAddressedStore(str(tmp_path))
+    assert run_media_stage(FakeMediaClient({}), [], store) == []
+    results = run_media_stage(FakeMediaClient({7: b'x' * 10}), [message(7, 'image/png')], store)
+    assert results[0][1].endswith('.png')
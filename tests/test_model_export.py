@@ -0,0 +1,55 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from src.model_export import (
+    aligned_gold_sentences, entity_f1, entity_spans, export_model_variants, load_fastest_predictor, main,
+    quantize_int8, state_size_bytes,
+)
+
+def test_entity_spans_and_f1():
+    assert entity_spans(['B-PRODUCT', 'I-PRODUCT', 'O', 'B-PRICE', 'B-PRICE']) == {
+        (0, 2, 'PRODUCT'), (3, 4, 'PRICE'), (4, 5, 'PRICE'),
+    }
+    assert entity_f1([['B-LOC', 'O']], [['B-LOC', 'O']]) == 1.0
+    assert entity_f1([['B-LOC', 'I-LOC']], [['B-LOC', 'O']]) == 0.0
+    assert entity_f1([['O']], [['O']]) == 1.0
+
+def test_export_reports_each_variant_size(tiny_checkpoints, tmp_path):
+    from transformers import AutoModelForTokenClassification
+
+    model_path = tiny_checkpoints[0]
+    gold = ([['ጫማ', 'በ', '500', 'ብር'], ['ቦሌ', 'መገናኛ']], [['B-PRODUCT', 'O', 'B-PRICE', 'I-PRICE'], ['B-LOC', 'I-LOC']])
+    report = export_model_variants(model_path, str(tmp_path), gold=gold, repeats=1)
+    variants = report['variants']
+    assert set(variants) == {'fp32', 'int8', 'traced', 'traced-int8'}
+
+    int8 = quantize_int8(AutoModelForTokenClassification.from_pretrained(model_path).eval())
+    assert variants['int8']['size_mb'] == pytest.approx(state_size_bytes(int8) / 2 ** 20, rel=0.01)
+    assert variants['int8']['size_mb'] != variants['traced-int8']['size_mb']
+    assert variants['fp32']['size_saved_mb'] == 0 and 'memory_saved_mb' not in variants['fp32']
+    assert all(0.0 <= row['f1'] <= 1.0 for row in variants.values())
+    assert report['skipped_gold_sentences'] == 0
+
+    predictor = load_fastest_predictor(str(tmp_path), max_f1_drop=1.0)
+    assert predictor.variant in variants
+    assert len(predictor.predict_batch(['ጫማ 500 ብር'])) == 1
+
+def test_export_needs_real_evaluation_data(tmp_path):
+    with pytest.raises(SystemExit):
+        main(['some-model', '--output-root', str(tmp_path)])
+    with pytest.raises(ValueError):
+        export_model_variants('some-model', str(tmp_path))
+
+def test_gold_sentences_split_differently_are_skipped(tiny_checkpoints, tmp_path):
+    from src.ner_inference import NERPredictor
+
+    gold_tokens = [['ጫማ', '500', 'ብር'], ['ዋጋ:500', 'ብር']]  # the scanner splits 'ዋጋ:500' into three words
+    predictor = NERPredictor.from_pretrained(tiny_checkpoints[0])
+    assert aligned_gold_sentences(predictor, [' '.join(t) for t in gold_tokens], gold_tokens) == [0]
+
+    gold = (gold_tokens, [['B-PRODUCT', 'B-PRICE', 'I-PRICE'], ['O', 'B-PRICE']])
+    report = export_model_variants(tiny_checkpoints[0], str(tmp_path), gold=gold, repeats=1)
+    assert report['skipped_gold_sentences'] == 1
+    with pytest.raises(ValueError):
+        export_model_variants(tiny_checkpoints[0], str(tmp_path), gold=(gold_tokens[1:], gold[1][1:]), repeats=1)
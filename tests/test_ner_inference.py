@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip('torch')
+
+from src.ner_inference import NERPredictor, merge_word_predictions, split_label
+from src.normalization import normalize_text
+from src.tokenization import tokenize
+
+def test_split_and_merge_labels():
+    assert split_label('B-PRICE') == ('B', 'PRICE') and split_label('O') == ('O', None)
+    text = 'ጫማ 500 ብር'
+    entities = merge_word_predictions(text, [(0, 2), (3, 6), (7, 9)], ['B-PRODUCT', 'B-PRICE', 'I-PRICE'],
+                                      [1.0, 0.5, 1.0])
+    assert [(e['entity'], e['word'], e['score']) for e in entities] == [('PRODUCT', 'ጫማ', 1.0),
+                                                                       ('PRICE', '500 ብር', 0.75)]
+
+class RecordingTokenizer:
+    """Forwards to a real tokenizer and keeps the word lists it was given"""
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.calls = []
+
+    def __call__(self, words, **kwargs):
+        self.calls.append(words)
+        return self.tokenizer(words, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.tokenizer, name)
+
+def test_model_sees_normalized_words_but_spans_are_raw(tiny_checkpoints):
+    predictor = NERPredictor.from_pretrained(tiny_checkpoints[0])
+    predictor.tokenizer = RecordingTokenizer(predictor.tokenizer)
+    texts = ['ፀጉር\u200b ዘይት ዋጋ፡ ፲፪ ብር', 'ሐገር NIKE 500ብር']
+
+    results = predictor.predict_word_labels(texts)
+    assert predictor.tokenizer.calls[0] == [tokenize(normalize_text(text)) for text in texts]
+    spans = results[0][0]
+    assert [texts[0][start:end] for start, end in spans] == ['ፀጉር', 'ዘይት', 'ዋጋ', '፲፪', 'ብር']
+
+    for text, entities in zip(texts, predictor.predict_batch(texts)):
+        for entity in entities:
+            assert text[entity['start']:entity['end']] == entity['word']
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+
+from src.ner_server import NERServer
+
+async def http(port, method, path, payload=None, body=None):
+    """One HTTP/1.1 request against the local server; returns ``(status, json)``"""
+    if payload is not None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    body = body or b''
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(data)
+
+async def with_server(predictor, scenario, **kwargs):
+    server = NERServer(predictor, **kwargs)
+    listener = await server.start(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        return await scenario(port, server)
+    finally:
+        await server.stop()
+
+class FakePredictor:
+    """Fails every batch containing 'boom', like a model choking on one input"""
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, texts):
+        self.batches.append(list(texts))
+        if 'boom' in texts:
+            raise ValueError('cannot predict boom')
+        return [[{'entity': 'PRODUCT', 'word': text}] for text in texts]
+
+def test_malformed_requests_get_400():
+    async def scenario(port, server):
+        bad = [{'text': 123}, {'texts': 'ጫማ'}, {'texts': ['ጫማ', 5]}, {'texts': None}, [1, 2], {}]
+        statuses = [(await http(port, 'POST', '/predict', payload))[0] for payload in bad]
+        statuses.append((await http(port, 'POST', '/predict', body=b'{not json'))[0])
+        return statuses, server.batcher.metrics.snapshot()
+
+    statuses, metrics = asyncio.run(with_server(FakePredictor(), scenario))
+    assert statuses == [400] * 7
+    assert metrics['batches'] == 0
+
+async def raw(port, request):
+    """Send raw bytes; returns the status of the response, or None if the connection closed without one"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split()[1]) if response else None
+
+def test_bad_request_lines_and_oversized_bodies_are_answered():
+    async def scenario(port, server):
+        return [
+            await raw(port, b'GARBAGE\r\n\r\n'),
+            await raw(port, b'GET /health\r\n\r\n'),
+            await raw(port, b'POST /predict HTTP/1.1\r\nContent-Length: -5\r\n\r\n'),
+            await raw(port, b'POST /predict HTTP/1.1\r\nContent-Length: 100\r\n\r\n'),
+            (await http(port, 'POST', '/predict', {'text': 'ጫማ'}))[0],
+        ]
+
+    statuses = asyncio.run(with_server(FakePredictor(), scenario, max_body_bytes=64))
+    assert statuses == [400, 400, 400, 413, 200]
+
+def test_one_failing_text_does_not_fail_its_batch():
+    predictor = FakePredictor()
+
+    async def scenario(port, server):
+        responses = await asyncio.gather(*(
+            http(port, 'POST', '/predict', {'text': text}) for text in ('ጫማ', 'boom', 'ቦርሳ')
+        ))
+        _, metrics = await http(port, 'GET', '/metrics')
+        return responses, metrics
+
+    responses, metrics = asyncio.run(with_server(predictor, scenario, max_wait_ms=200))
+    assert [status for status, _ in responses] == [200, 500, 200]
+    assert responses[0][1] == {'entities': [{'entity': 'PRODUCT', 'word': 'ጫማ'}]}
+    assert len(predictor.batches[0]) == 3  # batched once, then retried one by one
+    assert metrics['requests'] == 2 and metrics['failed_requests'] == 1
+    assert metrics['batches'] == 1 and metrics['mean_batch_size'] == 3.0
+
+def test_tiny_model_server(tiny_checkpoints):
+    from src.ner_inference import NERPredictor
+
+    predictor = NERPredictor.from_pretrained(tiny_checkpoints[0])
+    texts = ['በአዲስ አበባ ውስጥ ጫማ በ 5000 ብር', 'ቦሌ ስልክ 1500 ብር', 'ዋጋ 2500']
+
+    async def scenario(port, server):
+        health = await http(port, 'GET', '/health')
+        single = await http(port, 'POST', '/predict', {'text': texts[0]})
+        many = await http(port, 'POST', '/predict', {'texts': texts})
+        concurrent = await asyncio.gather(*(http(port, 'POST', '/predict', {'text': t}) for t in texts * 4))
+        _, metrics = await http(port, 'GET', '/metrics')
+        return health, single, many, concurrent, metrics
+
+    health, single, many, concurrent, metrics = asyncio.run(
+        with_server(predictor, scenario, max_batch_size=8, max_wait_ms=50))
+    assert health == (200, {'status': 'ok'})
+    assert single[0] == 200 and isinstance(single[1]['entities'], list)
+    assert many[0] == 200 and len(many[1]['entities']) == len(texts)
+    assert many[1]['entities'][0] == single[1]['entities']
+    assert all(status == 200 for status, _ in concurrent)
+    assert metrics['requests'] == 1 + len(texts) + 4 * len(texts)
+    assert metrics['mean_batch_size'] == pytest.approx(metrics['requests'] / metrics['batches'])
+    assert max(metrics['batch_sizes'], key=int) != '1'  # concurrent requests were batched
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from src.ner_training import load_tokenized_dataset, tokenizer_fingerprint
+
+SENTENCES = [
+    [('ጫማ', 'B-PRODUCT'), ('በ', 'O'), ('5000', 'B-PRICE'), ('ብር', 'I-PRICE')],
+    [('ቦሌ', 'B-LOC'), ('መገናኛ', 'I-LOC'), ('ስልክ', 'O')],
+    [('ዋጋ', 'B-PRICE'), ('1500', 'I-PRICE'), ('ቦርሳ', 'B-PRODUCT')],
+] * 4
+
+@pytest.fixture
+def conll_path(tmp_path):
+    path = tmp_path / 'labeled.conll'
+    path.write_text('\n\n'.join('\n'.join(f"{token} {label}" for token, label in sentence)
+                                for sentence in SENTENCES) + '\n', encoding='utf-8')
+    return str(path)
+
+@pytest.fixture
+def tokenizer(tiny_checkpoints):
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(tiny_checkpoints[0])
+
+def test_fingerprint_ignores_call_time_truncation_and_padding(tokenizer):
+    before = tokenizer_fingerprint(tokenizer)
+    tokenizer(['ጫማ በ 5000 ብር'], truncation=True, max_length=4, padding='max_length')
+    assert tokenizer_fingerprint(tokenizer) == before
+
+def test_second_load_in_the_same_process_hits_the_cache(conll_path, tokenizer, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    first, labels = load_tokenized_dataset(conll_path, tokenizer, cache_dir=cache_dir, max_length=16)
+    second, cached_labels = load_tokenized_dataset(conll_path, tokenizer, cache_dir=cache_dir, max_length=16)
+    assert len(os.listdir(cache_dir)) == 1
+    assert cached_labels == labels
+    assert second['train']['input_ids'] == first['train']['input_ids']
+
+    load_tokenized_dataset(conll_path, tokenizer, cache_dir=cache_dir, max_length=8)
+    assert len(os.listdir(cache_dir)) == 2
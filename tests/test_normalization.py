@@ -0,0 +1,33 @@
+import pandas as pd
+
+from src.normalization import (
+    clean_series, clean_text, ethiopic_numeral_value, fold_key, normalize_series, normalize_text,
+    normalize_with_offsets,
+)
+
+def test_homophones_punctuation_and_numerals():
+    assert normalize_text('ፀጉር ሐገር') == 'ጸጉር ሀገር'
+    assert normalize_text('ዋጋ፡ ፲፪ ብር።') == 'ዋጋ  12 ብር.'
+    assert normalize_text('a\u200bb “x”') == 'ab "x"'
+    assert ethiopic_numeral_value('፪፻፶') == 250 and ethiopic_numeral_value('፼') == 10_000
+    assert fold_key('NIKE') == fold_key('nike')
+
+def test_clean_text_keeps_prices_whole():
+    assert clean_text('ዋጋ: 2,500 ብር!! NIKE') == 'ዋጋ  2500 ብር   nike'
+    assert clean_text("don't") == 'dont'
+
+def test_series_match_single_text_and_keep_missing():
+    messages = pd.Series(['ፀጉር ፲፪', None, 'NIKE, 2,500!'])
+    assert normalize_series(messages).tolist()[::2] == [normalize_text(messages[0]), normalize_text(messages[2])]
+    assert clean_series(messages).tolist()[::2] == [clean_text(messages[0]), clean_text(messages[2])]
+    assert pd.isna(normalize_series(messages)[1]) and pd.isna(clean_series(messages)[1])
+
+def test_offsets_map_normalized_characters_back_to_raw_text():
+    text = 'ፀጉር\u200b ዋጋ ፲፪ ብር'
+    normalized, starts, ends = normalize_with_offsets(text)
+    assert normalized == normalize_text(text) == 'ጸጉር ዋጋ 12 ብር'
+    assert len(starts) == len(ends) == len(normalized)
+    number = normalized.index('12')
+    assert text[starts[number]:ends[number + 1]] == '፲፪'
+    assert text[starts[0]:ends[2]] == 'ፀጉር'
+    assert normalize_with_offsets('abc') == ('abc', [0, 1, 2], [1, 2, 3])
@@ -0,0 +1,19 @@
+from src.CoNLL_processing import CoNLLFormatter
+from src.parallel_labeling import benchmark_scaling, label_messages_parallel, shard_messages
+
+MESSAGES = [f"በአዲስ አበባ ቦሌ Nike ጫማ ዋጋ {i}00 ብር" for i in range(23)] + ['', 'ቦርሳ']
+
+def test_shards_keep_order():
+    assert [len(shard) for shard in shard_messages(range(7), 3)] == [3, 3, 1]
+
+def test_parallel_output_matches_a_single_process(tmp_path):
+    output = str(tmp_path / 'parallel.conll')
+    shards = label_messages_parallel(iter(MESSAGES), output, workers=2, chunk_size=4, max_pending=2)
+    expected = "".join(f"{sentence}\n\n" for sentence in CoNLLFormatter().iter_labeled_messages(MESSAGES))
+    assert shards == 7
+    assert open(output, encoding='utf-8').read() == expected
+
+def test_benchmark_rows_record_the_cpu_count(tmp_path):
+    rows = benchmark_scaling(MESSAGES, str(tmp_path / 'bench.conll'), worker_counts=(1, 2), chunk_size=8)
+    assert [row['workers'] for row in rows] == [1, 2]
+    assert rows[0]['speedup'] == 1.0 and all(row['cpus'] >= 1 for row in rows)
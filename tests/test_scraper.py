@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from scripts import data_ingestion_preprocessing as ingestion
+from scripts import telegram_scraper
+from scripts.scrape_checkpoints import ScrapeCheckpointStore
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.id = message_id
+        self.message = self.text = f"message {message_id}"
+        self.date = START + timedelta(minutes=message_id)
+        self.sender_id = 1
+        self.media = self.photo = self.document = None
+
+class FakeEntity:
+    title = 'Fake Channel'
+    username = 'fake'
+
+def select_messages(count, limit, min_id=0, offset_id=0, reverse=False):
+    """Telethon's iter_messages selection over messages 1..count"""
+    ids = range(1, count + 1)
+    if reverse:
+        ids = [i for i in ids if i > min_id and i > offset_id]
+    else:
+        ids = [i for i in reversed(ids) if i > min_id and (not offset_id or i < offset_id)]
+    return [FakeMessage(i) for i in ids[:limit]]
+
+class FakeAsyncClient:
+    def __init__(self, count):
+        self.count = count
+
+    async def get_entity(self, channel):
+        return FakeEntity()
+
+    async def _iterate(self, messages):
+        for message in messages:
+            yield message
+
+    def iter_messages(self, entity, limit, min_id=0, offset_id=0, reverse=False):
+        return self._iterate(select_messages(self.count, limit, min_id, offset_id, reverse))
+
+class FakeSyncClient:
+    def __init__(self, count):
+        self.count = count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def connect(self):
+        pass
+
+    def get_entity(self, channel):
+        return FakeEntity()
+
+    def iter_messages(self, entity, limit, min_id=0, offset_id=0, reverse=False):
+        return iter(select_messages(self.count, limit, min_id, offset_id, reverse))
+
+def scrape(client, checkpoints, limit):
+    async def run():
+        queue = asyncio.Queue()
+        rate_limiter = telegram_scraper.TokenBucket(rate=1e6, capacity=1e6)
+        await telegram_scraper.scrape_channel(client, 'fake', queue, checkpoints, limit=limit,
+                                              rate_limiter=rate_limiter)
+        ids = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if isinstance(item, telegram_scraper.ChannelDone):
+                checkpoints.update(item.channel, item.last_id, item.last_date)
+            else:
+                ids.extend(row[2] for row in item)
+        return ids
+    return asyncio.run(run())
+
+def test_scrape_channel_limit_never_skips_messages(tmp_path):
+    checkpoints = ScrapeCheckpointStore(str(tmp_path / 'checkpoints.json'))
+    seen = scrape(FakeAsyncClient(50), checkpoints, limit=20)
+    assert seen == list(range(1, 21))
+    assert checkpoints.last_id('fake') == 20
+
+    # New messages arrived; keep scraping with the same small limit until caught up
+    while checkpoints.last_id('fake') < 120:
+        seen += scrape(FakeAsyncClient(120), checkpoints, limit=20)
+    assert seen == list(range(1, 121))
+
+def test_scrape_channel_without_new_messages_keeps_checkpoint(tmp_path):
+    checkpoints = ScrapeCheckpointStore(str(tmp_path / 'checkpoints.json'))
+    checkpoints.update('fake', 30)
+    assert scrape(FakeAsyncClient(30), checkpoints, limit=20) == []
+    assert checkpoints.last_id('fake') == 30
+
+def test_fetch_messages_limit_never_skips_messages(tmp_path):
+    checkpoints = ScrapeCheckpointStore(str(tmp_path / 'checkpoints.json'))
+    seen = []
+    for count in (50, 120, 120, 120, 120, 120, 120):
+        rows = ingestion.fetch_messages(FakeSyncClient(count), checkpoints, channels=['fake'], limit=20)
+        seen += [row[0] for row in rows]
+    assert seen == list(range(1, 121))
+    assert checkpoints.last_id('fake') == 120
+
+def test_checkpoints_survive_commit(tmp_path):
+    path = str(tmp_path / 'checkpoints.json')
+    checkpoints = ScrapeCheckpointStore(path)
+    checkpoints.update('fake', 42, START)
+    checkpoints.update('fake', 10)  # never moves backwards
+    checkpoints.commit()
+    reloaded = ScrapeCheckpointStore(path)
+    assert reloaded.last_id('fake') == 42
+    assert reloaded.last_date('fake') == START.isoformat()
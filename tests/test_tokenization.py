@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from src import tokenization
+from src.explanations import ExplanationBackend
+from src.tokenization import (
+    PRICE_TOKEN_PATTERN, SPECIAL_TOKENS, TOKEN_PATTERN, WORD_PATTERN, clear_word_cache, scan, token_kind,
+    token_spans, tokenize, tokenize_typed,
+)
+
+def kinds(text):
+    return [(token.text, token.kind) for token in scan(text)]
+
+def test_glued_prices_split():
+    assert kinds('5000ብር') == [('5000', 'number'), ('ብር', 'currency')]
+    assert kinds('ዋጋ:-1500') == [('ዋጋ', 'ethiopic'), (':', 'punct'), ('-', 'punct'), ('1500', 'number')]
+    assert kinds('2,500 250birr') == [('2,500', 'number'), ('250', 'number'), ('birr', 'currency')]
+    assert kinds('ብርሃን') == [('ብርሃን', 'ethiopic')]
+
+@pytest.mark.parametrize('code', ['A52', '52A', 'iphone13', 'X1000', 'S23ultra'])
+def test_alphanumeric_codes_stay_whole(code):
+    assert kinds(code) == [(code, 'latin')]
+    assert PRICE_TOKEN_PATTERN.fullmatch(code) is None
+
+@pytest.mark.parametrize('special', SPECIAL_TOKENS)
+def test_special_tokens_stay_whole(special):
+    assert tokenize(f"ጫማ {special} 500") == ['ጫማ', special, '500']
+    assert token_kind(special) == 'special'
+
+def test_offsets_point_into_the_original_text():
+    text = '  ዋጋ:-1500ብር  Nike A52\t'
+    tokens = scan(text)
+    assert [text[token.start:token.end] for token in tokens] == tokenize(text)
+    assert token_spans(text) == [(token.start, token.end) for token in tokens]
+    assert tokenize_typed(text)[0] == tokenize(text)
+    assert tokenize('   ') == [] and tokenize('') == []
+
+@pytest.mark.parametrize('text', [
+    'Nike ጫማ 5000ብር', 'ዋጋ:-1500 2,500 250birr A52 52A', 'ብርሃን [MASK] <mask>ጫማ',
+    'ጫማ\u00a0500\u3000ብር\n\tዋጋ።', '\u200bዋጋ\u200b 1,500.50ETB $20', '  ', '',
+])
+def test_word_memo_matches_the_scanner(text):
+    clear_word_cache()
+    for _ in range(2):  # cold, then from the memo
+        assert tokenize(text) == WORD_PATTERN.findall(text.rstrip())
+        assert tokenize_typed(text) == (
+            [match.group(match.lastindex) for match in TOKEN_PATTERN.finditer(text.rstrip())],
+            [match.lastgroup for match in TOKEN_PATTERN.finditer(text.rstrip())],
+        )
+
+def test_word_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(tokenization, 'WORD_CACHE_SIZE', 10)
+    clear_word_cache()
+    tokenize(' '.join(f"ጫማ{i}" for i in range(25)))
+    assert len(tokenization._WORD_TOKENS) <= 10
+    assert tokenize('ጫማ3 500ብር') == ['ጫማ', '3', '500', 'ብር']
+
+class FakeTokenizer:
+    mask_token = '[MASK]'
+    unk_token = '[UNK]'
+
+class FakePredictor:
+    """Scores word ``i`` with label ``i % 3`` so misaligned rows are visible"""
+    tokenizer = FakeTokenizer()
+    id2label = {0: 'O', 1: 'B-PRODUCT', 2: 'I-PRODUCT'}
+    batch_size = 8
+
+    def predict_word_probabilities(self, texts):
+        results = []
+        for text in texts:
+            spans = token_spans(text)
+            probabilities = np.zeros((len(spans), 3), dtype=np.float32)
+            probabilities[np.arange(len(spans)), np.arange(len(spans)) % 3] = 1.0
+            results.append((spans, probabilities))
+        return results
+
+@pytest.mark.parametrize('mask_token', ['[MASK]', '<mask>'])
+def test_masked_text_keeps_word_positions(mask_token):
+    predictor = FakePredictor()
+    predictor.tokenizer = FakeTokenizer()
+    predictor.tokenizer.mask_token = mask_token
+    backend = ExplanationBackend(predictor)
+    words = tokenize('Nike ጫማ A52 5000ብር ዋጋ:-1500')
+    masked = backend.mask_words(words, [True, False, True, False, True, False, False, True, False])
+    assert len(tokenize(masked)) == len(words)
+    probabilities, = backend.word_probabilities([masked])
+    assert probabilities.shape == (len(words), 3)
+    scores = backend.span_scores([masked], (0, 3), np.array([0, 1, 2]))
+    assert scores.tolist() == [1.0]